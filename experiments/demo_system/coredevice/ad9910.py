@@ -4,6 +4,7 @@ from artiq.language.core import kernel
 from artiq.language.types import TInt32, TFloat, TTuple
 
 import artiq.coredevice.ad9910
+from artiq.coredevice.urukul import DEFAULT_PROFILE
 
 
 class AD9910(artiq.coredevice.ad9910.AD9910):
@@ -42,6 +43,24 @@ class AD9910(artiq.coredevice.ad9910.AD9910):
         # Convert and return
         return self.ftw_to_frequency(ftw), self.pow_to_turns(pow_), self.asf_to_amplitude(asf)
 
+    @kernel
+    def load_mu(self, ftw: TInt32, pow_: TInt32 = 0, asf: TInt32 = 0x3fff, profile: TInt32 = DEFAULT_PROFILE):
+        """Write a single-tone profile without pulsing IO_UPDATE.
+
+        The configuration is applied by the next IO_UPDATE pulse of the CPLD, which is shared by all channels.
+        This allows the configuration of multiple channels to be applied simultaneously.
+        Phase modes are not supported, the phase offset word is written as-is.
+
+        .. seealso:: :meth:`set_mu`
+
+        :param ftw: Frequency tuning word: 32 bit.
+        :param pow_: Phase tuning word: 16 bit unsigned.
+        :param asf: Amplitude scale factor: 14 bit unsigned.
+        :param profile: Single tone profile number to set (0-7, default: 7).
+        """
+        # noinspection PyProtectedMember
+        self.write64(artiq.coredevice.ad9910._AD9910_REG_PROFILE0 + profile, (asf << 16) | (pow_ & 0xffff), ftw)
+
     @kernel
     def get_att_mu(self) -> TInt32:
         """Get digital step attenuator value in machine units.
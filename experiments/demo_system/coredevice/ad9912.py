@@ -5,7 +5,9 @@ from artiq.language.types import TInt32, TInt64, TFloat, TTuple
 from artiq.language.units import us, ms
 
 import artiq.coredevice.ad9912
+from artiq.coredevice import spi2 as spi, urukul
 from artiq.coredevice.ad9912 import AD9912_SER_CONF, AD9912_PRODIDH, AD9912_PWRCNTRL1, AD9912_N_DIV, AD9912_PLLCFG
+from artiq.coredevice.ad9912 import AD9912_POW1
 
 
 class AD9912(artiq.coredevice.ad9912.AD9912):
@@ -104,6 +106,26 @@ class AD9912(artiq.coredevice.ad9912.AD9912):
         # Convert and return
         return self.ftw_to_frequency(ftw), self.pow_to_turns(pow_)
 
+    @kernel
+    def load_mu(self, ftw: TInt64, pow_: TInt32 = 0):
+        """Write the frequency tuning word and phase offset word without pulsing IO_UPDATE.
+
+        The configuration is applied by the next IO_UPDATE pulse of the CPLD, which is shared by all channels.
+        This allows the configuration of multiple channels to be applied simultaneously.
+
+        .. seealso:: :meth:`set_mu`
+
+        :param ftw: Frequency tuning word: 48 bit unsigned.
+        :param pow_: Phase tuning word: 16 bit unsigned.
+        """
+        # Streaming transfer of FTW and POW
+        self.bus.set_config_mu(urukul.SPI_CONFIG, 16, urukul.SPIT_DDS_WR, self.chip_select)
+        self.bus.write((AD9912_POW1 << 16) | (3 << 29))
+        self.bus.set_config_mu(urukul.SPI_CONFIG, 32, urukul.SPIT_DDS_WR, self.chip_select)
+        self.bus.write((ftw >> 16) & 0xffffffff)
+        self.bus.set_config_mu(urukul.SPI_CONFIG | spi.SPI_END, 32, urukul.SPIT_DDS_WR, self.chip_select)
+        self.bus.write(((ftw & 0xffff) << 16) | (pow_ & 0xffff))
+
     @kernel
     def get_att_mu(self) -> TInt32:
         """Get digital step attenuator value in machine units.
@@ -1,6 +1,14 @@
+import os
+import json
+import time
 import typing
+import inspect
+import hashlib
 import logging
+import tempfile
+import collections
 
+import artiq
 import artiq.coredevice.core
 
 __all__ = ['Core']
@@ -54,29 +62,284 @@ class KernelSizeException(Exception):
     pass
 
 
+class _CompileCache:
+    """On-disk cache of linked kernel libraries.
+
+    Kernels are keyed by a hash of their LLVM IR, the compiler version, and the target.
+    The LLVM IR contains the kernel code and the values of all embedded attributes (including kernel invariants).
+    Hence, a kernel that hits the cache skips LLVM optimization, code generation, and linking.
+    A kernel that misses the cache reuses the LLVM IR built for the key.
+    When the cache exceeds its maximum size, the least recently used libraries are removed.
+    """
+
+    def __init__(self, path: str, max_size: typing.Optional[int] = None):
+        """Create a new compile cache.
+
+        :param path: The cache directory, created if it does not exist
+        :param max_size: Maximum size of the cache in bytes, :const:`None` for an unbounded cache
+        """
+        assert isinstance(path, str), 'Cache path must be of type str'
+        assert max_size is None or (isinstance(max_size, int) and max_size >= 0), 'Invalid maximum cache size'
+
+        self._path: str = os.path.abspath(os.path.expanduser(path))
+        self._max_size: typing.Optional[int] = max_size
+        os.makedirs(self._path, exist_ok=True)
+
+        # Statistics
+        self.hits: int = 0
+        self.misses: int = 0
+        self.last_hit: typing.Optional[bool] = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def key(self, target: typing.Any, llvm_ir: typing.Sequence[str]) -> str:
+        """Return the cache key for the LLVM IR of a set of modules compiled for a target."""
+        h = hashlib.sha256()
+        for s in (artiq.__version__, type(target).__name__, getattr(target, 'triple', ''), *llvm_ir):
+            h.update(s.encode())
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self._path, f'{key}.elf')
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        """Return the cached library or :const:`None` if the key is not in the cache."""
+        file = self._file(key)
+        try:
+            with open(file, 'rb') as f:
+                library = f.read()
+        except OSError:
+            return None
+        try:
+            # Mark the library as recently used
+            os.utime(file)
+        except OSError:
+            pass
+        return library
+
+    def put(self, key: str, library: bytes) -> None:
+        """Store a library in the cache, failures are logged and otherwise ignored."""
+        try:
+            # Write to a temporary file first, concurrent readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=self._path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(library)
+            os.replace(tmp, self._file(key))
+            if self._max_size is not None:
+                self._evict(keep=key)
+        except OSError as e:
+            _logger.warning(f'Failed to store kernel in compile cache: {e}')
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used libraries until the cache does not exceed its maximum size.
+
+        :param keep: The key of a library that is never removed
+        """
+        assert self._max_size is not None
+
+        entries = []
+        for entry in os.scandir(self._path):
+            if entry.name.endswith('.elf') and entry.path != self._file(keep):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Removed concurrently
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(s for _, s, _ in entries) + os.path.getsize(self._file(keep))
+
+        for _, s, path in sorted(entries):
+            if size <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Removed concurrently
+            size -= s
+            _logger.debug(f'Removed {os.path.basename(path)} from compile cache')
+
+    def wrap_target_cls(self, target_cls: typing.Any) -> typing.Any:
+        """Return a subclass of the given target class that uses this cache to compile and link."""
+        cache = self
+
+        class _CachedTarget(target_cls):  # type: ignore[valid-type,misc]
+            def compile_and_link(self, modules: typing.Sequence[typing.Any]) -> bytes:
+                llvm_ir = [module.build_llvm_ir(self) for module in modules]
+                key = cache.key(self, [str(ir) for ir in llvm_ir])
+                library = cache.get(key)
+                cache.last_hit = library is not None
+
+                if library is None:
+                    cache.misses += 1
+                    # The target builds the LLVM IR of every module again, let it use the IR built for the key
+                    for module, ir in zip(modules, llvm_ir):
+                        module.build_llvm_ir = lambda target, ir=ir: ir
+                    try:
+                        library = super(_CachedTarget, self).compile_and_link(modules)
+                    finally:
+                        for module in modules:
+                            del module.build_llvm_ir
+                    cache.put(key, library)
+                else:
+                    cache.hits += 1
+                return library
+
+        _CachedTarget.__name__ = target_cls.__name__
+        _CachedTarget.__qualname__ = target_cls.__qualname__
+        return _CachedTarget
+
+
+def _kernel_name(function: typing.Any) -> str:
+    """Return the qualified name of a kernel entry point (e.g. ``GateScan.run_point``)."""
+    function = getattr(function, '__func__', function)
+    return getattr(function, '__qualname__', repr(function))
+
+
+class _CompileProfile:
+    """Compile statistics of all kernels compiled by a core driver."""
+
+    _COLUMNS: typing.ClassVar[typing.Sequence[typing.Tuple[str, str, int]]] = [
+        ('Kernel', 's', -40),
+        ('Count', 'd', 5),
+        ('Total [s]', '.3f', 9),
+        ('Mean [s]', '.3f', 8),
+        ('Size [B]', 'd', 9),
+        ('Objects', 'd', 7),
+        ('RPCs', 'd', 5),
+    ]
+    """Columns of the summary table with their format and width (negative for left-aligned)."""
+
+    def __init__(self, path: str):
+        """Create a new compile profile.
+
+        :param path: The file to write the JSON report to
+        """
+        assert isinstance(path, str), 'Report path must be of type str'
+        self._path: str = os.path.abspath(os.path.expanduser(path))
+        self._records: typing.List[typing.Dict[str, typing.Any]] = []
+
+    @property
+    def records(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """The compile records in order of compilation."""
+        return self._records
+
+    def record(self, function: typing.Any, compile_time: float, kernel_size: int,
+               embedding_map: typing.Any, cache_hit: typing.Optional[bool]) -> None:
+        """Record the compile statistics of a kernel.
+
+        :param function: The kernel entry point
+        :param compile_time: The compile wall time in seconds
+        :param kernel_size: The size of the kernel library in bytes
+        :param embedding_map: The embedding map of the kernel
+        :param cache_hit: :const:`True` if the kernel was loaded from the compile cache, :const:`None` without cache
+        """
+        # Host objects embedded in the kernel, functions and methods are RPC targets
+        objects = list(getattr(embedding_map, 'object_forward_map', {}).values())
+        num_rpcs = sum(inspect.isroutine(o) for o in objects)
+
+        self._records.append({
+            'kernel': _kernel_name(function),
+            'compile_time': compile_time,
+            'kernel_size': kernel_size,
+            'num_objects': len(objects) - num_rpcs,
+            'num_rpcs': num_rpcs,
+            'cache_hit': cache_hit,
+        })
+
+    def summary(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Aggregate the records per kernel entry point, sorted by total compile time."""
+        grouped: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]] = collections.defaultdict(list)
+        for r in self._records:
+            grouped[r['kernel']].append(r)
+
+        summary = [{
+            'kernel': kernel,
+            'count': len(records),
+            'total_compile_time': sum(r['compile_time'] for r in records),
+            'mean_compile_time': sum(r['compile_time'] for r in records) / len(records),
+            'max_kernel_size': max(r['kernel_size'] for r in records),
+            'max_num_objects': max(r['num_objects'] for r in records),
+            'max_num_rpcs': max(r['num_rpcs'] for r in records),
+        } for kernel, records in grouped.items()]
+        summary.sort(key=lambda s: s['total_compile_time'], reverse=True)
+        return summary
+
+    def table(self) -> str:
+        """Return the summary as a human-readable table."""
+        def fmt_row(values: typing.Sequence[typing.Any], header: bool = False) -> str:
+            return ' '.join(f'{v:{"<" if w < 0 else ">"}{abs(w)}{"s" if header else f}}'
+                            for v, (_, f, w) in zip(values, self._COLUMNS))
+
+        header = fmt_row([c for c, _, _ in self._COLUMNS], header=True)
+        lines = [header, '-' * len(header)]
+        lines.extend(fmt_row([s['kernel'], s['count'], s['total_compile_time'], s['mean_compile_time'],
+                              s['max_kernel_size'], s['max_num_objects'], s['max_num_rpcs']])
+                     for s in self.summary())
+        return '\n'.join(lines)
+
+    def write(self) -> None:
+        """Write the JSON report, failures are logged and otherwise ignored."""
+        try:
+            with open(self._path, 'w') as f:
+                json.dump({'records': self._records, 'summary': self.summary()}, f, indent=2)
+        except OSError as e:
+            _logger.warning(f'Failed to write compile profile: {e}')
+
+
 class Core(artiq.coredevice.core.Core):
     """A backwards compatible extension of the standard core driver."""
 
-    def __init__(self, *args: typing.Any, max_kernel_size: typing.Optional[str] = None, **kwargs: typing.Any):
+    def __init__(self, *args: typing.Any, max_kernel_size: typing.Optional[str] = None,
+                 compile_cache: typing.Optional[str] = None, compile_cache_size: typing.Optional[str] = '1 GiB',
+                 compile_profile: typing.Optional[str] = None, **kwargs: typing.Any):
         """Create a new core driver.
 
         :param args: Positional arguments passed to the core driver
         :param max_kernel_size: Maximum kernel size (e.g. ``"256 MiB"``, ``"512 kB"``)
+        :param compile_cache: Directory of the on-disk compile cache, :const:`None` to disable the cache
+        :param compile_cache_size: Maximum size of the compile cache (e.g. ``"1 GiB"``), :const:`None` for no limit
+        :param compile_profile: File to write the compile profile report to when the driver is closed,
+            :const:`None` to disable profiling
         :param kwargs: Keyword arguments passed to the core driver
         """
         assert max_kernel_size is None or isinstance(max_kernel_size, str)
+        assert compile_cache is None or isinstance(compile_cache, str)
+        assert compile_cache_size is None or isinstance(compile_cache_size, str)
+        assert compile_profile is None or isinstance(compile_profile, str)
 
         # Store attributes
         self._max_kernel_size: typing.Optional[int] = _str_to_bytes(max_kernel_size)
         assert self._max_kernel_size is None or self._max_kernel_size >= 0
+        self._compile_cache: typing.Optional[_CompileCache] = None if compile_cache is None \
+            else _CompileCache(compile_cache, max_size=_str_to_bytes(compile_cache_size))
+        self._compile_profile: typing.Optional[_CompileProfile] = None if compile_profile is None \
+            else _CompileProfile(compile_profile)
 
         # Call super
         super(Core, self).__init__(*args, **kwargs)
 
+        if self._compile_cache is not None:
+            # Compile and link through the cache
+            self.target_cls = self._compile_cache.wrap_target_cls(self.target_cls)
+            _logger.debug(f'Compile cache: {self._compile_cache.path}')
+
     def compile(self, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
         # Call super
         _logger.debug('Compiling...')
+        t_start = time.perf_counter()
         embedding_map, kernel_library, symbolizer, demangler = super(Core, self).compile(*args, **kwargs)
+        compile_time = time.perf_counter() - t_start
+
+        if self._compile_cache is None:
+            # Report compile time
+            _logger.debug('Compile time: %.3f s', compile_time)
+        else:
+            # Report compile time and cache statistics
+            _logger.debug('Compile time: %.3f s (cache %s, %d hits, %d misses)', compile_time,
+                          'hit' if self._compile_cache.last_hit else 'miss',
+                          self._compile_cache.hits, self._compile_cache.misses)
 
         # Obtain kernel size in bytes
         kernel_size: int = len(kernel_library)
@@ -91,5 +354,25 @@ class Core(artiq.coredevice.core.Core):
             if kernel_size > self._max_kernel_size:
                 raise KernelSizeException(f'Kernel too large: {kernel_size}/{self._max_kernel_size} bytes')
 
+        if self._compile_profile is not None:
+            # Record compile statistics
+            self._compile_profile.record(args[0] if args else kwargs.get('function'), compile_time, kernel_size,
+                                         embedding_map,
+                                         None if self._compile_cache is None else self._compile_cache.last_hit)
+
         # Return values
         return embedding_map, kernel_library, symbolizer, demangler
+
+    @property
+    def compile_profile(self) -> typing.Optional[_CompileProfile]:
+        """The compile profile, :const:`None` if profiling is disabled."""
+        return self._compile_profile
+
+    def close(self) -> None:
+        if self._compile_profile is not None and self._compile_profile.records:
+            # Report the compile profile
+            _logger.info('Compile profile:\n%s', self._compile_profile.table())
+            self._compile_profile.write()
+
+        # Call super
+        super(Core, self).close()
@@ -20,15 +20,29 @@ class AblationModule(SafetyContext):
             "ttl1", artiq.coredevice.ttl.TTLOut
         )
 
-    def init(self) -> None:
+    def init(self, *, force: bool = False) -> None:
+        """Initialize this module.
+
+        The ablation laser is switched off by the joint system initialization kernel.
+
+        :param force: Force full initialization
+        """
         self._ablation_on = False
-        self.init_kernel()
+
+        if force:
+            self.init_kernel()
 
     @kernel
     def init_kernel(self):
         # Switch ablation laser off in the unlikely event it was on
         self.off()
 
+    @kernel
+    def init_device(self):
+        """Switch the ablation laser off on the current timeline."""
+        self._ablation_sw.off()
+        self._ablation_on = False
+
     def post_init(self) -> None:
         pass
 
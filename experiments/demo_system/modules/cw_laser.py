@@ -1,8 +1,13 @@
 import typing
 
+import numpy as np
+
+from artiq.coredevice.urukul import DEFAULT_PROFILE
+
 from dax.experiment import *
+from dax.util.units import time_to_str
 
-from demo_system.modules.util.dds import DDS9910
+from demo_system.modules.util.dds import DDSBase, DDS9910, DEFAULT_SLACK_MARGIN, latency_to_slack_mu, reset_config_batch
 from demo_system.modules.util.switch import Switch
 
 
@@ -36,6 +41,13 @@ class Laser370(DaxModule):
     _detect_freq = 200 * MHz
     _detect_amp = 1.0
 
+    # System dataset keys
+    PROFILE_MODE_KEY = "profile_mode"
+    PROFILE_LATENCY_MU_KEY = "profile_latency_mu"
+
+    MODE_PROFILES = [0, 1, 2]
+    """Single-tone profiles of the COOL, Prep, and DETECT modes in profile mode, indexed by mode."""
+
     def build(self):
         super(Laser370, self).build()
         # Instantiate laser modules
@@ -90,6 +102,28 @@ class Laser370(DaxModule):
 
         :param force: Force full initialization
         """
+        # In profile mode, the mode configurations are preloaded into profiles and modes are switched with the
+        # profile pins of the CPLD, which replaces the SPI writes to the DDS by a single CPLD write
+        self._profile_mode: bool = self.get_dataset_sys(self.PROFILE_MODE_KEY, False)
+        self._profile_latency_mu: np.int64 = self.get_dataset_sys(self.PROFILE_LATENCY_MU_KEY, np.int64(0))
+        self._profile_slack_mu: np.int64 = latency_to_slack_mu(
+            self.core, self._profile_latency_mu, self.get_dataset_sys(DDSBase.SLACK_MARGIN_KEY, DEFAULT_SLACK_MARGIN))
+        self._cpld = self._detect_prep_cool_dds._dds.cpld
+        dds = self._detect_prep_cool_dds._dds
+        self._mode_ftw: typing.List[np.int32] = [dds.frequency_to_ftw(f) for f in
+                                                 [self._cool_freq, self._prep_freq, self._detect_freq]]
+        self._mode_asf: typing.List[np.int32] = [dds.amplitude_to_asf(a) for a in
+                                                 [self._cool_amp, self._prep_amp, self._detect_amp]]
+        self.update_kernel_invariants("_profile_mode", "_profile_latency_mu", "_profile_slack_mu", "_cpld",
+                                      "_mode_ftw", "_mode_asf")
+
+        if self._profile_mode:
+            # The profile pins are shared, all other channels of the CPLD output their default in the mode profiles
+            for module in self.registry.search_modules(DDS9910).values():
+                if module is not self._detect_prep_cool_dds and module._dds.cpld is self._cpld:
+                    module.set_mirror_profiles(self.MODE_PROFILES)
+            self.logger.debug("Profile mode enabled")
+
         if force:
             # Initialize devices
             self.init_kernel()
@@ -99,20 +133,42 @@ class Laser370(DaxModule):
 
     @kernel
     def init_kernel(self, debug=False):
+        self.core.reset()
+        self.init_device(debug)
+        self.core.wait_until_mu(now_mu())
+
+    @kernel
+    def init_device(self, debug=False):
+        """Initialize all devices on the current timeline, does not reset the core or wait for completion."""
         # Initialize submodules
         for dds in self._dds_list:
-            dds.init_kernel()
+            dds.init_device(debug)
         for sw in self._sw_list:
-            sw.init_kernel()
+            sw.init_device()
+        if self._profile_mode:
+            self._load_profiles()
         # Set to Idle state
-        self.core.break_realtime()
         self.reset()
 
-
-        self.core.wait_until_mu(now_mu())
+    @kernel
+    def _load_profiles(self):
+        """Write the configuration of all modes to their profiles."""
+        for mode in range(len(self.MODE_PROFILES)):
+            self._detect_prep_cool_dds.config_profile_mu(
+                self.MODE_PROFILES[mode],
+                ftw=self._mode_ftw[mode],
+                asf=self._mode_asf[mode],
+                pow=self._detect_prep_cool_dds._default_pow,
+            )
 
     """Module Base Functions"""
 
+    @kernel
+    def invalidate_state(self):
+        """Invalidate the cached state of all DDS, see :func:`DDSBase.invalidate_state`."""
+        for dds in self._dds_list:
+            dds.invalidate_state()
+
     @kernel
     def safety_off(self):
         """Turn off all sw/dds safely"""
@@ -123,29 +179,77 @@ class Laser370(DaxModule):
         self.mode = MODES370.OFF
 
     @kernel
-    def reset(self, realtime: TBool = False):
+    def reset(self, realtime: TBool = False, update: TBool = True):
         """Reset module to default state
         :param realtime: :const:`True` to compensate for programming latencies
+        :param update: :const:`False` to leave the DDS configurations loaded, see :func:`reset_config`
         """
         # Set system to idle cooling
         self.set_state(state=True, mode=MODES370.COOL, realtime=realtime)
 
         # Reset configuration
+        self.reset_config(realtime=realtime, update=update)
         for dds in self._dds_list:
-            dds.reset_config(realtime=realtime)
             dds.reset_att(realtime=realtime)
 
+    @kernel
+    def reset_config(self, realtime: TBool = False, update: TBool = True):
+        """Reset the configuration of all DDS in a single burst with a shared IO update.
+
+        :param realtime: :const:`True` to compensate for programming latencies
+        :param update: :const:`False` to only load the configurations, which are applied by the next IO update
+        """
+        reset_config_batch(self._dds_list, realtime=realtime, update=update)
+
     @host_only
     def update_latency(self):
         """Update all latencies"""
         for dds in self._dds_list:
             dds.update_latency()
+        if self._profile_mode:
+            # Profile switching changes the output of all channels of the CPLD, only allowed in profile mode
+            self.update_profile_latency()
 
     @host_only
     def clear_latency(self):
         """Clear all latencies"""
         for dds in self._dds_list:
             dds.clear_latency()
+        self.clear_profile_latency()
+
+    @host_only
+    def update_profile_latency(self) -> None:
+        """Update the profile switching latency."""
+        # Reset the latency to zero
+        self._profile_latency_mu = np.int64(0)
+        # Obtain current latency
+        self._profile_latency_mu = self.get_profile_latency_mu()
+        # Store latency
+        self.logger.info(
+            f"Obtained latency: {self._profile_latency_mu} machine units "
+            f"({time_to_str(self.core.mu_to_seconds(self._profile_latency_mu))})"
+        )
+        self.set_dataset_sys(self.PROFILE_LATENCY_MU_KEY, self._profile_latency_mu)
+
+    @kernel
+    def get_profile_latency_mu(self) -> TInt64:
+        # Reset core
+        self.core.reset()
+
+        # Switch in real-time and capture start and end time
+        delay(1 * ms)
+        t_start_mu = now_mu()
+        self._set_profile(self.MODE_PROFILES[MODES370.COOL], realtime=True)
+        t_end_mu = now_mu()
+        self.core.wait_until_mu(t_end_mu)
+
+        # Calculate and return latency
+        return t_end_mu - t_start_mu
+
+    @host_only
+    def clear_profile_latency(self):
+        self._profile_latency_mu = np.int64(0)
+        self.set_dataset_sys(self.PROFILE_LATENCY_MU_KEY, self._profile_latency_mu)
 
     """Module functionality"""
 
@@ -165,11 +269,21 @@ class Laser370(DaxModule):
     def config_mode(self, mode: TInt32, realtime: TBool = False):
         """
         Configure the 370 laser to a specified mode, moves cursor 10ns
+        In profile mode, only the profile pins of the CPLD are changed.
+        Other channels of the CPLD output their default configuration until the mode is set to OFF,
+        which restores the default profile.
+
         :param mode: see self.STATE enumeration
         :param realtime: Compensate for programming latencies
         """
         # Configure DDS Frequency
-        if mode == MODES370.COOL:
+        if self._profile_mode:
+            if 0 <= mode < len(self.MODE_PROFILES):
+                self._set_profile(self.MODE_PROFILES[mode], realtime=realtime)
+            elif 0 <= self.mode < len(self.MODE_PROFILES):
+                # Restore the default profile, other channels of the CPLD are only configured in the default profile
+                self._set_profile(DEFAULT_PROFILE, realtime=realtime)
+        elif mode == MODES370.COOL:
             self._detect_prep_cool_dds.config_freq(self._cool_freq, realtime=realtime)
             self._detect_prep_cool_dds.config_amp(self._cool_amp, realtime=realtime)
         elif mode == MODES370.Prep:
@@ -186,6 +300,23 @@ class Laser370(DaxModule):
 
         self.mode = mode
 
+    @kernel
+    def _set_profile(self, profile: TInt32, realtime: TBool = False):
+        """Select a single-tone profile with the profile pins of the CPLD.
+
+        :param profile: The profile to select
+        :param realtime: Compensate for programming latencies
+        """
+        if realtime:
+            # Compensate for CPLD latency
+            delay_mu(-self._profile_latency_mu)
+        else:
+            # Add some slack
+            delay_mu(self._profile_slack_mu)
+
+        self._cpld.set_profile(profile)
+        # No need for negative latency compensation, Artiq timeline moves ahead in `set_profile`
+
     @kernel
     def set_shutter(self, state: TBool, realtime: TBool = False):
         """
@@ -238,14 +369,26 @@ class Laser355(DaxModule):
 
     @kernel
     def init_kernel(self):
+        self.core.reset()
+        self.init_device()
+        self.core.wait_until_mu(now_mu())
+
+    @kernel
+    def init_device(self):
+        """Initialize all devices on the current timeline, does not reset the core or wait for completion."""
         for dds in self._dds_list:
-            dds.init_kernel()
+            dds.init_device()
 
-        self.core.break_realtime()
         self.reset()
 
     """Module Base Functions"""
 
+    @kernel
+    def invalidate_state(self):
+        """Invalidate the cached state of all DDS, see :func:`DDSBase.invalidate_state`."""
+        for dds in self._dds_list:
+            dds.invalidate_state()
+
     @kernel
     def safety_off(self):
         """Turn off all sw/dds safely"""
@@ -253,18 +396,28 @@ class Laser355(DaxModule):
             dds.safety_off()
 
     @kernel
-    def reset(self, realtime: TBool = False):
+    def reset(self, realtime: TBool = False, update: TBool = True):
         """Reset laser state to default state
         :param realtime: :const:`True` to compensate for programming latencies
+        :param update: :const:`False` to leave the DDS configurations loaded, see :func:`reset_config`
         """
         # Set output to default
         self.set_shutter(state=False, realtime=realtime)
 
         # Reset DDS Configs
+        self.reset_config(realtime=realtime, update=update)
         for dds in self._dds_list:
-            dds.reset_config(realtime=realtime)
             dds.reset_att(realtime=realtime)
 
+    @kernel
+    def reset_config(self, realtime: TBool = False, update: TBool = True):
+        """Reset the configuration of all DDS in a single burst with a shared IO update.
+
+        :param realtime: :const:`True` to compensate for programming latencies
+        :param update: :const:`False` to only load the configurations, which are applied by the next IO update
+        """
+        reset_config_batch(self._dds_list, realtime=realtime, update=update)
+
     @host_only
     def update_latency(self):
         """Update all latencies"""
@@ -32,6 +32,9 @@ class MicrowaveModule(DDS9910, BinaryStateController, DaxModule):
             default_state=False
         )
 
+        # Functions to call when the Rabi frequency is stored
+        self._rabi_freq_listeners: typing.List[typing.Callable[[float], None]] = []
+
     def init(self, *, force: bool = False) -> None:
         """Initialize this module.
 
@@ -105,10 +108,28 @@ class MicrowaveModule(DDS9910, BinaryStateController, DaxModule):
 
     @host_only
     def store_rabi_freq(self, freq: float) -> None:
-        """Store the microwave Rabi frequency in the dataset."""
+        """Store the microwave Rabi frequency in the dataset and use it for subsequent operations.
+
+        Kernels compiled after this call use the new Rabi frequency.
+        """
         assert isinstance(freq, float)
         assert 0 * MHz < freq < 400 * MHz
         self.set_dataset_sys(self.RABI_FREQ_KEY, freq)
+        self._rabi_freq = freq
+        self.set_default_pulse_duration(self.pi_time())
+        for listener in self._rabi_freq_listeners:
+            listener(freq)
+
+    @host_only
+    def add_rabi_freq_listener(self, listener: typing.Callable[[float], None]) -> None:
+        """Add a function that is called with the new Rabi frequency when the Rabi frequency is stored.
+
+        Used to invalidate values derived from the Rabi frequency, see :func:`store_rabi_freq`.
+
+        :param listener: The function to call
+        """
+        assert callable(listener), "Listener must be callable"
+        self._rabi_freq_listeners.append(listener)
 
     @kernel
     def _microwave_set(self, state: TBool):
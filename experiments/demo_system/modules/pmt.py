@@ -53,14 +53,19 @@ class PmtModule(DaxModule):
         # For initialization, always reset core first
         self.core.reset()
 
+        self.init_device()
+
+        # Wait until all events have been submitted, always required for initialization
+        self.core.wait_until_mu(now_mu())
+
+    @kernel
+    def init_device(self):
+        """Initialize the PMT TTL pins on the current timeline, does not reset the core or wait for completion."""
         # Set direction of PMT TTL pins
         for ttl in self._ttl:
             ttl.input()
             delay_mu(np.int64(self.core.ref_multiplier))  # Added minimal delay to make the events sequential
 
-        # Wait until all events have been submitted, always required for initialization
-        self.core.wait_until_mu(now_mu())
-
     def post_init(self) -> None:
         pass
 
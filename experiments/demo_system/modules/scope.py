@@ -1,6 +1,7 @@
 from dax.experiment import *
 
 from time import sleep
+import threading
 import numpy as np
 import io
 from artiq.experiment import *
@@ -22,10 +23,23 @@ class ScopeModule(DaxModule):
             self.update_kernel_invariants("scope")
 
     def init(self):
-        self.setup()
+        # Set up the scope in the background, overlapping with the initialization kernel
+        self._setup_error = None
+        self._setup_thread = threading.Thread(target=self._setup_background, name="scope_setup", daemon=True)
+        self._setup_thread.start()
 
     def post_init(self):
-        pass
+        # Wait for the scope setup to finish and raise any error of the setup
+        self._setup_thread.join()
+        if self._setup_error is not None:
+            raise self._setup_error
+
+    def _setup_background(self):
+        """Set up the scope and capture any exception, which is raised again by :func:`post_init`."""
+        try:
+            self.setup()
+        except Exception as e:
+            self._setup_error = e
 
     def setup(self, reset=False, sleep_time=3.0):
         if not self.in_sim:
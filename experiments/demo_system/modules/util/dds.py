@@ -1,23 +1,81 @@
+import typing
 import numpy as np
 import abc
 
 import artiq.coredevice.ad9910
 import artiq.coredevice.ad9912
+from artiq.coredevice.urukul import DEFAULT_PROFILE
 
 from dax.experiment import *
 from dax.util.units import time_to_str
 
 
+DEFAULT_SLACK: float = 200 * us
+"""Slack added before non-realtime operations with an uncalibrated latency."""
+DEFAULT_SLACK_MARGIN: float = 10 * us
+"""Default margin added to calibrated latencies for non-realtime operations."""
+
+
+def latency_to_slack_mu(core, latency_mu: int, margin: float) -> np.int64:
+    """Return the slack added before a non-realtime operation.
+
+    :param core: The core device
+    :param latency_mu: The calibrated latency of the operation in machine units, zero if not calibrated
+    :param margin: The margin added to a calibrated latency in seconds
+    :return: The calibrated latency plus the margin, or the default slack if the latency is not calibrated
+    """
+    if latency_mu > 0:
+        return np.int64(latency_mu + core.seconds_to_mu(margin))
+    return np.int64(core.seconds_to_mu(DEFAULT_SLACK))
+
+
+@kernel
+def reset_config_batch(dds_list, realtime: TBool = False, update: TBool = True):
+    """Reset the configuration of multiple DDS in a single burst with a shared IO update.
+
+    The configurations are loaded back-to-back after a single slack delay and applied by one IO update.
+    All DDS must share the same CPLD and be of the same type.
+
+    :param dds_list: The DDS modules
+    :param realtime: :const:`True` to compensate for programming latencies
+    :param update: :const:`False` to only load the configurations, which are applied by the next IO update
+    """
+    t_update_mu = now_mu()
+    if realtime:
+        # Compensate for the latency of all writes
+        latency_mu = np.int64(0)
+        for dds in dds_list:
+            latency_mu += dds._config_latency_mu
+        delay_mu(-latency_mu)
+    else:
+        # Add the largest slack of all writes
+        slack_mu = np.int64(0)
+        for dds in dds_list:
+            slack_mu = max(slack_mu, dds._config_slack_mu)
+        delay_mu(slack_mu)
+
+    for dds in dds_list:
+        dds.load_reset_config()
+
+    if update:
+        if realtime:
+            # Apply at the original time, unless the writes took longer than the calibrated latencies
+            at_mu(max(now_mu(), t_update_mu))
+        dds_list[0].io_update()
+
+
 class DDSBase(DaxModule, abc.ABC):
     CONFIG_LATENCY_MU_KEY = "dds_latency_mu"
     SW_LATENCY_MU_KEY = "sw_latency_mu"
     ATT_LATENCY_MU_KEY = "att_latency_mu"
+    SLACK_MARGIN_KEY = "slack_margin"
 
     FREQ_KEY = "freq"
     PHASE_KEY = "phase"
     ATT_KEY = "att"
     SW_KEY = "sw"
     MIN_ATT_KEY = "min_att"
+    INIT_SKIP_UNCHANGED_KEY = "init_skip_unchanged"
 
     # noinspection PyMethodOverriding
     def build(
@@ -58,21 +116,67 @@ class DDSBase(DaxModule, abc.ABC):
         :param debug: `True` to not reset the switch state"""
         # Reset DDS Configuration
         self.core.reset()
+        self.init_device(debug)
+        self.core.wait_until_mu(now_mu())
+
+    @kernel
+    def init_device(self, debug: TBool = False):
+        """Initialize the DDS on the current timeline, does not reset the core or wait for completion.
+
+        Used to initialize multiple devices in a single kernel.
+        If skip-if-unchanged initialization is enabled, the DDS is only initialized
+        if the hardware state differs from the default state.
+
+        :param debug: `True` to not reset the switch state
+        """
+        if self._init_skip_unchanged and self._device_in_default_state():
+            # Hardware is already in the default state, the switch state can not be read back
+            self.core.break_realtime()
+            if not debug:
+                self.reset_sw()
+            return
+
         self._dds.init()
+        self._config_valid = False
+        self._att_valid = False
+        # DDS initialization reads from the device, which consumes all slack
         self.core.break_realtime()
         self.reset_config()
-        self.core.break_realtime()
+        self._init_profiles()
         self.reset_att()
         if not debug:
-            self.core.break_realtime()
             self.reset_sw()
 
-        self.core.wait_until_mu(now_mu())
+    @kernel
+    def _init_profiles(self):
+        """Initialize additional profiles of the DDS, called by :func:`init_device` after the configuration reset."""
+        pass
+
+    @host_only
+    def _init_slack(self) -> None:
+        """Derive the slack of non-realtime operations from the calibrated latencies."""
+        self._slack_margin: float = self.get_dataset_sys(self.SLACK_MARGIN_KEY, DEFAULT_SLACK_MARGIN)
+        self._config_slack_mu: np.int64 = latency_to_slack_mu(self.core, self._config_latency_mu, self._slack_margin)
+        self._att_slack_mu: np.int64 = latency_to_slack_mu(self.core, self._att_latency_mu, self._slack_margin)
+        self.update_kernel_invariants("_slack_margin", "_config_slack_mu", "_att_slack_mu")
 
     @host_only
     def post_init(self) -> None:
         pass
 
+    @property
+    def ttl(self) -> typing.Any:
+        """The TTL device of the RF switch of the DDS."""
+        return self._dds.sw
+
+    @abc.abstractmethod
+    def _device_in_default_state(self) -> TBool:
+        """Read back the hardware state and compare it to the default state, consumes all slack.
+
+        :return: :const:`True` if the configuration and attenuation of the hardware match the defaults
+        """
+        pass
+
     """DDS Operations"""
 
     @abc.abstractmethod
@@ -83,26 +187,60 @@ class DDSBase(DaxModule, abc.ABC):
     def reset_config():
         pass
 
+    @abc.abstractmethod
+    def load_reset_config(self) -> TBool:
+        """Load the default configuration without applying it, see :func:`io_update`.
+
+        :return: :const:`True` if the DDS was written
+        """
+        pass
+
+    @kernel
+    def io_update(self):
+        """Pulse the IO update of the CPLD.
+
+        The IO update is shared by all channels of the CPLD and applies all loaded configurations simultaneously.
+        """
+        self._dds.cpld.io_update.pulse_mu(8)
+
     @kernel
     def config_att(self, att: TFloat, realtime: TBool = False):
         """Configure the attenuation.
 
+        The attenuator is not written if this module already set it to the same value.
+
         :param att: Attenuation in dB
         :param realtime: :const:`True` to compensate for programming latencies
         """
+        if self._att_valid and att == self._current_att:
+            # Attenuator already set
+            return
+
         if realtime:
             # Compensate for latency
             delay_mu(-self._att_latency_mu)
         else:
             # Add some slack
-            delay(200 * us)
+            delay_mu(self._att_slack_mu)
 
         if att >= self._min_att:
             # Configure att
             self._dds.set_att(att)
+            self._current_att = att
+            self._att_valid = True
         else:
             self.logger.error("Attenuation Set Out of Range")
 
+    @kernel
+    def invalidate_state(self):
+        """Invalidate the cached configuration and attenuator state.
+
+        The next configuration and attenuator calls will write to the hardware.
+        Required before recording a DMA sequence, as skipped writes would be missing from the recording.
+        """
+        self._config_valid = False
+        self._att_valid = False
+
     @kernel
     def reset_att(self, realtime: TBool = False):
         """Reset DDS attenuation to default state
@@ -173,6 +311,8 @@ class DDSBase(DaxModule, abc.ABC):
 
         # Reset the system
         self.reset_config()
+        # Force the next write, it would otherwise be skipped
+        self.invalidate_state()
         # Reset in real-time and capture start and end time
         delay(1 * ms)
         t_start_mu = now_mu()
@@ -212,6 +352,8 @@ class DDSBase(DaxModule, abc.ABC):
 
         # Reset the system
         self.reset_att()
+        # Force the next write, it would otherwise be skipped
+        self.invalidate_state()
         # Reset in real-time and capture start and end time
         delay(1 * ms)
         t_start_mu = now_mu()
@@ -235,9 +377,17 @@ class DDSBase(DaxModule, abc.ABC):
     def store_sw_latency(self, latency: TInt32):
         self.set_dataset_sys(self.SW_LATENCY_MU_KEY, latency)
 
+    @host_only
+    def clear_sw_latency(self):
+        self._sw_latency_mu = np.int64(0)
+        self.set_dataset_sys(self.SW_LATENCY_MU_KEY, self._sw_latency_mu)
+
     @host_only
     def update_latency(self):
-        self.update_sw_latency()
+        """Update the attenuator and configuration latencies.
+
+        The switch latency requires a loopback measurement, see :class:`demo_system.services.latency.LatencyService`.
+        """
         self.update_att_latency()
         self.update_config_latency()
 
@@ -295,6 +445,7 @@ class DDS9912(DDSBase):
         self._att_latency_mu: np.int64 = self.get_dataset_sys(
             self.ATT_LATENCY_MU_KEY, np.int64(0)
         )
+        self._init_slack()
 
         self._default_freq: float = self.get_dataset_sys(
             self.FREQ_KEY, self._default_freq
@@ -305,6 +456,10 @@ class DDS9912(DDSBase):
         self._default_att: float = self.get_dataset_sys(self.ATT_KEY, self._default_att)
         self._default_sw: bool = self.get_dataset_sys(self.SW_KEY, self._default_sw)
         self._min_att: float = self.get_dataset_sys(self.MIN_ATT_KEY, self._min_att)
+        self._init_skip_unchanged: bool = self.get_dataset_sys(self.INIT_SKIP_UNCHANGED_KEY, False)
+        # The demo system DDS drivers (see the device DB) load configurations without IO update,
+        # simulation drivers apply them immediately, hardware requires the demo system drivers to compile
+        self._batch_config: bool = hasattr(self._dds, "load_mu")
 
         self._default_ftw: TInt64 = self._dds.frequency_to_ftw(self._default_freq)
         # Bug: For some reason, this is returning as an int64, though `turns_to_pow` marks retrun type of int64
@@ -314,6 +469,8 @@ class DDS9912(DDSBase):
             "_config_latency_mu",
             "_sw_latency_mu",
             "_att_latency_mu",
+            "_init_skip_unchanged",
+            "_batch_config",
             "_default_freq",
             "_default_phase",
             "_default_att",
@@ -326,10 +483,25 @@ class DDS9912(DDSBase):
         # Set current values based on default
         self._current_ftw: TInt64 = self._dds.frequency_to_ftw(self._default_freq)
         self._current_pow: TInt32 = np.int32(self._dds.turns_to_pow(self._default_phase))
+        # The current values only reflect the hardware after the first write
+        self._config_valid: bool = False
+        self._current_att: float = self._default_att
+        self._att_valid: bool = False
 
         if force:
             self.init_kernel()
 
+    @kernel
+    def _device_in_default_state(self) -> TBool:
+        ftw, pow_ = self._dds.get_mu()
+        self.core.break_realtime()
+        # Read all attenuators, also synchronizes the attenuator register of the CPLD driver
+        self._dds.cpld.get_att_mu()
+        self.core.break_realtime()
+        att_mu = self._dds.get_att_mu()
+        return (ftw == self._default_ftw and pow_ == self._default_pow
+                and att_mu == self._dds.cpld.att_to_mu(self._default_att))
+
     @kernel
     def config(
         self,
@@ -352,26 +524,58 @@ class DDS9912(DDSBase):
     def config_mu(self, ftw: TInt64, pow: TInt32, realtime: TBool = False):
         """Configure the dds in mu for faster control.
 
+        The DDS is not written if the configuration is unchanged.
+
         :param ftw: Frequency in ftw
         :param pow: Phase in pow
         :param realtime: :const:`True` to compensate for programming latencies
         """
+        if self._config_valid and ftw == self._current_ftw and pow == self._current_pow:
+            # Configuration unchanged
+            return
 
         if realtime:
             # Compensate for DDS latency
             delay_mu(-self._config_latency_mu)
         else:
             # Add some slack
-            delay(200 * us)
+            delay_mu(self._config_slack_mu)
 
         self._dds.set_mu(ftw=ftw, pow_=pow)
 
         # Update current freq/phase mu values
         self._current_ftw = ftw
         self._current_pow = pow
+        self._config_valid = True
 
         # No need for negative latency compensation, Artiq timeline moves ahead in `set`
 
+    @kernel
+    def load_config_mu(self, ftw: TInt64, pow: TInt32) -> TBool:
+        """Load a configuration in mu without applying it, the cursor moves ahead with the SPI transfer.
+
+        Loaded configurations of all channels of the same CPLD are applied simultaneously by :func:`io_update`.
+        If the DDS driver does not support loading, the configuration is applied immediately.
+        The DDS is not written if the configuration is unchanged.
+
+        :param ftw: Frequency in ftw
+        :param pow: Phase in pow
+        :return: :const:`True` if the DDS was written
+        """
+        if self._config_valid and ftw == self._current_ftw and pow == self._current_pow:
+            # Configuration unchanged
+            return False
+
+        if self._batch_config:
+            self._dds.load_mu(ftw=ftw, pow_=pow)
+        else:
+            self._dds.set_mu(ftw=ftw, pow_=pow)
+
+        self._current_ftw = ftw
+        self._current_pow = pow
+        self._config_valid = True
+        return True
+
     @kernel
     def config_freq_mu(self, ftw: TInt64, realtime: TBool = False):
         """Configure the dds frequency, use default phase.
@@ -419,6 +623,14 @@ class DDS9912(DDSBase):
             realtime=realtime,
         )
 
+    @kernel
+    def load_reset_config(self) -> TBool:
+        """Load the default configuration without applying it, see :func:`load_config_mu`.
+
+        :return: :const:`True` if the DDS was written
+        """
+        return self.load_config_mu(ftw=self._default_ftw, pow=self._default_pow)
+
 
 class DDS9910(DDSBase):
     AMP_KEY = "amp"
@@ -457,6 +669,10 @@ class DDS9910(DDSBase):
         self._dds = self.get_device(dds_key, artiq.coredevice.ad9910.AD9910)
         self.update_kernel_invariants("_dds")
 
+        # Single-tone profiles that hold the default configuration, see :func:`set_mirror_profiles`
+        self._mirror_profiles: typing.List[int] = []
+        self.update_kernel_invariants("_mirror_profiles")
+
         # Store default values
         self._default_freq = default_freq
         self._default_amp = default_amp
@@ -478,6 +694,7 @@ class DDS9910(DDSBase):
         self._att_latency_mu: np.int64 = self.get_dataset_sys(
             self.ATT_LATENCY_MU_KEY, np.int64(0)
         )
+        self._init_slack()
 
         self._default_freq: float = self.get_dataset_sys(
             self.FREQ_KEY, self._default_freq
@@ -488,6 +705,10 @@ class DDS9910(DDSBase):
         self._default_att: float = self.get_dataset_sys(self.ATT_KEY, self._default_att)
         self._default_sw: bool = self.get_dataset_sys(self.SW_KEY, self._default_sw)
         self._min_att: float = self.get_dataset_sys(self.MIN_ATT_KEY, self._min_att)
+        self._init_skip_unchanged: bool = self.get_dataset_sys(self.INIT_SKIP_UNCHANGED_KEY, False)
+        # The demo system DDS drivers (see the device DB) load configurations without IO update,
+        # simulation drivers apply them immediately, hardware requires the demo system drivers to compile
+        self._batch_config: bool = hasattr(self._dds, "load_mu")
         self._max_amp: float = self.get_dataset_sys(self.MAX_AMP_KEY, self._max_amp)
         self._max_asf: float = self._dds.amplitude_to_asf(self._max_amp)
 
@@ -498,6 +719,8 @@ class DDS9910(DDSBase):
             "_config_latency_mu",
             "_sw_latency_mu",
             "_att_latency_mu",
+            "_init_skip_unchanged",
+            "_batch_config",
             # "_default_freq",
             # "_default_phase",
             # "_default_att",
@@ -517,10 +740,43 @@ class DDS9910(DDSBase):
         self._current_ftw: TInt32 = self._dds.frequency_to_ftw(self._default_freq)
         self._current_asf: TInt32 = self._dds.amplitude_to_asf(self._default_amp)
         self._current_pow: TInt32 = self._dds.turns_to_pow(self._default_phase)
+        # The current values only reflect the hardware after the first write
+        self._config_valid: bool = False
+        self._current_att: float = self._default_att
+        self._att_valid: bool = False
 
         if force:
             self.init_kernel()
 
+    @host_only
+    def set_mirror_profiles(self, profiles: typing.Sequence[int]) -> None:
+        """Write the default configuration of this DDS to additional single-tone profiles at initialization.
+
+        The profile pins of an Urukul are shared by all channels.
+        If the profile pins are used to switch the configuration of one channel,
+        the other channels output their default configuration while such a profile is selected.
+        Configuration writes only go to the default profile and do not affect the mirror profiles.
+        Must be called before this DDS is initialized.
+
+        :param profiles: The profiles to write the default configuration to
+        """
+        assert all(0 <= p <= 7 for p in profiles), "Profile out of range"
+        self._mirror_profiles = sorted({int(p) for p in profiles} - {DEFAULT_PROFILE})
+
+    @kernel
+    def _device_in_default_state(self) -> TBool:
+        in_default_state = True
+        for profile in [DEFAULT_PROFILE] + self._mirror_profiles:
+            ftw, pow_, asf = self._dds.get_mu(profile)
+            self.core.break_realtime()
+            in_default_state = (in_default_state and ftw == self._default_ftw and pow_ == self._default_pow
+                                and asf == self._default_asf)
+        # Read all attenuators, also synchronizes the attenuator register of the CPLD driver
+        self._dds.cpld.get_att_mu()
+        self.core.break_realtime()
+        att_mu = self._dds.get_att_mu()
+        return in_default_state and att_mu == self._dds.cpld.att_to_mu(self._default_att)
+
     """DDS Operations"""
     @portable
     def set_default_freq(self, freq: TFloat):
@@ -565,26 +821,91 @@ class DDS9910(DDSBase):
     def config_mu(self, ftw: TInt32, asf: TInt32, pow: TInt32, realtime: TBool = False):
         """Configure the dds in mu for faster control.
 
+        The DDS is not written if the configuration is unchanged.
+
         :param ftw: Frequency in ftw
         :param asf: Amplitude in asf
         :param pow: Phase in pow
         :param realtime: :const:`True` to compensate for programming latencies
         """
+        if self._config_valid and ftw == self._current_ftw and asf == self._current_asf and pow == self._current_pow:
+            # Configuration unchanged
+            return
+
         if realtime:
             # Compensate for DDS latency
             delay_mu(-self._config_latency_mu)
         else:
             # Add some slack
-            delay(200 * us)
+            delay_mu(self._config_slack_mu)
 
         if asf <= self._max_asf:
             self._dds.set_mu(ftw=ftw, pow_=pow, asf=asf)
         else:
             self.logger.error("Amplitude Set out of range")
+            return
+
+        self._current_ftw = ftw
+        self._current_asf = asf
+        self._current_pow = pow
+        self._config_valid = True
+
+    @kernel
+    def load_config_mu(self, ftw: TInt32, asf: TInt32, pow: TInt32) -> TBool:
+        """Load a configuration in mu without applying it, the cursor moves ahead with the SPI transfer.
+
+        Loaded configurations of all channels of the same CPLD are applied simultaneously by :func:`io_update`.
+        Used to reconfigure multiple channels in a single burst.
+        If the DDS driver does not support loading, the configuration is applied immediately.
+        The DDS is not written if the configuration is unchanged.
+
+        :param ftw: Frequency in ftw
+        :param asf: Amplitude in asf
+        :param pow: Phase in pow
+        :return: :const:`True` if the DDS was written
+        """
+        if self._config_valid and ftw == self._current_ftw and asf == self._current_asf and pow == self._current_pow:
+            # Configuration unchanged
+            return False
+
+        if asf > self._max_asf:
+            self.logger.error("Amplitude Set out of range")
+            return False
+
+        if self._batch_config:
+            self._dds.load_mu(ftw=ftw, pow_=pow, asf=asf)
+        else:
+            self._dds.set_mu(ftw=ftw, pow_=pow, asf=asf)
 
         self._current_ftw = ftw
         self._current_asf = asf
         self._current_pow = pow
+        self._config_valid = True
+        return True
+
+    @kernel
+    def _init_profiles(self):
+        for profile in self._mirror_profiles:
+            self.config_profile_mu(profile, ftw=self._default_ftw, asf=self._default_asf, pow=self._default_pow)
+
+    @kernel
+    def config_profile_mu(self, profile: TInt32, ftw: TInt32, asf: TInt32, pow: TInt32):
+        """Write a configuration to a single-tone profile in mu, adds slack before writing.
+
+        The configuration is output when the profile pins of the CPLD select the profile.
+        The cached configuration of this DDS is not changed.
+
+        :param profile: The profile to write ``[0, 7]``
+        :param ftw: Frequency in ftw
+        :param asf: Amplitude in asf
+        :param pow: Phase in pow
+        """
+        delay_mu(self._config_slack_mu)
+
+        if asf <= self._max_asf:
+            self._dds.set_mu(ftw=ftw, pow_=pow, asf=asf, profile=profile)
+        else:
+            self.logger.error("Amplitude Set out of range")
 
     @kernel
     def config_freq_mu(self, ftw: TInt32, realtime: TBool = False):
@@ -654,6 +975,14 @@ class DDS9910(DDSBase):
             realtime=realtime,
         )
 
+    @kernel
+    def load_reset_config(self) -> TBool:
+        """Load the default configuration without applying it, see :func:`load_config_mu`.
+
+        :return: :const:`True` if the DDS was written
+        """
+        return self.load_config_mu(ftw=self._default_ftw, asf=self._default_asf, pow=self._default_pow)
+
 
 class AmbiguousStateError(RuntimeError):
     """Raised if the state of the master switch is ambiguous.
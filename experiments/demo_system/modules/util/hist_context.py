@@ -0,0 +1,80 @@
+import typing
+
+import numpy as np
+
+import dax.modules.hist_context
+from dax.experiment import *
+from dax.interfaces.detection import DetectionInterface
+
+from demo_system.util.histogram import CountData
+
+__all__ = ['HistogramContext']
+
+
+class HistogramContext(dax.modules.hist_context.HistogramContext):
+    """A backwards compatible extension of the DAX histogram context."""
+
+    @rpc(flags={'async'})
+    def append_block(self, data, num_shots):  # type: (typing.Sequence[typing.Sequence[int]], int) -> None
+        """Append a block of PMT data to the histogram buffer.
+
+        The block is a 2-dimensional array of PMT counts (shots x channels).
+        Only the first ``num_shots`` rows of the block are appended, which allows
+        a fixed-size buffer to be reused for partially filled blocks.
+
+        :param data: A 2-dimensional array with the PMT counts of different ions per shot
+        :param num_shots: The number of valid shots in the block
+        :raises HistogramContextError: Raised if called out of context
+        """
+        data = np.asarray(data)
+        assert data.ndim == 2, 'Data block must be 2-dimensional'
+        assert 0 <= num_shots <= len(data), 'Number of shots out of range'
+
+        if not self._in_context:
+            raise dax.modules.hist_context.HistogramContextError(
+                'The histogram append function can only be called inside the histogram context')
+        # Extend the buffer with the whole block, shots are stored as lists like appended shots
+        self._buffer.extend(data[:num_shots].tolist())
+
+    @host_only
+    def get_count_data(self, dataset_key: typing.Optional[str] = None) -> CountData:
+        """Obtain the raw data of a specific key as a contiguous count array.
+
+        The returned object provides vectorized alternatives for :func:`get_histograms`,
+        :func:`get_probabilities`, and :func:`get_mean_counts`.
+
+        :param dataset_key: Key of the dataset to obtain the data of
+        :return: The count data (points x samples x channels)
+        """
+        return CountData.from_raw(self.get_raw(dataset_key))
+
+    @host_only
+    def get_probabilities_array(self, dataset_key: typing.Optional[str] = None, *,
+                                state_detection_threshold: typing.Optional[int] = None) -> np.ndarray:
+        """Obtain the state probabilities of a specific key as an array.
+
+        Vectorized alternative for :func:`get_probabilities`.
+        Points with a different number of samples are supported, but are processed per point.
+
+        :param dataset_key: Key of the dataset to obtain the probabilities of
+        :param state_detection_threshold: State detection threshold, uses the system default if not provided
+        :return: Array with probabilities indexed as ``[channel][point]``
+        """
+        if state_detection_threshold is None:
+            state_detection_threshold = self.registry.find_interface(
+                DetectionInterface).get_state_detection_threshold()
+
+        raw = self.get_raw(dataset_key)
+        if any(len(p) != len(raw[0]) for p in raw):
+            # Ragged data, process per point
+            return np.asarray([np.mean(np.asarray(p) > state_detection_threshold, axis=0) for p in raw]).transpose()
+        return CountData.from_raw(raw).probabilities(state_detection_threshold)
+
+    @host_only
+    def get_num_samples(self, dataset_key: typing.Optional[str] = None) -> np.ndarray:
+        """Obtain the number of samples of each point of a specific key.
+
+        :param dataset_key: Key of the dataset to obtain the number of samples of
+        :return: Array with the number of samples indexed as ``[point]``
+        """
+        return np.asarray([len(p) for p in self.get_raw(dataset_key)], dtype=np.int64)
@@ -42,6 +42,11 @@ class Switch(DaxModule):
         if force:
             self.init_kernel()
 
+    @property
+    def ttl(self) -> artiq.coredevice.ttl.TTLOut:
+        """The TTL device of the switch."""
+        return self._sw
+
     @portable
     def current_state(self) -> TBool:
         return self._current_state
@@ -50,10 +55,15 @@ class Switch(DaxModule):
     def init_kernel(self):
         self.core.reset()
         self.core.break_realtime()
-        self.reset()
+        self.init_device()
         # Wait until event is submitted
         self.core.wait_until_mu(now_mu())
 
+    @kernel
+    def init_device(self):
+        """Initialize the switch on the current timeline, does not reset the core or wait for completion."""
+        self.reset()
+
     def post_init(self) -> None:
         pass
 
@@ -84,6 +94,21 @@ class Switch(DaxModule):
             # Compensate for latency, switch set is a 0-time operation in Artiq
             delay_mu(self._sw_latency_mu)
 
+    """Latency Compensations"""
+
+    @host_only
+    def set_latency(self, latency: TInt64) -> None:
+        self._sw_latency_mu = latency
+
+    @host_only
+    def store_latency(self, latency: TInt64) -> None:
+        self.set_dataset_sys(self.LATENCY_MU_KEY, latency)
+
+    @host_only
+    def clear_latency(self) -> None:
+        self._sw_latency_mu = np.int64(0)
+        self.set_dataset_sys(self.LATENCY_MU_KEY, self._sw_latency_mu)
+
     @kernel
     def reset(self, realtime: TBool = False):
         """Reset SW state to default state
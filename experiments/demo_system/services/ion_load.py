@@ -13,6 +13,7 @@ from demo_system.services.cool_prep import CoolInitService
 from demo_system.services.detection import DetectionService
 
 from demo_system.modules.cw_laser import Laser355, MODES370
+from demo_system.util.ion_templates import default_templates, normalize_templates
 
 
 class IonLoadError(RuntimeError):
@@ -52,6 +53,8 @@ class IonLoadService(DaxService):
     LOAD_DETECTION_WINDOW_KEY: typing.ClassVar[str] = 'load_detection_window'
     LOAD_MAX_TIME_KEY: typing.ClassVar[str] = 'load_max_time'
     LOAD_NUM_RELEASES_KEY: typing.ClassVar[str] = 'load_num_releases'
+    ION_TEMPLATES_KEY: typing.ClassVar[str] = 'ion_templates'
+    LOAD_PLOT_INTERVAL_KEY: typing.ClassVar[str] = 'load_plot_interval'
 
     def build(self) -> None:
         # Get modules
@@ -85,6 +88,24 @@ class IonLoadService(DaxService):
         self._load_detection_window: float = self.get_dataset_sys(self.LOAD_DETECTION_WINDOW_KEY, 100 * ms)
         self._load_max_time: float = self.get_dataset_sys(self.LOAD_MAX_TIME_KEY, 300 * s)
         self._load_num_releases: int = self.get_dataset_sys(self.LOAD_NUM_RELEASES_KEY, 10)
+        # Interval of count plot updates and pause checks during loading, independent of the detection window
+        self._load_plot_interval: float = self.get_dataset_sys(self.LOAD_PLOT_INTERVAL_KEY, 500 * ms)
+
+        # Ion count classifier, the templates are normalized once and flattened to a (ions x channels) table
+        templates = self.get_dataset_sys(self.ION_TEMPLATES_KEY, default_templates(PmtModule.NUM_CHANNELS).tolist())
+        templates = normalize_templates(templates)
+        assert templates.shape[1] == PmtModule.NUM_CHANNELS, 'Ion templates do not match the number of PMT channels'
+        self._num_templates: np.int32 = np.int32(templates.shape[0])
+        self._ion_templates: typing.List[np.int32] = [np.int32(t) for t in templates.ravel()]
+
+        # Default loading configuration in machine units for loading from a kernel, see reload_ions()
+        self._load_max_time_mu: np.int64 = self.core.seconds_to_mu(self._load_max_time)
+        self._load_detection_delay_mu: np.int64 = np.int64(self.core.ref_multiplier)
+        self._load_plot_decimation: np.int32 = np.int32(max(round(self._load_plot_interval /
+                                                                  self._load_detection_window), 1))
+        self.update_kernel_invariants('_load_detection_window', '_load_max_time_mu',
+                                      '_load_detection_delay_mu', '_load_plot_decimation')
+        self.update_kernel_invariants('_num_templates', '_ion_templates')
 
     def post_init(self) -> None:
         pass
@@ -153,6 +174,8 @@ class IonLoadService(DaxService):
         num_releases = np.int32(num_releases)
         max_time_mu = self.core.seconds_to_mu(max_time)
         detection_delay_mu = np.int64(max(self.core.seconds_to_mu(detection_delay), self.core.ref_multiplier))
+        # Number of detection windows aggregated in a single plot update
+        plot_decimation = np.int32(max(round(self._load_plot_interval / (detection_window + detection_delay)), 1))
 
         # Initial assumption is that there are no ions
         current_num_ions = 0
@@ -182,7 +205,8 @@ class IonLoadService(DaxService):
                 cool_after_loading=cool_after_loading,
                 detection_window=detection_window,
                 detection_delay_mu=detection_delay_mu,
-                ion_absence_threshold=ion_absence_threshold
+                ion_absence_threshold=ion_absence_threshold,
+                plot_decimation=plot_decimation
             )
 
             # Log messages
@@ -209,6 +233,37 @@ class IonLoadService(DaxService):
                 raise IonLoadError(f'Could not strictly load requested number of ions: '
                                    f'{current_num_ions} ion(s) loaded instead of {num_ions} ion(s)')
 
+    @kernel
+    def reload_ions(self, num_ions: TInt32):
+        """Load ions from a running kernel with the default loading configuration.
+
+        Kernel alternative for :func:`load_ions`, for example to recover from ion loss during an experiment.
+        Loading is attempted only once and a pause request aborts loading.
+        The core device is reset, all pending output must be completed before calling this function.
+
+        :param num_ions: Number of ions to load
+        :raises IonLoadError: Raised if the desired number of ions could not be loaded
+        """
+        current_num_ions, _ = self._load_ions(
+            num_ions=num_ions,
+            buffer_size=self.DEFAULT_BUFFER_SIZE,
+            max_time_mu=self._load_max_time_mu,
+            cool_after_loading=True,
+            detection_window=self._load_detection_window,
+            detection_delay_mu=self._load_detection_delay_mu,
+            ion_absence_threshold=self._ion_absence_threshold,
+            plot_decimation=self._load_plot_decimation
+        )
+        self._reload_ions_done(num_ions, current_num_ions)
+
+    @rpc
+    def _reload_ions_done(self, num_ions, current_num_ions):  # type: (TInt32, TInt32) -> None
+        self.logger.info(f'{current_num_ions} ion(s) loaded')
+        self._update_num_ions(current_num_ions)
+        if current_num_ions < num_ions:
+            raise IonLoadError(f'Could not load requested number of ions: '
+                               f'{current_num_ions} out of {num_ions} ion(s) loaded')
+
     @kernel
     def _load_ions(
             self,
@@ -218,7 +273,8 @@ class IonLoadService(DaxService):
             cool_after_loading: TBool,
             detection_window: TFloat,
             detection_delay_mu: TInt64,
-            ion_absence_threshold: TFloat
+            ion_absence_threshold: TFloat,
+            plot_decimation: TInt32
     ) -> TTuple([TInt32, TInt64]):
         """Kernel for loading ions.
 
@@ -229,8 +285,11 @@ class IonLoadService(DaxService):
         self.core.reset()
 
         # Early check to see if we already have enough ions before loading
+        threshold_count = self._threshold_count(detection_window, ion_absence_threshold)
+        plot_counts = [0 for _ in range(self._detection.NUM_CHANNELS())]
         self._detection.detect_all(detection_window)
-        current_num_ions = self._get_num_ions(detection_window, ion_absence_threshold)
+        current_num_ions = self._get_num_ions(threshold_count, plot_counts)
+        self._plot_counts(plot_counts, detection_window)
         if current_num_ions >= num_ions:
             return current_num_ions, max_time_mu
 
@@ -251,16 +310,16 @@ class IonLoadService(DaxService):
 
             with self._ablation:
                 self._ablation.on()
-                current_num_ions = num_ions
-                # self._load_ions_loop(
-                #     num_ions=num_ions,
-                #     buffer_size=buffer_size,
-                #     detection_window=detection_window,
-                #     detection_delay_mu=detection_delay_mu,
-                #     ion_absence_threshold=ion_absence_threshold,
-                #     t_stop=t_stop,
-                #     current_num_ions=current_num_ions,
-                # )
+                current_num_ions = self._load_ions_loop(
+                    num_ions=num_ions,
+                    buffer_size=buffer_size,
+                    detection_window=detection_window,
+                    detection_delay_mu=detection_delay_mu,
+                    threshold_count=threshold_count,
+                    t_stop=t_stop,
+                    current_num_ions=current_num_ions,
+                    plot_decimation=plot_decimation,
+                )
                 self._ablation.off()
 
             # Store actual stop timestamp
@@ -292,14 +351,23 @@ class IonLoadService(DaxService):
             buffer_size: TInt32,
             detection_window: TFloat,
             detection_delay_mu: TInt64,
-            ion_absence_threshold: TFloat,
+            threshold_count: TInt32,
             t_stop: TInt64,
             current_num_ions: TInt32,
+            plot_decimation: TInt32,
     ) -> TInt32:
+        """Detect ions until the desired number of ions is loaded, keeping ``buffer_size`` detections in flight.
+
+        Counts are aggregated over ``plot_decimation`` detection windows for every plot update and pause check.
+        """
         # Guarantee slack
         self.core.break_realtime()
 
         detection_window_mu = self.core.seconds_to_mu(detection_window)
+        plot_counts = [0 for _ in range(self._detection.NUM_CHANNELS())]
+        plot_windows = 0
+        num_windows = 0
+        t_start_mu = self.core.get_rtio_counter_mu()
 
         # Build up a buffer
         for _ in range(buffer_size):
@@ -307,87 +375,113 @@ class IonLoadService(DaxService):
             self._detection.detect_all_mu(duration=detection_window_mu,
                                           mode=MODES370.NONE, trigger_shutter=False)
 
-        while current_num_ions < num_ions and now_mu() < t_stop and not self._scheduler.check_pause():
-            # Detect and obtain the number of loaded ions
+        pause = False
+        while current_num_ions < num_ions and now_mu() < t_stop and not pause:
+            # Detect and obtain the number of loaded ions from the oldest detection in flight
             delay_mu(detection_delay_mu)
             self._detection.detect_all_mu(
                 detection_window_mu, mode=MODES370.NONE, trigger_shutter=False)
-            current_num_ions = self._get_num_ions(detection_window, ion_absence_threshold)
+            current_num_ions = self._get_num_ions(threshold_count, plot_counts)
+            num_windows += 1
+            plot_windows += 1
+
+            if plot_windows >= plot_decimation:
+                # Plot the aggregated counts and check for a pause at a fixed rate
+                self._plot_counts(plot_counts, detection_window * plot_windows)
+                for c in range(len(plot_counts)):
+                    plot_counts[c] = 0
+                plot_windows = 0
+                pause = self._scheduler.check_pause()
 
         # Empty buffers
         for _ in range(buffer_size):
-            current_num_ions = self._get_num_ions(detection_window, ion_absence_threshold)
+            current_num_ions = self._get_num_ions(threshold_count, plot_counts)
+            num_windows += 1
+            plot_windows += 1
+        if plot_windows > 0:
+            self._plot_counts(plot_counts, detection_window * plot_windows)
+
+        # Report the achieved detection rate
+        self._report_load_rate(num_windows, self.core.get_rtio_counter_mu() - t_start_mu)
 
         # Return the number of ions
         return current_num_ions
 
-    @kernel
-    def _isqrt(self, n: TInt32) -> TTuple([TInt32, TInt32]):
-        """Use Newton's method to calculate the integer square root of n
-        The iterative formula is root=0.5*(X+N/X) where X is the guess root"""
-
-        x = n
-        # Initial guess4
-        y = (x + 1) // 2
-        count = 0
-        while y < x:
-            count += 1
-            x = y
-            # Newton's method
-            y = (x + n // x) // 2
-        return x, count
-
-    @kernel(flags='fast-math')
-    def _get_num_ions(self, detection_window: TFloat, ion_absence_threshold: TFloat) -> TInt32:
-        """Calculate the number of ions from the last PMT counts."""
-
-        # Get the PMT counts and plot them
-        counts = [self._detection.count(channel) for channel in range(self._detection.NUM_CHANNELS())]
-        self._plot_counts(counts, detection_window)
+    @portable
+    def _threshold_count(self, detection_window: TFloat, ion_absence_threshold: TFloat) -> TInt32:
+        """Convert the ion absence threshold frequency to a count threshold for a detection window."""
+        threshold = ion_absence_threshold * detection_window
+        threshold_count = np.int32(threshold)
+        if threshold_count < threshold:
+            # Round up
+            threshold_count += 1
+        return threshold_count
+
+    @portable
+    def absence_threshold_count(self, detection_window: TFloat) -> TInt32:
+        """Return the count threshold for ion presence/absence in a detection window.
 
-        # Form an array of PMT input frequencies
-        pmt_vec = np.array(counts, dtype=np.int32) // detection_window
+        :param detection_window: The duration of a detection window
+        :return: The minimum number of counts of a present ion
+        """
+        return self._threshold_count(detection_window, self._ion_absence_threshold)
+
+    @kernel
+    def _classify(self, counts: TList(TInt32), threshold_count: TInt32) -> TInt32:
+        """Classify the number of ions from raw PMT counts.
 
+        :param counts: The PMT counts of all channels
+        :param threshold_count: Count threshold for ion presence/absence
+        :return: Zero if no count meets the threshold, otherwise the number of ions of the best matching template
+        """
         # Check if any signal meets the threshold
-        for input_freq in pmt_vec:
-            if input_freq >= ion_absence_threshold:
+        for c in counts:
+            if c >= threshold_count:
                 break
         else:
             # No signal meets the threshold, there are no ions
             return 0
 
-        # Normalize the data
-        sum_sq = 0.0
-        for input_freq in pmt_vec:
-            sum_sq += input_freq ** 2
-        x, count = self._isqrt(np.int32(sum_sq // 10000))
-        pmt_norm = pmt_vec // x
-
-        # Reference matrix
-        ref_matrix = np.array([
-            [0, 100, 0],
-            [30, 60, 30],
-            [50, 50, 50]
-        ], dtype=np.int32)
-
-        # Find the maximum dot product between observed signals and reference matrix
-        result = ref_matrix @ np.transpose(pmt_norm)
+        # Find the template with the maximum dot product, normalization of the counts does not change the result
+        num_channels = len(counts)
         max_index = 0
-        max_val = 0.0
-        for i in range(len(result)):
-            if result[i] > max_val:
+        max_val = np.int64(-1)
+        for i in range(self._num_templates):
+            val = np.int64(0)
+            for channel in range(num_channels):
+                val += np.int64(counts[channel]) * self._ion_templates[i * num_channels + channel]
+            if val > max_val:
                 max_index = i
-                max_val = result[i]
-        current_num_ions = max_index + 1  # Correct indexing
+                max_val = val
+        return max_index + 1  # Correct indexing
+
+    @kernel
+    def _get_num_ions(self, threshold_count: TInt32, plot_counts: TList(TInt32)) -> TInt32:
+        """Calculate the number of ions from the last PMT counts.
+
+        :param threshold_count: Count threshold for ion presence/absence
+        :param plot_counts: Aggregated counts for plotting, the counts are added to this list
+        :return: The number of ions
+        """
+
+        # Get the PMT counts and aggregate them for plotting
+        counts = [self._detection.count(channel) for channel in range(self._detection.NUM_CHANNELS())]
+        for channel in range(len(counts)):
+            plot_counts[channel] += counts[channel]
 
         # Return, no slack is left because of count() functions
-        return current_num_ions
+        return self._classify(counts, threshold_count)
 
     @rpc(flags={'async'})
     def _plot_counts(self, counts, detection_window):
         data = [c / detection_window / self.COUNT_PLOT_Y_SCALE for c in counts]
         self.append_to_dataset(self.COUNT_PLOT_KEY, data)
 
+    @rpc(flags={'async'})
+    def _report_load_rate(self, num_windows, duration_mu):
+        if duration_mu > 0:
+            self.logger.info(f'Achieved {num_windows / self.core.mu_to_seconds(duration_mu):.1f} detection windows/s')
+
     @host_only
     def _update_num_ions(self, num_ions: int) -> None:
         # Todo: delete
@@ -426,7 +520,10 @@ class IonLoadService(DaxService):
         # Detect
         self._detection.detect_all(detection_window)
         # Return number of ions
-        return self._get_num_ions(detection_window=detection_window, ion_absence_threshold=ion_absence_threshold)
+        plot_counts = [0 for _ in range(self._detection.NUM_CHANNELS())]
+        num_ions = self._get_num_ions(self._threshold_count(detection_window, ion_absence_threshold), plot_counts)
+        self._plot_counts(plot_counts, detection_window)
+        return num_ions
 
     """Plotting functions."""
 
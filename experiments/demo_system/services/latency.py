@@ -0,0 +1,131 @@
+import typing
+
+import numpy as np
+
+import artiq.coredevice.edge_counter
+
+from dax.experiment import *
+from dax.modules.rtio_benchmark import RtioLoopBenchmarkModule
+from dax.util.units import time_to_str
+
+from demo_system.modules.util.dds import DDSBase
+from demo_system.modules.util.switch import Switch
+
+
+class LatencyService(DaxService):
+    """Measure switch latencies with the RTIO loopback of the RTIO benchmark module.
+
+    The output of the switch under test (e.g. through an RF power detector) must be connected to the loopback input.
+    Latencies are relative to the loopback reference, which is measured with the loopback output
+    connected to the loopback input. Switches without an edge at the loopback input are skipped.
+    """
+    SERVICE_NAME = 'latency'
+
+    LOOPBACK_COUNTER_KEY = 'ttl7_counter'
+    """Edge counter of the loopback input."""
+
+    # System dataset keys
+    REFERENCE_LATENCY_MU_KEY = 'reference_latency_mu'
+    NUM_SAMPLES_KEY = 'num_samples'
+    WINDOW_KEY = 'window'
+
+    def build(self) -> None:
+        # Obtain required modules and devices
+        self._bench = self.registry.find_module(RtioLoopBenchmarkModule)
+        self._counter = self.get_device(self.LOOPBACK_COUNTER_KEY, artiq.coredevice.edge_counter.EdgeCounter)
+        self.update_kernel_invariants('_bench', '_counter')
+
+    @host_only
+    def init(self) -> None:
+        self._reference_latency_mu: np.int64 = self.get_dataset_sys(self.REFERENCE_LATENCY_MU_KEY, np.int64(-1))
+        self._num_samples: int = self.get_dataset_sys(self.NUM_SAMPLES_KEY, 20)
+        self._window: float = self.get_dataset_sys(self.WINDOW_KEY, 5 * us)
+        self.update_kernel_invariants('_num_samples', '_window')
+
+    @host_only
+    def post_init(self) -> None:
+        pass
+
+    """Service functionality"""
+
+    @kernel
+    def _measure_delay_mu(self, ttl) -> TInt64:
+        """Measure the mean delay between a rising edge of a TTL output and the edge at the loopback input.
+
+        :param ttl: The TTL output device
+        :return: The mean delay in machine units, or -1 if not exactly one edge was detected for every sample
+        """
+        self.core.reset()
+        window_mu = self.core.seconds_to_mu(self._window)
+        total_mu = np.int64(0)
+
+        for _ in range(self._num_samples):
+            # Make sure the output is settled low
+            self.core.break_realtime()
+            ttl.off()
+            delay(10 * us)
+
+            # Open the input gates and generate a single edge at the start of the window
+            t_start_mu = now_mu()
+            self._bench.ttl_in.gate_rising_mu(window_mu)
+            at_mu(t_start_mu)
+            self._counter.gate_rising_mu(window_mu)
+            at_mu(t_start_mu)
+            ttl.on()
+            at_mu(t_start_mu + window_mu)
+            ttl.off()
+
+            # Obtain the timestamp of the edge and verify the edge count
+            t_edge_mu = self._bench.ttl_in.timestamp_mu(t_start_mu + window_mu)
+            count = self._counter.fetch_count()
+            if t_edge_mu < 0 or count != 1:
+                return np.int64(-1)
+            total_mu += t_edge_mu - t_start_mu
+
+        return total_mu // self._num_samples
+
+    @host_only
+    def update_reference_latency(self) -> None:
+        """Measure and store the loopback reference, the loopback output must be connected to the loopback input.
+
+        :raises RuntimeError: Raised if no edge was detected at the loopback input
+        """
+        reference_mu = self._measure_delay_mu(self._bench.ttl_out)
+        if reference_mu < 0:
+            raise RuntimeError('No edge detected at the loopback input, check the loopback connection')
+        self._reference_latency_mu = np.int64(reference_mu)
+        self.logger.info(f'Obtained loopback reference: {reference_mu} machine units '
+                         f'({time_to_str(self.core.mu_to_seconds(reference_mu))})')
+        self.set_dataset_sys(self.REFERENCE_LATENCY_MU_KEY, self._reference_latency_mu)
+
+    @host_only
+    def measure_latency_mu(self, ttl: typing.Any) -> typing.Optional[np.int64]:
+        """Measure the latency of a TTL output relative to the loopback reference.
+
+        :param ttl: The TTL output device
+        :return: The latency in machine units, or :const:`None` if no edge was detected at the loopback input
+        :raises RuntimeError: Raised if the loopback reference is not available
+        """
+        if self._reference_latency_mu < 0:
+            raise RuntimeError('Loopback reference not available, run update_reference_latency() first')
+        delay_mu = self._measure_delay_mu(ttl)
+        return None if delay_mu < 0 else np.int64(delay_mu - self._reference_latency_mu)
+
+    @host_only
+    def update_switch_latencies(self) -> None:
+        """Measure and store the latency of every switch and DDS switch connected to the loopback input."""
+        for key, sw in self.registry.search_modules(Switch).items():
+            self._update_latency(key, sw.ttl, sw.set_latency, sw.store_latency)
+        for key, dds in self.registry.search_modules(DDSBase).items():
+            self._update_latency(key, dds.ttl, dds.set_sw_latency, dds.store_sw_latency)
+
+    def _update_latency(self, key: str, ttl: typing.Any,
+                        set_fn: typing.Callable[[np.int64], None], store_fn: typing.Callable[[np.int64], None]) -> None:
+        latency_mu = self.measure_latency_mu(ttl)
+        if latency_mu is None:
+            self.logger.warning(f'No edge detected for {key}, latency not updated')
+        else:
+            self.logger.info(f'Obtained latency for {key}: {latency_mu} machine units '
+                             f'({time_to_str(self.core.mu_to_seconds(latency_mu))})')
+            set_fn(latency_mu)
+            store_fn(latency_mu)
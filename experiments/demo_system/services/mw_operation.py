@@ -1,3 +1,5 @@
+import typing
+
 import numpy as np
 
 from dax.experiment import *
@@ -11,6 +13,10 @@ from demo_system.services.detection import DetectionService
 from demo_system.services.cool_prep import CoolInitService
 from demo_system.modules.trigger_ttl import TriggerTTLModule
 from demo_system.modules.scope import ScopeModule
+from demo_system.util.gate_compiler import PULSE_T, merge_pulses, pulse_table
+
+GATE_T = typing.Union[str, typing.Tuple[typing.Any, ...]]
+"""Gate type, a gate name or a tuple with the gate name followed by the angle parameters of the gate."""
 
 # noinspection PyAbstractClass
 class MicrowaveOperationService(DaxService, OperationInterface):
@@ -18,17 +24,22 @@ class MicrowaveOperationService(DaxService, OperationInterface):
 
     # System dataset keys
     DEFAULT_REALTIME_KEY = "default_realtime"
+    VIRTUAL_Z_KEY = "virtual_z"
 
-    _POW_BITS = 14
-    """Number of bits in the phase offset word."""
+    _POW_BITS = 16
+    """Number of bits in the phase offset word of the MW DDS (AD9910)."""
     _POW_PI = np.int32(1 << (_POW_BITS - 1))
     """Pi as phase offset word."""
     _POW_PI_3_4 = np.int32(round((1 << _POW_BITS) * 0.75))
     """3/4ths Pi as phase offset word."""
+    _POW_MASK = np.int32((1 << _POW_BITS) - 1)
+    """Mask of valid phase offset word bits of the MW DDS, wraps a phase offset word to a single turn."""
+    _VIRTUAL_Z_GATES = {"z", "sqrt_z", "sqrt_z_dag", "rz"}
+    """Gates that are performed as virtual Z rotations in virtual Z mode."""
 
     def build(self):
         # Kernel invariant class variables
-        self.update_kernel_invariants("_POW_PI", "_POW_PI_3_4")
+        self.update_kernel_invariants("_POW_PI", "_POW_PI_3_4", "_POW_MASK")
         # Kernel invariant properties
         self.update_kernel_invariants(
             "pi", "num_qubits"
@@ -47,11 +58,20 @@ class MicrowaveOperationService(DaxService, OperationInterface):
             "_yb171", "_microwave", "_pmt", "_state", "_cool_pump", "_detection", "_trigger", "_scope"
         )
 
+        # Pulse durations depend on the Rabi frequency, update them when it is stored
+        self._microwave.add_rabi_freq_listener(lambda _: self._update_pulse_durations())
+
     @host_only
     def init(self) -> None:
         # Realtime flag
         self._realtime: bool = self.get_dataset_sys(self.DEFAULT_REALTIME_KEY, False)
         self.update_kernel_invariants("_realtime")
+        # Virtual Z mode and the phase of the rotating frame
+        self._virtual_z: bool = self.get_dataset_sys(self.VIRTUAL_Z_KEY, False)
+        self._frame_pow: np.int32 = np.int32(0)
+        self.update_kernel_invariants("_virtual_z")
+        # Pulse durations
+        self._update_pulse_durations()
         self._state.histogram.plot_histogram()
         self._state.histogram.plot_probability()
         # self._scope.setup()
@@ -71,10 +91,36 @@ class MicrowaveOperationService(DaxService, OperationInterface):
         assert isinstance(realtime, bool), "Realtime flag must be of type bool"
         self._realtime = realtime
 
+    @host_only
+    def set_virtual_z(self, virtual_z: bool) -> None:
+        """Enable or disable virtual Z mode.
+
+        In virtual Z mode, Z rotations shift the phase of the rotating frame instead of performing physical pulses.
+        The frame is reset by :func:`prep_0_all` and :func:`reset_frame`.
+
+        :param virtual_z: :const:`True` to enable virtual Z mode
+        """
+        assert isinstance(virtual_z, bool), "Virtual Z flag must be of type bool"
+        self._virtual_z = virtual_z
+
+    @host_only
+    def _update_pulse_durations(self) -> None:
+        """Precompute the pulse durations in machine units for the current Rabi frequency."""
+        self._pi_duration_mu: np.int64 = self.core.seconds_to_mu(self._microwave.pi_time())
+        self._pi_2_duration_mu: np.int64 = self._pi_duration_mu >> 1
+        self._2pi_duration_mu: np.int64 = self._pi_duration_mu << 1
+        self._rad_duration_mu: float = float(self._pi_duration_mu) / np.pi
+        self.update_kernel_invariants("_pi_duration_mu", "_pi_2_duration_mu", "_2pi_duration_mu", "_rad_duration_mu")
+
     @portable
     def _duration_pi_mu(self) -> TInt64:
         """Pulse duration for a pi pulse in machine units."""
-        return self.core.seconds_to_mu(self._microwave.pi_time())
+        return self._pi_duration_mu
+
+    @portable
+    def _theta_to_pow(self, theta: TFloat) -> TInt32:
+        """Convert an angle to a phase offset word."""
+        return np.int32(round(theta / self.pi * self._POW_PI))
 
     @portable
     def _channel_map(self) -> TList(TInt32):
@@ -86,6 +132,8 @@ class MicrowaveOperationService(DaxService, OperationInterface):
     @kernel
     def prep_0_all(self):
         # self._trigger.pulse()
+        if self._virtual_z:
+            self.reset_frame()
         # Cool
         delay(1 * us)
         self._cool_pump.cool.pulse()
@@ -122,9 +170,27 @@ class MicrowaveOperationService(DaxService, OperationInterface):
         :param duration: Angle to rotate by given as a pulse duration in machine units
         :param pow_: Phase of the MW DDS as a phase offset word
         """
+        if self._virtual_z:
+            # Apply the phase of the rotating frame
+            pow_ = (pow_ + self._frame_pow) & self._POW_MASK
         self._microwave.config_phase_mu(pow=pow_, realtime=self._realtime)
         self._microwave.pulse_mu(duration)
 
+    @kernel
+    def _shift_frame_mu(self, pow_: TInt32):
+        """Shift the phase of the rotating frame, which is added to the phase of all subsequent pulses.
+
+        A virtual Z rotation by ``theta`` shifts the frame by ``-theta``.
+
+        :param pow_: Phase shift as a phase offset word
+        """
+        self._frame_pow = (self._frame_pow + pow_) & self._POW_MASK
+
+    @kernel
+    def reset_frame(self):
+        """Reset the phase of the rotating frame used in virtual Z mode."""
+        self._frame_pow = np.int32(0)
+
     @kernel(flags={"fast-math"})
     def _rotate_mu(self, theta: TFloat, pow_: TInt32):
         """Arbitrary rotation with arbitrary phase.
@@ -132,12 +198,12 @@ class MicrowaveOperationService(DaxService, OperationInterface):
         :param theta: Angle to rotate by
         :param pow_: Phase of the MW DDS as a phase offset word
         """
-        self._pulse_mu(self.core.seconds_to_mu(theta / self._duration_pi_mu()), pow_=pow_)
+        self._pulse_mu(np.int64(theta * self._rad_duration_mu), pow_=pow_)
 
     @kernel(flags={"fast-math"})
     def rphi(self, theta: TFloat, phi: TFloat, qubit: TInt32 = -1):
         # TODO: the correctness of this function has not been verified yet
-        self._rotate_mu(theta, pow_=self._microwave.turns_to_pow(phi / 2 * self.pi))
+        self._rotate_mu(theta, pow_=self._microwave._dds.turns_to_pow(phi / (2 * self.pi)))
 
     @kernel
     def rx(self, theta: TFloat, qubit: TInt32 = -1):
@@ -155,6 +221,9 @@ class MicrowaveOperationService(DaxService, OperationInterface):
 
     @kernel
     def rz(self, theta: TFloat, qubit: TInt32 = -1):
+        if self._virtual_z:
+            self._shift_frame_mu(self._theta_to_pow(-theta))
+            return
         # Z rotations are not native to Rabi interactions, requires a combination of X and Y rotations.
         # Using Euler angles, we can achieve this by performing the rotation Rx(pi/2)Ry(theta)Rx(-pi/2).
         self.sqrt_x_dag()
@@ -167,42 +236,51 @@ class MicrowaveOperationService(DaxService, OperationInterface):
 
     @kernel
     def x(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu(), 0)
+        self._pulse_mu(self._pi_duration_mu, 0)
 
     @kernel
     def y(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu(), self._POW_PI >> 1)
+        self._pulse_mu(self._pi_duration_mu, self._POW_PI >> 1)
 
     @kernel
     def z(self, qubit: TInt32 = -1):
+        if self._virtual_z:
+            self._shift_frame_mu(-self._POW_PI)
+            return
         self.sqrt_x_dag()
         self.y()
         self.sqrt_x()
 
     @kernel
     def sqrt_x(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, 0)
+        self._pulse_mu(self._pi_2_duration_mu, 0)
 
     @kernel
     def sqrt_x_dag(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, self._POW_PI)
+        self._pulse_mu(self._pi_2_duration_mu, self._POW_PI)
 
     @kernel
     def sqrt_y(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, self._POW_PI >> 1)
+        self._pulse_mu(self._pi_2_duration_mu, self._POW_PI >> 1)
 
     @kernel
     def sqrt_y_dag(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, self._POW_PI_3_4)
+        self._pulse_mu(self._pi_2_duration_mu, self._POW_PI_3_4)
 
     @kernel
     def sqrt_z(self, qubit: TInt32 = -1):
+        if self._virtual_z:
+            self._shift_frame_mu(-(self._POW_PI >> 1))
+            return
         self.sqrt_x_dag()
         self.sqrt_y()
         self.sqrt_x()
 
     @kernel
     def sqrt_z_dag(self, qubit: TInt32 = -1):
+        if self._virtual_z:
+            self._shift_frame_mu(self._POW_PI >> 1)
+            return
         self.sqrt_x_dag()
         self.sqrt_y_dag()
         self.sqrt_x()
@@ -213,5 +291,120 @@ class MicrowaveOperationService(DaxService, OperationInterface):
         # However, Z rotation is not native to Rabi oscillations.
         # We can achieve the same result with Rx(pi/2)(1/sqrt(2))*(X + Y)Rx(-pi/2).
         self.sqrt_x_dag()
-        self._pulse_mu(self._duration_pi_mu(), self._POW_PI >> 2)
+        self._pulse_mu(self._pi_duration_mu, self._POW_PI >> 2)
         self.sqrt_x()
+
+    """Gate sequence compilation"""
+
+    @host_only
+    def gate_pulses(self, gate: str, *args: float) -> typing.List[PULSE_T]:
+        """Return the pulses of a gate as performed by the corresponding gate function.
+
+        :param gate: The name of the gate function
+        :param args: The angle parameters of the gate function (the qubit parameter is omitted)
+        :return: A list of pulses given as ``(angle, pow)`` tuples with the rotation angle in radians
+        :raises KeyError: Raised if the gate is unknown
+        """
+        pi = np.pi
+        if gate == "i":
+            return []
+        elif gate == "x":
+            return [(pi, 0)]
+        elif gate == "y":
+            return [(pi, self._POW_PI >> 1)]
+        elif gate == "z":
+            return self.gate_pulses("sqrt_x_dag") + self.gate_pulses("y") + self.gate_pulses("sqrt_x")
+        elif gate == "sqrt_x":
+            return [(pi / 2, 0)]
+        elif gate == "sqrt_x_dag":
+            return [(pi / 2, self._POW_PI)]
+        elif gate == "sqrt_y":
+            return [(pi / 2, self._POW_PI >> 1)]
+        elif gate == "sqrt_y_dag":
+            return [(pi / 2, self._POW_PI_3_4)]
+        elif gate == "sqrt_z":
+            return self.gate_pulses("sqrt_x_dag") + self.gate_pulses("sqrt_y") + self.gate_pulses("sqrt_x")
+        elif gate == "sqrt_z_dag":
+            return self.gate_pulses("sqrt_x_dag") + self.gate_pulses("sqrt_y_dag") + self.gate_pulses("sqrt_x")
+        elif gate == "h":
+            return self.gate_pulses("sqrt_x_dag") + [(pi, self._POW_PI >> 2)] + self.gate_pulses("sqrt_x")
+        elif gate == "rx":
+            theta, = args
+            return [(theta, 0)] if theta >= 0.0 else [(-theta, self._POW_PI)]
+        elif gate == "ry":
+            theta, = args
+            return [(theta, self._POW_PI >> 1)] if theta >= 0.0 else [(-theta, self._POW_PI_3_4)]
+        elif gate == "rz":
+            theta, = args
+            return self.gate_pulses("sqrt_x_dag") + self.gate_pulses("ry", theta) + self.gate_pulses("sqrt_x")
+        elif gate == "rphi":
+            theta, phi = args
+            return [(theta, self._microwave._dds.turns_to_pow(phi / (2 * self.pi)))]
+        else:
+            raise KeyError(f"Unknown gate {gate}")
+
+    @host_only
+    def gate_frame_shift(self, gate: str, *args: float) -> typing.Optional[int]:
+        """Return the frame shift of a gate that is performed as a virtual Z rotation.
+
+        :param gate: The name of the gate function
+        :param args: The angle parameters of the gate function (the qubit parameter is omitted)
+        :return: The frame shift as a phase offset word, or :const:`None` if the gate is not a virtual Z rotation
+        """
+        if not self._virtual_z or gate not in self._VIRTUAL_Z_GATES:
+            return None
+        elif gate == "z":
+            return -self._POW_PI
+        elif gate == "sqrt_z":
+            return -(self._POW_PI >> 1)
+        elif gate == "sqrt_z_dag":
+            return self._POW_PI >> 1
+        else:
+            theta, = args
+            return self._theta_to_pow(-theta)
+
+    @host_only
+    def compile_gates(self, gates: typing.Iterable[GATE_T]) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Compile a gate sequence into a pulse table that can be played back with :func:`play_pulses_mu`.
+
+        Adjacent rotations around the same axis are merged and inverse pairs cancel.
+        In virtual Z mode, Z rotations are folded into the phase of the subsequent pulses and the remaining
+        frame shift is stored as a final entry with zero duration.
+        The pulse table is only valid for the current Rabi frequency.
+
+        :param gates: The gates, given as a gate name or a tuple with the gate name followed by the angle parameters
+        :return: A tuple with an array of pulse durations in machine units and an array of phase offset words
+        :raises KeyError: Raised if a gate is unknown
+        """
+        pulses: typing.List[PULSE_T] = []
+        frame_pow = 0
+        for g in gates:
+            name, *args = (g,) if isinstance(g, str) else g
+            shift = self.gate_frame_shift(name, *args)
+            if shift is None:
+                pulses.extend((angle, pow_ + frame_pow) for angle, pow_ in self.gate_pulses(name, *args))
+            else:
+                frame_pow = (frame_pow + shift) & self._POW_MASK
+        merged = merge_pulses(pulses, pow_pi=self._POW_PI, pow_mask=self._POW_MASK)
+        durations, pows = pulse_table(merged, pi_duration_mu=self._pi_duration_mu)
+
+        if frame_pow:
+            # Carry the remaining frame shift over to the gates after the pulse table
+            durations = np.append(durations, np.int64(0))
+            pows = np.append(pows, np.int32(frame_pow))
+        return durations, pows
+
+    @kernel
+    def play_pulses_mu(self, durations: TArray(TInt64), pows: TArray(TInt32)):
+        """Play back a pulse table, see :func:`compile_gates`.
+
+        Entries with zero duration shift the phase of the rotating frame.
+
+        :param durations: Pulse durations in machine units
+        :param pows: Phase of the MW DDS for each pulse as a phase offset word
+        """
+        for i in range(len(durations)):
+            if durations[i] > 0:
+                self._pulse_mu(durations[i], pows[i])
+            else:
+                self._shift_frame_mu(pows[i])
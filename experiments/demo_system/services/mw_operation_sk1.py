@@ -1,8 +1,13 @@
+import functools
+import typing
+
 import numpy as np
 
 from dax.experiment import *
 
 from demo_system.services.mw_operation import MicrowaveOperationService
+from demo_system.util.composite_pulses import COMPOSITE_PULSES
+from demo_system.util.gate_compiler import PULSE_T, pulse_table
 
 
 # noinspection PyAbstractClass
@@ -13,6 +18,19 @@ class MicrowaveOperationSK1Service(MicrowaveOperationService):
     _SK1_PI = np.arccos(-1 / 4) / (2 * np.pi)
     _SK1_MPI_2 = np.arccos(1 / 8) / (2 * np.pi)
 
+    COMPOSITE_CACHE_SIZE = 1024
+    """Maximum number of cached composite pulse tables."""
+    COMPOSITE_ANGLE_RESOLUTION = 2 * np.pi / (1 << 16)
+    """Angles of cached composite pulse tables are quantized to this resolution."""
+
+    def build(self) -> None:
+        # Call super
+        super(MicrowaveOperationSK1Service, self).build()
+
+        # Composite pulse tables depend on the Rabi frequency, clear the cache when it is stored
+        self._composite_table_cache = functools.lru_cache(maxsize=self.COMPOSITE_CACHE_SIZE)(self._composite_table)
+        self._microwave.add_rabi_freq_listener(lambda _: self._composite_table_cache.cache_clear())
+
     def init(self) -> None:
         # Call super
         super(MicrowaveOperationSK1Service, self).init()
@@ -45,46 +63,132 @@ class MicrowaveOperationSK1Service(MicrowaveOperationService):
 
     """Service functionality"""
 
+    @kernel(flags={"fast-math"})
+    def _rotate_mu(self, theta: TFloat, pow_: TInt32):
+        """SK1 composite rotation with arbitrary phase, see :func:`composite_pulses`.
+
+        Used by :func:`rx`, :func:`ry`, :func:`rz`, and :func:`rphi`.
+
+        :param theta: Angle to rotate by ``[0, 4pi]``
+        :param pow_: Phase of the MW DDS as a phase offset word
+        """
+        offset = self._microwave._dds.turns_to_pow(np.arccos(-theta / (4 * self.pi)) / (2 * self.pi))
+        self._pulse_mu(np.int64(theta * self._rad_duration_mu), pow_=pow_)
+        self._pulse_mu(self._2pi_duration_mu, (pow_ + offset) & self._POW_MASK)
+        self._pulse_mu(self._2pi_duration_mu, (pow_ - offset) & self._POW_MASK)
+
     @kernel
     def x(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu(), 0)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._sk1_pi_x)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._msk1_pi_x)
+        self._pulse_mu(self._pi_duration_mu, 0)
+        self._pulse_mu(self._2pi_duration_mu, self._sk1_pi_x)
+        self._pulse_mu(self._2pi_duration_mu, self._msk1_pi_x)
 
     @kernel
     def y(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu(), self._POW_PI >> 1)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._sk1_pi_y)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._msk1_pi_y)
+        self._pulse_mu(self._pi_duration_mu, self._POW_PI >> 1)
+        self._pulse_mu(self._2pi_duration_mu, self._sk1_pi_y)
+        self._pulse_mu(self._2pi_duration_mu, self._msk1_pi_y)
 
     @kernel
     def sqrt_x(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, 0)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._sk1_pi_2_x)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._msk1_pi_2_x)
+        self._pulse_mu(self._pi_2_duration_mu, 0)
+        self._pulse_mu(self._2pi_duration_mu, self._sk1_pi_2_x)
+        self._pulse_mu(self._2pi_duration_mu, self._msk1_pi_2_x)
 
     @kernel
     def sqrt_x_dag(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, self._POW_PI)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._sk1_mpi_2_x)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._msk1_mpi_2_x)
+        self._pulse_mu(self._pi_2_duration_mu, self._POW_PI)
+        self._pulse_mu(self._2pi_duration_mu, self._sk1_mpi_2_x)
+        self._pulse_mu(self._2pi_duration_mu, self._msk1_mpi_2_x)
 
     @kernel
     def sqrt_y(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, self._POW_PI >> 1)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._sk1_pi_2_y)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._msk1_pi_2_y)
+        self._pulse_mu(self._pi_2_duration_mu, self._POW_PI >> 1)
+        self._pulse_mu(self._2pi_duration_mu, self._sk1_pi_2_y)
+        self._pulse_mu(self._2pi_duration_mu, self._msk1_pi_2_y)
 
     @kernel
     def sqrt_y_dag(self, qubit: TInt32 = -1):
-        self._pulse_mu(self._duration_pi_mu() >> 1, self._POW_PI_3_4)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._sk1_mpi_2_y)
-        self._pulse_mu(self._duration_pi_mu() << 1, self._msk1_mpi_2_y)
+        self._pulse_mu(self._pi_2_duration_mu, self._POW_PI_3_4)
+        self._pulse_mu(self._2pi_duration_mu, self._sk1_mpi_2_y)
+        self._pulse_mu(self._2pi_duration_mu, self._msk1_mpi_2_y)
 
     @kernel
     def h(self, qubit: TInt32 = -1):
         self.sqrt_x_dag()
-        self._pulse_mu(self._duration_pi_mu(), self._POW_PI >> 2)
-        self._pulse_mu(self._duration_pi_mu(), self._sk1_pi_h)
-        self._pulse_mu(self._duration_pi_mu(), self._msk1_pi_h)
+        self._pulse_mu(self._pi_duration_mu, self._POW_PI >> 2)
+        self._pulse_mu(self._pi_duration_mu, self._sk1_pi_h)
+        self._pulse_mu(self._pi_duration_mu, self._msk1_pi_h)
         self.sqrt_x()
+
+    """Gate sequence compilation"""
+
+    @host_only
+    def gate_pulses(self, gate: str, *args: float) -> typing.List[PULSE_T]:
+        pi = np.pi
+        if gate == "x":
+            return [(pi, 0), (2 * pi, self._sk1_pi_x), (2 * pi, self._msk1_pi_x)]
+        elif gate == "y":
+            return [(pi, self._POW_PI >> 1), (2 * pi, self._sk1_pi_y), (2 * pi, self._msk1_pi_y)]
+        elif gate == "sqrt_x":
+            return [(pi / 2, 0), (2 * pi, self._sk1_pi_2_x), (2 * pi, self._msk1_pi_2_x)]
+        elif gate == "sqrt_x_dag":
+            return [(pi / 2, self._POW_PI), (2 * pi, self._sk1_mpi_2_x), (2 * pi, self._msk1_mpi_2_x)]
+        elif gate == "sqrt_y":
+            return [(pi / 2, self._POW_PI >> 1), (2 * pi, self._sk1_pi_2_y), (2 * pi, self._msk1_pi_2_y)]
+        elif gate == "sqrt_y_dag":
+            return [(pi / 2, self._POW_PI_3_4), (2 * pi, self._sk1_mpi_2_y), (2 * pi, self._msk1_mpi_2_y)]
+        elif gate == "h":
+            return (self.gate_pulses("sqrt_x_dag")
+                    + [(pi, self._POW_PI >> 2), (pi, self._sk1_pi_h), (pi, self._msk1_pi_h)]
+                    + self.gate_pulses("sqrt_x"))
+        elif gate == "rx":
+            theta, = args
+            return self.composite_pulses(theta, 0) if theta >= 0.0 else self.composite_pulses(-theta, self._POW_PI)
+        elif gate == "ry":
+            theta, = args
+            return (self.composite_pulses(theta, self._POW_PI >> 1) if theta >= 0.0
+                    else self.composite_pulses(-theta, self._POW_PI_3_4))
+        elif gate == "rphi":
+            theta, phi = args
+            return self.composite_pulses(theta, self._microwave._dds.turns_to_pow(phi / (2 * self.pi)))
+        else:
+            return super(MicrowaveOperationSK1Service, self).gate_pulses(gate, *args)
+
+    """Composite pulses"""
+
+    @host_only
+    def composite_pulses(self, theta: float, pow_: int, method: str = "sk1") -> typing.List[PULSE_T]:
+        """Return a composite pulse for a rotation by an arbitrary angle.
+
+        :param theta: Rotation angle in radians ``[0, 4pi]``
+        :param pow_: Phase of the rotation axis as a phase offset word
+        :param method: The composite pulse method, ``'sk1'`` or ``'bb1'``
+        :return: A list of pulses given as ``(angle, pow)`` tuples
+        :raises KeyError: Raised if the method is unknown
+        """
+        return COMPOSITE_PULSES[method](theta, pow_, self._microwave._dds.turns_to_pow, self._POW_MASK)
+
+    @host_only
+    def composite_table(self, theta: float, pow_: int, method: str = "sk1") -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Return the pulse table of a composite pulse, see :func:`play_pulses_mu`.
+
+        Tables are cached by quantized angle and Rabi frequency.
+        The cache is cleared when the Rabi frequency is stored.
+
+        :param theta: Rotation angle in radians ``[0, 4pi]``
+        :param pow_: Phase of the rotation axis as a phase offset word
+        :param method: The composite pulse method, ``'sk1'`` or ``'bb1'``
+        :return: A tuple with read-only arrays of pulse durations in machine units and phase offset words
+        :raises KeyError: Raised if the method is unknown
+        """
+        angle_index = int(round(theta / self.COMPOSITE_ANGLE_RESOLUTION))
+        return self._composite_table_cache(method, angle_index, int(pow_) & self._POW_MASK, self._microwave.rabi_freq())
+
+    def _composite_table(self, method: str, angle_index: int, pow_: int,
+                         rabi_freq: float) -> typing.Tuple[np.ndarray, np.ndarray]:
+        pulses = self.composite_pulses(angle_index * self.COMPOSITE_ANGLE_RESOLUTION, pow_, method)
+        table = pulse_table(pulses, pi_duration_mu=self.core.seconds_to_mu(0.5 / rabi_freq))
+        for array in table:
+            array.setflags(write=False)
+        return table
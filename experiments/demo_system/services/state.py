@@ -1,7 +1,9 @@
+import numpy as np
+
 from dax.experiment import *
-from dax.modules.hist_context import HistogramContext
 
 from demo_system.modules.pmt import PmtModule
+from demo_system.modules.util.hist_context import HistogramContext
 from demo_system.services.detection import DetectionService
 
 
@@ -98,6 +100,49 @@ class StateService(DaxService):
         # Append the detection count to the histogram buffer
         self.histogram.append([self._detection.count(channel)])  # Make it a list for data uniformity
 
+    @host_only
+    def make_count_buffer(self, num_shots: int) -> np.ndarray:
+        """Allocate a buffer for batched readout of the active channels.
+
+        :param num_shots: The number of shots that fit in the buffer
+        :return: A zero-initialized array with shape (shots x active channels)
+        """
+        assert isinstance(num_shots, (int, np.integer)) and num_shots > 0, 'Number of shots must be positive'
+        return np.zeros((num_shots, len(self._pmt.active_channels())), dtype=np.int32)
+
+    @kernel
+    def count_channels_into(self, channels: TList(TInt32), buffer: TArray(TInt32, 2), shot: TInt32):
+        """Store the PMT counts of a list of channels in a row of a count buffer.
+
+        No data is sent to the histogram until :func:`append_counts` is called.
+
+        :param channels: The channels to record the counts of
+        :param buffer: The count buffer (shots x channels)
+        :param shot: The row in the buffer to store the counts in
+        """
+        for i in range(len(channels)):
+            buffer[shot, i] = self._detection.count(channels[i])
+
+    @kernel
+    def count_active_into(self, buffer: TArray(TInt32, 2), shot: TInt32):
+        """Store the PMT counts of active channels in a row of a count buffer.
+
+        No data is sent to the histogram until :func:`append_counts` is called.
+
+        :param buffer: The count buffer, see :func:`make_count_buffer`
+        :param shot: The row in the buffer to store the counts in
+        """
+        self.count_channels_into(self._pmt.active_channels(), buffer, shot)
+
+    @kernel
+    def append_counts(self, buffer: TArray(TInt32, 2), num_shots: TInt32):
+        """Record the first rows of a count buffer in the histogram buffer using a single RPC.
+
+        :param buffer: The count buffer (shots x channels)
+        :param num_shots: The number of valid shots in the buffer
+        """
+        self.histogram.append_block(buffer, num_shots)
+
     @kernel
     def measure_channels(self, channels: TList(TInt32)):
         """Record the PMT counts of a list of channels discriminated against the state detection threshold.
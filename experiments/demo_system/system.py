@@ -1,3 +1,5 @@
+import numpy as np
+
 from dax.experiment import *
 
 from dax.modules.rpc_benchmark import RpcBenchmarkModule
@@ -16,6 +18,7 @@ from demo_system.services.ion_load import IonLoadService
 from demo_system.services.detection import DetectionService
 from demo_system.services.cool_prep import CoolInitService
 from demo_system.services.state import StateService
+from demo_system.services.latency import LatencyService
 
 from demo_system.services.mw_operation import MicrowaveOperationService
 from demo_system.services.mw_operation_sk1 import MicrowaveOperationSK1Service
@@ -74,8 +77,9 @@ class DemoSystem(DaxSystem):
         self.cool_prep = CoolInitService(self)
         self.state = StateService(self)
         self.ion_load = IonLoadService(self)
+        self.latency = LatencyService(self)
         self.update_kernel_invariants(
-            "ion_load", "detection", "cool_prep", "state"
+            "ion_load", "detection", "cool_prep", "state", "latency"
         )
 
         # Add operation interfaces
@@ -89,14 +93,35 @@ class DemoSystem(DaxSystem):
 
         By manually initializing modules in a single kernel, the number of compiler runs
         can be reduced with faster initialization as a result.
+        Devices of the system modules are initialized back-to-back on a single timeline
+        and the kernel only waits once at the end.
         """
-        # Call initialization kernel functions (they include calls to reset() and wait_until_mu()
-        self.cpld.init_kernel()
-        self.rtio_bench.init_kernel()
-        self.l355.init_kernel()
-        self.l370.init_kernel()
-        self.pmt.init_kernel()
-        self.trigger_ttl.init_kernel()
+        # Reset the core once, all devices are initialized on a single timeline
+        self.core.reset()
+
+        # Urukul CPLDs, replaces the DAX CPLD initialization kernel
+        for cpld in self.cpld.cpld:
+            cpld.init()
+            # CPLD initialization reads from the device, which consumes all slack
+            self.core.break_realtime()
+            # Read back the attenuators, writes to one channel keep the attenuation of the other channels
+            cpld.get_att_mu()
+            self.core.break_realtime()
+
+        # RTIO loopback pins, replaces the DAX RTIO benchmark initialization kernel
+        self.rtio_bench.ttl_in.input()
+        self.rtio_bench.ttl_out.off()
+        delay_mu(np.int64(self.core.ref_multiplier))  # Added minimal delay to make the events sequential
+
+        # Initialize modules
+        self.l355.init_device()
+        self.l370.init_device()
+        self.pmt.init_device()
+        self.trigger_ttl.init_device()
+        self.ablation.init_device()
+
+        # Wait until all events have been submitted
+        self.core.wait_until_mu(now_mu())
 
         # self.idle()
 
@@ -104,10 +129,20 @@ class DemoSystem(DaxSystem):
     def idle(self):
         # Set system to idle (between experiments) state
         self.core.break_realtime()
-        self.l370.reset()
-        self.core.break_realtime()
+        # All lasers share a CPLD, the IO update of the 355 laser also applies the loaded 370 configuration
+        self.l370.reset(update=False)
         self.l355.reset()
 
+    @kernel
+    def invalidate_state(self):
+        """Invalidate the cached hardware state of all DDS modules.
+
+        Must be called before recording a DMA sequence, redundant writes are otherwise skipped during recording.
+        """
+        self.l370.invalidate_state()
+        self.l355.invalidate_state()
+        self.microwave.invalidate_state()
+
     @kernel
     def safety_off(self):
         # Safely turn off system
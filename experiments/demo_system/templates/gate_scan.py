@@ -10,6 +10,7 @@ from dax.util.artiq import is_kernel
 # from dax_pulse.scan import RFSoCScan
 
 from demo_system.system import *
+from demo_system.util.incremental_fit import IncrementalFit
 
 __all__ = ["GateScan"]  # , 'RFSoCGateScan']
 
@@ -19,6 +20,25 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
 
     DEFAULT_LAZY_TIMING: typing.ClassVar[bool] = False
     """Default setting for lazy timing option."""
+    DEFAULT_DMA_SHOT: typing.ClassVar[bool] = False
+    """Default setting for DMA shot option."""
+    DEFAULT_SLACK_BUDGET: typing.ClassVar[bool] = False
+    """Default setting for slack budget option."""
+    GATE_POINT_INVARIANT: typing.ClassVar[bool] = False
+    """:const:`True` if :func:`gate_pre_action` and :func:`gate_action` do not depend on the point.
+
+    In DMA shot mode, a point invariant shot sequence is recorded only once for the whole scan.
+    """
+    DMA_SHOT_KEY: typing.ClassVar[str] = "gate_scan_shot"
+    """Name of the DMA recording that holds the shot sequence."""
+    MAX_READOUT_BLOCK_SIZE: typing.ClassVar[int] = 4096
+    """Maximum number of shots in a block when batched readout is enabled."""
+    FIT_UNCERTAINTY_UNIT: typing.ClassVar[str] = ""
+    """Unit of the value of interest of the fit, used for the early stop argument."""
+    ADAPTIVE_PILOT_FRACTION: typing.ClassVar[float] = 0.25
+    """Fraction of the samples per point used for the first pass of an adaptive scan."""
+    ADAPTIVE_MIN_SAMPLES: typing.ClassVar[int] = 1
+    """Minimum number of samples per point for an adaptive scan, must be greater than zero."""
 
     @abc.abstractmethod
     def build_gate_scan(self):
@@ -45,6 +65,23 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
         """Define the gate action for each sample."""
         pass
 
+    def build_fit(self) -> typing.Optional[IncrementalFit]:
+        """Build the fit for this gate scan, called once at the start of every run.
+
+        Scans that return a fit support live fitting and early stopping.
+        The fit is available through :attr:`incremental_fit`.
+
+        :return: An incremental fit object or :const:`None` if this scan has no fit
+        """
+        return None
+
+    def gate_duration(self) -> float:
+        """Return an upper bound of the :func:`gate_action` duration in seconds.
+
+        Used to budget the slack for a shot when the slack budget option is enabled.
+        """
+        return 0.0
+
     @kernel
     def initialize(self):
         if self._enable_initialization:
@@ -56,7 +93,15 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
     def detect(self):
         self.detection.detect_active()
 
-    def build_scan(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+    def build_scan(self, *args: typing.Any, parent_scans: typing.Collection[str] = (), **kwargs: typing.Any) -> None:
+        """Build the gate scan.
+
+        :param parent_scans: Keys of scans of which the points are set by the parent with :func:`set_scan_points`
+            (e.g. iterators that run this scan multiple times), these scans do not have an argument
+        """
+        self._gate_scan_points: typing.Dict[str, typing.List[typing.Any]] = {key: [] for key in parent_scans}
+        self._gate_scan_initialized: bool = False
+
         # Check functions
         assert is_kernel(
             self.gate_config
@@ -96,6 +141,30 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
             group="Advanced",
             tooltip="Insert extra delays to prevent underflow exceptions",
         )
+        self._dma_shot: bool = self.get_argument(
+            "DMA shot",
+            BooleanValue(self.DEFAULT_DMA_SHOT),
+            group="Advanced",
+            tooltip="Record the shot sequence with DMA and play it back for each sample",
+        )
+        self._batched_readout: bool = self.get_argument(
+            "Batched readout",
+            BooleanValue(False),
+            group="Advanced",
+            tooltip="Collect PMT counts on the core device and send them to the histogram in blocks",
+        )
+        self._slack_budget: bool = self.get_argument(
+            "Slack budget",
+            BooleanValue(self.DEFAULT_SLACK_BUDGET),
+            group="Advanced",
+            tooltip="Only resync the timeline when slack drops below the watermark instead of every shot",
+        )
+        self._slack_watermark: float = self.get_argument(
+            "Slack watermark",
+            NumberValue(100 * us, min=0 * us, unit="us"),
+            group="Advanced",
+            tooltip="Minimum slack before starting a shot when the slack budget is enabled",
+        )
         self._enable_cool: bool = self.get_argument(
             "Enable cool",
             BooleanValue(True),
@@ -114,12 +183,28 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
             group="Advanced",
             tooltip="Enable gate action",
         )
+        self._ion_watchdog: bool = self.get_argument(
+            "Ion loss watchdog",
+            BooleanValue(False),
+            group="Advanced",
+            tooltip="Reload ions and repeat the point when the mean PMT counts drop below the ion absence threshold",
+        )
+        self._ion_watchdog_points: int = self.get_argument(
+            "Ion loss points",
+            NumberValue(3, min=1, step=1, ndecimals=0),
+            group="Advanced",
+            tooltip="Number of consecutive points below the ion absence threshold before verifying ion presence",
+        )
         self.update_kernel_invariants(
             "_buffer_size",
             "_lazy_timing",
+            "_dma_shot",
+            "_batched_readout",
+            "_slack_budget",
             "_enable_cool",
             "_enable_initialization",
-            "_enable_gate_action"
+            "_enable_gate_action",
+            "_ion_watchdog_points",
         )
 
         # Plot arguments
@@ -133,10 +218,39 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
             "Plot mean count", BooleanValue(False), group="Plot"
         )
 
+        # Fit arguments
+        self._live_fit: bool = self.get_argument(
+            "Live fit",
+            BooleanValue(False),
+            group="Fit",
+            tooltip="Refit and plot after every point (only for scans that have a fit)",
+        )
+        self._early_stop_uncertainty: float = self.get_argument(
+            "Early stop uncertainty",
+            NumberValue(0.0, min=0.0, unit=self.FIT_UNCERTAINTY_UNIT, ndecimals=6),
+            group="Fit",
+            tooltip="Stop the scan once the live fit uncertainty drops below this value (0 to disable)",
+        )
+        self._adaptive: bool = self.get_argument(
+            "Adaptive samples",
+            BooleanValue(False),
+            group="Fit",
+            tooltip="Distribute samples over the points based on the expected information gain of the live fit "
+                    "(requires an infinite scan, use with early stop)",
+        )
+
         self._view_scope: bool = self.get_argument(
             "View Scope", BooleanValue(False)
         )
 
+    def add_scan(self, key: str, name: str, scannable: Scannable, *args: typing.Any, **kwargs: typing.Any) -> None:
+        if key in self._gate_scan_points:
+            # Static scan over points owned by this object, starts with the default points
+            self._gate_scan_points[key][:] = scannable.default()
+            self.add_static_scan(key, self._gate_scan_points[key])
+        else:
+            super(GateScan, self).add_scan(key, name, scannable, *args, **kwargs)
+
     def host_enter(self) -> None:
         # Check number of scans (i.e. dimensions)
         self.__scannables = self.get_scannables()
@@ -147,9 +261,31 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
         # Generate a fit dataset key
         self._fit_dataset_key = f"plot.{self.scheduler.rid}.fit"
 
+        # Build the fit
+        self._incremental_fit = self.build_fit()
+        fit_enabled: bool = self._incremental_fit is not None and len(self.__scannables) == 1
+        # A finite scan makes a single pass, which would only run the pilot samples
+        self._adaptive_enabled: bool = self._adaptive and fit_enabled and self.is_infinite_scan
+        self._live_fit_enabled: bool = (self._live_fit or self._adaptive_enabled) and fit_enabled
+        self._early_stop: bool = self._live_fit_enabled and self._early_stop_uncertainty > 0.0
+        self.update_kernel_invariants("_live_fit_enabled", "_early_stop", "_adaptive_enabled")
+        if self._adaptive and not self._adaptive_enabled:
+            self.logger.warning("Adaptive samples require an infinite one-dimensional scan with a fit, "
+                                "option ignored")
+
+        # The ion loss watchdog holds all counts of a point in the count buffer
+        self._ion_watchdog_enabled: bool = (self._ion_watchdog
+                                            and self._gate_scan_num_samples <= self.MAX_READOUT_BLOCK_SIZE)
+        self.update_kernel_invariants("_ion_watchdog_enabled")
+        if self._ion_watchdog and not self._ion_watchdog_enabled:
+            self.logger.warning(f"Ion loss watchdog supports at most {self.MAX_READOUT_BLOCK_SIZE} samples per point, "
+                                f"option ignored")
+
     def host_setup(self) -> None:
-        # Call DAX init
-        self.dax_init()
+        if not self._gate_scan_initialized:
+            # Call DAX init, a scan that runs multiple times keeps the system initialized
+            self.dax_init()
+            self._gate_scan_initialized = True
 
         # Prepare plot kwargs
         plot_kwargs = {
@@ -191,6 +327,47 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
 
         self.update_kernel_invariants("_slop_time_mu", "_detect_time_mu", "_cool_time_mu")
 
+        # Slack budget, a resync reserves the watermark plus the duration of a full shot
+        self._slack_watermark_mu = self.core.seconds_to_mu(self._slack_watermark)
+        self._shot_duration_mu = (self.trigger_ttl.default_pulse_duration_mu() + 2 * self._slop_time_mu
+                                  + self._cool_time_mu + self.core.seconds_to_mu(self.gate_duration())
+                                  + self._detect_time_mu)
+        self.update_kernel_invariants("_slack_watermark_mu", "_shot_duration_mu")
+
+        # DMA shot recording state
+        self._dma_shot_recorded: bool = False
+
+        # Count buffer for batched readout
+        self._count_buffer_size = max(min(self._gate_scan_num_samples, self.MAX_READOUT_BLOCK_SIZE), 1)
+        self._count_buffer = self.state.make_count_buffer(self._count_buffer_size)
+        self._count_buffer_index = np.int32(0)
+        self.update_kernel_invariants("_count_buffer_size")
+
+        # Ion loss watchdog state, the number of consecutive dark points per active channel
+        self._ion_watchdog_threshold = self.ion_load.absence_threshold_count(
+            self.core.mu_to_seconds(self._detect_time_mu))
+        self._ion_watchdog_num_channels = np.int32(self._count_buffer.shape[1])
+        self._ion_watchdog_dark_points = np.zeros(self._ion_watchdog_num_channels, dtype=np.int32)
+        # The ions present at the start of the scan are verified and reloaded
+        self._ion_watchdog_num_ions = self.properties.num_ions
+        self.update_kernel_invariants("_ion_watchdog_threshold", "_ion_watchdog_num_channels",
+                                      "_ion_watchdog_num_ions")
+        if self._ion_watchdog_enabled and self._ion_watchdog_num_ions <= 0:
+            self.logger.warning("Ion loss watchdog requires a known number of ions, option ignored")
+            self._ion_watchdog_enabled = False
+
+        # Adaptive sampling state, the number of samples of every point is decided once per pass
+        assert self.ADAPTIVE_MIN_SAMPLES > 0, 'Minimum number of adaptive samples must be greater than zero'
+        if self._adaptive_enabled:
+            label, _ = self.__scannables.copy().popitem()
+            self._adaptive_num_points = np.int32(len(self.get_scan_points()[label]))
+        else:
+            self._adaptive_num_points = np.int32(1)
+        self._adaptive_samples = np.zeros(self._adaptive_num_points, dtype=np.int32)
+        self._adaptive_count = np.int32(0)
+        self._adaptive_pass: int = 0
+        self.update_kernel_invariants("_adaptive_num_points")
+
     @kernel
     def device_setup(self):  # type: () -> None
         # Reset core
@@ -200,7 +377,17 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
         self.core.break_realtime()
         self.gate_setup()
 
-    
+    @kernel
+    def _gate_scan_shot(self, point, index):
+        """Timeline of a single shot: trigger, cool, gate action, and detection."""
+        self.trigger_ttl.pulse_mu()
+        delay_mu(self._slop_time_mu)
+        self.cool_prep.cool.pulse_mu(self._cool_time_mu)
+        self.gate_action(point, index)
+        # Detect state
+        delay_mu(self._slop_time_mu)
+        self.detection.detect_active_mu(duration=self._detect_time_mu)
+
     @kernel
     def _gate_scan_run_point(self, point, index):
         if self._lazy_timing or self._buffer_size == 0:
@@ -209,38 +396,208 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
         # Gate pre-init action
         self.gate_pre_action(point, index)
 
+        if self._slack_budget:
+            # Keep the accumulated slack, only resync when running low
+            self._gate_scan_budget_slack()
+            self._gate_scan_shot(point, index)
+        else:
+            self.core.break_realtime()
+            self._gate_scan_shot(point, index)
+            self.core.break_realtime()
+
+    @kernel
+    def _gate_scan_budget_slack(self):
+        """Resync the timeline if the slack dropped below the watermark."""
+        t_rtio = self.core.get_rtio_counter_mu()
+        if now_mu() - t_rtio < self._slack_watermark_mu:
+            at_mu(t_rtio + self._slack_watermark_mu + self._shot_duration_mu)
+
+    @kernel
+    def _gate_scan_record_shot(self, point, index):
+        """Record the shot sequence of a point in DMA.
+
+        Any previous recording is replaced, which invalidates previously obtained handles.
+        """
+        # Every write must be part of the recording
+        self.invalidate_state()
+        with self.core_dma.record(self.DMA_SHOT_KEY):
+            self.gate_pre_action(point, index)
+            delay_mu(self._slop_time_mu)
+            self._gate_scan_shot(point, index)
+        self._dma_shot_recorded = True
+
+    @kernel
+    def _gate_scan_run_point_dma(self, handle):
+        if self._lazy_timing or self._buffer_size == 0:
+            self.core.break_realtime()
+        elif self._slack_budget:
+            self._gate_scan_budget_slack()
+
+        # Play back the recorded shot, advances the timeline by the duration of the recording
+        self.core_dma.playback_handle(handle)
+
+    @kernel
+    def _gate_scan_count(self):
+        """Record the PMT counts of the last shot."""
+        if self._batched_readout or self._ion_watchdog_enabled:
+            self.state.count_active_into(self._count_buffer, self._count_buffer_index)
+            self._count_buffer_index += 1
+            # The ion loss watchdog keeps the whole point buffered until it is checked
+            if self._count_buffer_index == self._count_buffer_size and not self._ion_watchdog_enabled:
+                self._gate_scan_flush_counts()
+        else:
+            self.state.count_active()
+
+    @kernel
+    def _gate_scan_flush_counts(self):
+        """Send the buffered PMT counts to the histogram, must be called before leaving the histogram context."""
+        if (self._batched_readout or self._ion_watchdog_enabled) and self._count_buffer_index > 0:
+            self.state.append_counts(self._count_buffer, self._count_buffer_index)
+            self._count_buffer_index = 0
+
+    @kernel
+    def _gate_scan_ion_loss(self) -> TBool:
+        """Check the buffered counts of the current point for ion loss and reload ions if needed.
+
+        A channel is dark for a point if its mean count is below the ion absence threshold.
+        Points can legitimately be dark (e.g. when the ions are pumped to a dark state),
+        hence ion presence is only verified after a number of consecutive dark points.
+
+        :return: :const:`True` if ions were reloaded and the counts of the point must be discarded
+        """
+        num_shots = self._count_buffer_index
+        verify = False
+        for c in range(self._ion_watchdog_num_channels):
+            total = 0
+            for s in range(num_shots):
+                total += self._count_buffer[s, c]
+            if total < self._ion_watchdog_threshold * num_shots:
+                self._ion_watchdog_dark_points[c] += 1
+                if self._ion_watchdog_dark_points[c] >= self._ion_watchdog_points:
+                    verify = True
+            else:
+                self._ion_watchdog_dark_points[c] = 0
+
+        if not verify:
+            return False
+        for c in range(self._ion_watchdog_num_channels):
+            self._ion_watchdog_dark_points[c] = 0
+
+        # Complete pending output and verify ion presence with a single detection
+        self.core.wait_until_mu(now_mu())
         self.core.break_realtime()
-        self.trigger_ttl.pulse_mu()
-        delay_mu(self._slop_time_mu)
-        self.cool_prep.cool.pulse_mu(self._cool_time_mu)
-        self.gate_action(point, index)
-        # Detect state
-        delay_mu(self._slop_time_mu) 
-        self.detection.detect_active_mu(duration=self._detect_time_mu)
+        if self.ion_load.get_num_ions() >= self._ion_watchdog_num_ions:
+            # The ions are present, keep the counts of this point
+            self.core.break_realtime()
+            return False
+
+        # Reload ions, resets the core device
+        self._gate_scan_report_ion_loss()
+        self.core.wait_until_mu(now_mu())
+        self.ion_load.reload_ions(self._ion_watchdog_num_ions)
         self.core.break_realtime()
+        return True
+
+    @rpc(flags={"async"})
+    def _gate_scan_report_ion_loss(self):  # type: () -> None
+        self.logger.warning("Ion loss detected, reloading ions and repeating the point")
 
     @kernel
-    def run_point(self, point, index):
-        if self._view_scope:
-            self.scope.setup()
-        # Guarantee slack
-        self.core.break_realtime()
-        # Configure gate
-        self.gate_config(point, index)
+    def _gate_scan_run_samples(self, point, index, num_samples) -> TBool:
+        buffer_size = min(self._buffer_size, num_samples)
+        reloaded = False
 
         with self.state.histogram:
             # Build up a buffer
-            for _ in range(self._buffer_size):
+            for _ in range(buffer_size):
                 self._gate_scan_run_point(point, index)
 
             # Pipelined execution
-            for _ in range(self._gate_scan_num_samples - self._buffer_size):
+            for _ in range(num_samples - buffer_size):
                 self._gate_scan_run_point(point, index)
-                self.state.count_active()
+                self._gate_scan_count()
+
+            # Clear buffers
+            for _ in range(buffer_size):
+                self._gate_scan_count()
+            if self._ion_watchdog_enabled and self._gate_scan_ion_loss():
+                # Discard the counts obtained with missing ions
+                self._count_buffer_index = 0
+                reloaded = True
+            self._gate_scan_flush_counts()
+
+        return reloaded
+
+    @kernel
+    def _gate_scan_run_samples_dma(self, point, index, num_samples) -> TBool:
+        if not self.GATE_POINT_INVARIANT or not self._dma_shot_recorded:
+            # Record the shot sequence for this point
+            self._gate_scan_record_shot(point, index)
+        handle = self.core_dma.get_handle(self.DMA_SHOT_KEY)
+        buffer_size = min(self._buffer_size, num_samples)
+        # Recording and obtaining the handle consume slack
+        self.core.break_realtime()
+        reloaded = False
+
+        with self.state.histogram:
+            # Build up a buffer
+            for _ in range(buffer_size):
+                self._gate_scan_run_point_dma(handle)
+
+            # Pipelined execution
+            for _ in range(num_samples - buffer_size):
+                self._gate_scan_run_point_dma(handle)
+                self._gate_scan_count()
 
             # Clear buffers
-            for _ in range(self._buffer_size):
-                self.state.count_active()
+            for _ in range(buffer_size):
+                self._gate_scan_count()
+            if self._ion_watchdog_enabled and self._gate_scan_ion_loss():
+                # Discard the counts obtained with missing ions
+                self._count_buffer_index = 0
+                reloaded = True
+            self._gate_scan_flush_counts()
+
+        return reloaded
+
+    @kernel
+    def run_point(self, point, index):
+        if self._adaptive_enabled:
+            element = self._adaptive_count % self._adaptive_num_points
+            if element == 0:
+                # Start of a pass, decide the number of samples of all points
+                samples = self._gate_scan_adaptive_samples()
+                for i in range(self._adaptive_num_points):
+                    self._adaptive_samples[i] = samples[i]
+            self._adaptive_count += 1
+            num_samples = self._adaptive_samples[element]
+        else:
+            num_samples = self._gate_scan_num_samples
+
+        if self._view_scope:
+            self.scope.setup()
+        # Guarantee slack
+        self.core.break_realtime()
+
+        # Configure gate
+        self.gate_config(point, index)
+
+        # Repeat the point if the ion loss watchdog reloaded ions
+        reloaded = True
+        while reloaded:
+            if self._dma_shot:
+                reloaded = self._gate_scan_run_samples_dma(point, index, num_samples)
+            else:
+                reloaded = self._gate_scan_run_samples(point, index, num_samples)
+            if reloaded:
+                self.gate_config(point, index)
+
+        if self._early_stop:
+            if self._gate_scan_update_fit():
+                # Fit converged
+                self.stop_scan()
+        elif self._live_fit_enabled:
+            self._gate_scan_update_fit_async()
 
         if self._view_scope:
             self.scope.store_waveform()
@@ -250,6 +607,10 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
     def device_cleanup(self):  # type: () -> None
         # Gain slack
         self.core.break_realtime()
+        if self._dma_shot_recorded:
+            # Release the DMA recording
+            self.core_dma.erase(self.DMA_SHOT_KEY)
+            self._dma_shot_recorded = False
         # System Idle
         self.idle()
         # Sync
@@ -266,8 +627,102 @@ class GateScan(DaxScan, DemoSystem, abc.ABC):
             else:
                 h.plot_all_probabilities()
 
+    @rpc
+    def _gate_scan_update_fit(self) -> TBool:
+        """Refit with the data obtained so far and plot the result.
+
+        :return: :const:`True` if the uncertainty of the fit is below the early stop threshold
+        """
+        label, _ = self.__scannables.copy().popitem()
+        x, y = self.get_fit_data(label)
+        sigma = self.get_fit_sigma() if self._adaptive_enabled else None
+        if self._incremental_fit.update(x, y, sigma):
+            self.plot_fit_single(self._incremental_fit.evaluate(x))
+            uncertainty = self._incremental_fit.uncertainty
+            self.logger.debug(f"Live fit: value={self._incremental_fit.value}, uncertainty={uncertainty}")
+            return uncertainty < self._early_stop_uncertainty
+        return False
+
+    @rpc(flags={"async"})
+    def _gate_scan_update_fit_async(self):  # type: () -> None
+        self._gate_scan_update_fit()
+
+    @rpc
+    def _gate_scan_adaptive_samples(self) -> TArray(TInt32):
+        """Decide the number of samples of every point for the next pass of an adaptive scan.
+
+        The first pass over the points uses a fraction of the samples to obtain an initial fit.
+        Later passes distribute the samples proportional to the expected reduction of the
+        variance of the value of interest.
+
+        :return: The number of samples of every point in the order of the scan points
+        """
+        label, _ = self.__scannables.copy().popitem()
+        points = np.asarray(self.get_scan_points()[label])
+
+        if self._adaptive_pass == 0 or not self._incremental_fit.has_fit:
+            # Pilot pass
+            num_samples = np.full(len(points), np.ceil(self._gate_scan_num_samples * self.ADAPTIVE_PILOT_FRACTION))
+        else:
+            gain = self._incremental_fit.variance_reduction(points, max(self._gate_scan_num_samples, 1))
+            max_gain = gain.max()
+            fraction = gain / max_gain if max_gain > 0.0 else np.ones(len(points))
+            num_samples = np.round(self._gate_scan_num_samples * fraction)
+
+        self._adaptive_pass += 1
+        return np.clip(num_samples, self.ADAPTIVE_MIN_SAMPLES,
+                       max(self._gate_scan_num_samples, self.ADAPTIVE_MIN_SAMPLES)).astype(np.int32)
+
     """User functions"""
 
+    @host_only
+    def set_scan_points(self, key: str, points: typing.Iterable[typing.Any]) -> None:
+        """Set the points of a parent scan, used by the next run of this scan.
+
+        :param key: The key of a scan passed to the ``parent_scans`` build argument
+        :param points: The scan points
+        :raises KeyError: Raised if the key is not a parent scan
+        """
+        self._gate_scan_points[key][:] = points
+
+    @property
+    def incremental_fit(self) -> typing.Optional[IncrementalFit]:
+        """The fit of this gate scan as returned by :func:`build_fit`."""
+        return self._incremental_fit
+
+    @host_only
+    def get_fit_data(self, key: str, channel: int = 0) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Get the x values and state probabilities of the points measured so far.
+
+        Points are returned in the order of execution, which also covers scans that were stopped early.
+        For adaptive and infinite scans, points can appear multiple times.
+
+        :param key: The key of the scan that provides the x values
+        :param channel: The index of the active channel
+        :return: A tuple ``(x, probability)``
+        """
+        prob = self.state.histogram.get_probabilities_array()
+        prob = prob[channel] if len(prob) else np.zeros(0)
+        # Infinite scans repeat the scan points, one probability is recorded per executed point
+        x = np.resize(np.asarray(self.get_scan_points()[key]), len(prob))
+        return x, prob
+
+    @host_only
+    def get_fit_sigma(self, channel: int = 0) -> np.ndarray:
+        """Get the uncertainty of the state probabilities of the points measured so far.
+
+        The uncertainty is the binomial standard deviation with add-one smoothing,
+        which weights points by their number of samples and is never zero.
+
+        :param channel: The index of the active channel
+        :return: The standard deviation of each probability in the order of :func:`get_fit_data`
+        """
+        prob = self.state.histogram.get_probabilities_array()
+        prob = prob[channel] if len(prob) else np.zeros(0)
+        num_samples = self.state.histogram.get_num_samples()[:len(prob)]
+        smoothed = (prob * num_samples + 1) / (num_samples + 2)
+        return np.sqrt(smoothed * (1 - smoothed) / np.maximum(num_samples, 1))
+
     @host_only
     def plot_fit(self, data):
         """Plot the fit (adds fit to the probability plot).
@@ -0,0 +1,193 @@
+"""
+Single-qubit Clifford group and randomized benchmarking sequences.
+
+Cliffords are decomposed into the primitive microwave gates in :data:`PRIMITIVES`, which are single pulses.
+Randomized benchmarking sequences are generated for all sequence lengths at once and stored as a flat int8 array
+of primitive gate indices with an offset table, which is compact enough to embed in a kernel.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import typing
+
+import numpy as np
+
+__all__ = ['PRIMITIVES', 'NUM_CLIFFORDS', 'CLIFFORD_GATES', 'clifford_index',
+           'generate_sequences', 'load_sequences']
+
+_logger = logging.getLogger(__name__)
+
+PRIMITIVES: typing.Tuple[str, ...] = ('x', 'y', 'sqrt_x', 'sqrt_x_dag', 'sqrt_y', 'sqrt_y_dag')
+"""Names of the primitive gate functions, the index of a name is used to encode the gate."""
+NUM_CLIFFORDS: int = 24
+"""Number of single-qubit Cliffords."""
+
+_SEQUENCES_VERSION = 1
+"""Version of the sequence generator, part of the cache key."""
+
+
+def _rotation(phi: float, theta: float) -> np.ndarray:
+    """Unitary of a rotation by ``theta`` around an axis in the XY plane with angle ``phi``."""
+    axis = np.cos(phi) * np.array([[0, 1], [1, 0]]) + np.sin(phi) * np.array([[0, -1j], [1j, 0]])
+    return np.cos(theta / 2) * np.eye(2) - 1j * np.sin(theta / 2) * axis
+
+
+_PRIMITIVE_UNITARIES: typing.List[np.ndarray] = [
+    _rotation(0, np.pi), _rotation(np.pi / 2, np.pi),
+    _rotation(0, np.pi / 2), _rotation(0, -np.pi / 2),
+    _rotation(np.pi / 2, np.pi / 2), _rotation(np.pi / 2, -np.pi / 2),
+]
+
+
+def _key(u: np.ndarray) -> typing.Tuple[float, ...]:
+    """Hashable key of a unitary, independent of the global phase."""
+    pivot = u.flat[np.argmax(np.abs(u) > 1e-6)]
+    u = u * abs(pivot) / pivot
+    return tuple(np.round(np.concatenate([u.real.ravel(), u.imag.ravel()]), 6) + 0.0)
+
+
+def _generate_group() -> typing.Tuple[np.ndarray, typing.List[typing.Tuple[int, ...]]]:
+    """Generate the Clifford group with a shortest decomposition of every element (breadth-first search)."""
+    unitaries = [np.eye(2, dtype=complex)]
+    gates: typing.List[typing.Tuple[int, ...]] = [()]
+    index = {_key(unitaries[0]): 0}
+    i = 0
+    while i < len(unitaries):
+        for p, u in enumerate(_PRIMITIVE_UNITARIES):
+            product = u @ unitaries[i]
+            k = _key(product)
+            if k not in index:
+                index[k] = len(unitaries)
+                unitaries.append(product)
+                gates.append(gates[i] + (p,))
+        i += 1
+    assert len(unitaries) == NUM_CLIFFORDS, 'Primitives do not generate the Clifford group'
+    return np.asarray(unitaries), gates
+
+
+_CLIFFORD_UNITARIES, CLIFFORD_GATES = _generate_group()
+"""Unitaries and decompositions (primitive gate indices in time order) of all Cliffords, index 0 is the identity."""
+_CLIFFORD_INDEX = {_key(u): i for i, u in enumerate(_CLIFFORD_UNITARIES)}
+_MULTIPLY = np.asarray([[_CLIFFORD_INDEX[_key(a @ b)] for b in _CLIFFORD_UNITARIES] for a in _CLIFFORD_UNITARIES],
+                       dtype=np.int8)
+"""Multiplication table, ``_MULTIPLY[a, b]`` is the Clifford of ``b`` followed by ``a``."""
+_INVERSE = np.asarray([_CLIFFORD_INDEX[_key(u.conj().T)] for u in _CLIFFORD_UNITARIES], dtype=np.int8)
+"""Inverse of every Clifford."""
+
+_PAD = NUM_CLIFFORDS
+"""Padding index for sequences, decomposes into no gates."""
+_MAX_GATES = max(len(g) for g in CLIFFORD_GATES)
+_DECOMPOSITION = np.full((NUM_CLIFFORDS + 1, _MAX_GATES), -1, dtype=np.int8)
+for _i, _g in enumerate(CLIFFORD_GATES):
+    _DECOMPOSITION[_i, :len(_g)] = _g
+_NUM_GATES = np.count_nonzero(_DECOMPOSITION >= 0, axis=1)
+
+
+def clifford_index(gates: typing.Sequence[str]) -> int:
+    """Return the index of the Clifford performed by a sequence of primitive gates.
+
+    :param gates: Names of the primitive gates in time order
+    :return: The index of the Clifford
+    :raises ValueError: Raised if a gate is not a primitive
+    """
+    u = np.eye(2, dtype=complex)
+    for g in gates:
+        u = _PRIMITIVE_UNITARIES[PRIMITIVES.index(g)] @ u
+    return _CLIFFORD_INDEX[_key(u)]
+
+
+def generate_sequences(lengths: typing.Sequence[int], num_sequences: int, seed: int,
+                       interleaved: typing.Optional[int] = None) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Generate randomized benchmarking sequences including their recovery Clifford.
+
+    The gates of sequence ``s`` with length index ``l`` are ``gates[offsets[i]:offsets[i + 1]]``
+    with ``i = l * num_sequences + s``.
+    Sequences of different lengths are independent.
+
+    :param lengths: The number of random Cliffords of each sequence length
+    :param num_sequences: The number of sequences per length
+    :param seed: The random seed
+    :param interleaved: Index of a Clifford to interleave after every random Clifford, see :func:`clifford_index`
+    :return: A tuple with the primitive gate indices (int8) and the offsets of the sequences (int32)
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    assert lengths.ndim == 1 and np.all(lengths >= 0), 'Lengths must be a 1-dimensional sequence of positive values'
+    assert num_sequences > 0, 'Number of sequences must be greater than zero'
+    assert interleaved is None or 0 <= interleaved < NUM_CLIFFORDS, 'Interleaved Clifford out of range'
+
+    max_length = int(lengths.max(initial=0))
+    stride = 1 if interleaved is None else 2
+    rng = np.random.default_rng(seed)
+    cliffords = rng.integers(NUM_CLIFFORDS, size=(len(lengths), num_sequences, max_length), dtype=np.int8)
+    valid = np.arange(max_length)[np.newaxis, :] < lengths[:, np.newaxis]  # lengths x steps
+
+    # Net Clifford of all sequences, computed for all sequences at once
+    net = np.zeros((len(lengths), num_sequences), dtype=np.int8)
+    for step in range(max_length):
+        product = _MULTIPLY[cliffords[:, :, step], net]
+        if interleaved is not None:
+            product = _MULTIPLY[interleaved, product]
+        net = np.where(valid[:, step, np.newaxis], product, net)
+
+    # Assemble the Clifford sequences, padded to the maximum length
+    sequences = np.full((len(lengths), num_sequences, max_length * stride + 1), _PAD, dtype=np.int8)
+    sequences[:, :, :max_length * stride:stride] = np.where(valid[:, np.newaxis, :], cliffords, _PAD)
+    if interleaved is not None:
+        sequences[:, :, 1:max_length * stride:stride] = np.where(valid[:, np.newaxis, :], interleaved, _PAD)
+    sequences[np.arange(len(lengths))[:, np.newaxis], np.arange(num_sequences)[np.newaxis, :],
+              (lengths * stride)[:, np.newaxis]] = _INVERSE[net]
+
+    # Decompose into primitive gates
+    gates = _DECOMPOSITION[sequences]
+    gates = gates[gates >= 0]
+    offsets = np.zeros(len(lengths) * num_sequences + 1, dtype=np.int32)
+    np.cumsum(_NUM_GATES[sequences].sum(axis=-1).ravel(), out=offsets[1:])
+    return gates, offsets
+
+
+def load_sequences(path: typing.Optional[str], lengths: typing.Sequence[int], num_sequences: int, seed: int,
+                   interleaved: typing.Optional[int] = None) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Load randomized benchmarking sequences from an on-disk cache or generate and store them.
+
+    Sequences are keyed by all parameters of :func:`generate_sequences`.
+    Failures to store sequences are logged and otherwise ignored.
+
+    :param path: The cache directory, created if it does not exist, or :const:`None` to disable the cache
+    :param lengths: The number of random Cliffords of each sequence length
+    :param num_sequences: The number of sequences per length
+    :param seed: The random seed
+    :param interleaved: Index of a Clifford to interleave after every random Clifford
+    :return: A tuple with the primitive gate indices (int8) and the offsets of the sequences (int32)
+    """
+    if path is None:
+        return generate_sequences(lengths, num_sequences, seed, interleaved)
+
+    h = hashlib.sha256()
+    for v in (_SEQUENCES_VERSION, list(map(int, lengths)), num_sequences, seed, interleaved):
+        h.update(repr(v).encode())
+        h.update(b'\0')
+    path = os.path.abspath(os.path.expanduser(path))
+    file_name = os.path.join(path, f'rb_{h.hexdigest()}.npz')
+
+    try:
+        with np.load(file_name) as data:
+            return data['gates'], data['offsets']
+    except (OSError, KeyError, ValueError):
+        pass
+
+    gates, offsets = generate_sequences(lengths, num_sequences, seed, interleaved)
+    tmp = None
+    try:
+        # Write to a temporary file first, concurrent readers never see a partial file
+        os.makedirs(path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, gates=gates, offsets=offsets)
+        os.replace(tmp, file_name)
+    except OSError as e:
+        _logger.warning(f'Failed to store randomized benchmarking sequences: {e}')
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+    return gates, offsets
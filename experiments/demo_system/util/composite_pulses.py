@@ -0,0 +1,71 @@
+"""
+Composite pulses for rotations by arbitrary angles.
+
+Composite pulses are returned as a list of pulses, see :mod:`demo_system.util.gate_compiler`.
+The phase offsets of the correction pulses are converted to phase offset words with a
+``turns_to_pow`` function (e.g. of the DDS driver) and added to the phase offset word of the rotation axis.
+"""
+
+import typing
+
+import numpy as np
+
+from demo_system.util.gate_compiler import PULSE_T
+
+__all__ = ['sk1_pulses', 'bb1_pulses', 'COMPOSITE_PULSES']
+
+_TURNS_TO_POW_T = typing.Callable[[float], int]
+"""Function type to convert turns to a phase offset word."""
+
+
+def _phase_offset(theta: float) -> float:
+    """Phase offset of the correction pulses in turns, shared by SK1 and BB1."""
+    assert 0.0 <= theta <= 4 * np.pi, 'Angle out of range'
+    return float(np.arccos(-theta / (4 * np.pi)) / (2 * np.pi))
+
+
+def sk1_pulses(theta: float, pow_: int, turns_to_pow: _TURNS_TO_POW_T, pow_mask: int = 0xffff) -> typing.List[PULSE_T]:
+    """Return the SK1 composite pulse for a rotation.
+
+    The rotation is followed by two :math:`2\\pi` correction pulses with opposite phase offsets.
+
+    :param theta: Rotation angle in radians ``[0, 4pi]``
+    :param pow_: Phase offset word of the rotation axis
+    :param turns_to_pow: Function to convert turns to a phase offset word
+    :param pow_mask: Mask of valid phase offset word bits
+    :return: The pulses
+    """
+    phi = _phase_offset(theta)
+    return [
+        (theta, pow_ & pow_mask),
+        (2 * np.pi, (pow_ + turns_to_pow(phi)) & pow_mask),
+        (2 * np.pi, (pow_ + turns_to_pow(-phi)) & pow_mask),
+    ]
+
+
+def bb1_pulses(theta: float, pow_: int, turns_to_pow: _TURNS_TO_POW_T, pow_mask: int = 0xffff) -> typing.List[PULSE_T]:
+    """Return the BB1 composite pulse for a rotation.
+
+    The rotation is followed by a :math:`\\pi`, :math:`2\\pi`, :math:`\\pi` correction sequence
+    with phase offsets :math:`\\phi_1`, :math:`3\\phi_1`, and :math:`\\phi_1`.
+
+    :param theta: Rotation angle in radians ``[0, 4pi]``
+    :param pow_: Phase offset word of the rotation axis
+    :param turns_to_pow: Function to convert turns to a phase offset word
+    :param pow_mask: Mask of valid phase offset word bits
+    :return: The pulses
+    """
+    phi = _phase_offset(theta)
+    return [
+        (theta, pow_ & pow_mask),
+        (np.pi, (pow_ + turns_to_pow(phi)) & pow_mask),
+        (2 * np.pi, (pow_ + turns_to_pow(3 * phi)) & pow_mask),
+        (np.pi, (pow_ + turns_to_pow(phi)) & pow_mask),
+    ]
+
+
+COMPOSITE_PULSES: typing.Dict[str, typing.Callable[..., typing.List[PULSE_T]]] = {
+    'sk1': sk1_pulses,
+    'bb1': bb1_pulses,
+}
+"""Composite pulse functions by name."""
@@ -128,6 +128,218 @@ def phase_oscillation(phase, amp, phase_offset, offset):
     return amp * np.sin(2.0 * np.pi * (phase - phase_offset)) + offset
 
 
+""" 2-D variants, the x data is a flattened grid with shape (2, points), see flatten_grid() """
+
+
+def ramsey_fringe_flattened(fd_point, rabi_freq, resonance):
+    return ramsey_fringe(fd_point[0], fd_point[1], rabi_freq, resonance)
+
+
+def flatten_grid(x0, x1):
+    """
+    flatten a 2-D grid of scan values into x data for the flattened functions
+
+    :param x0: values of the first axis (e.g. time)
+    :param x1: values of the second axis (e.g. frequency), the fastest changing axis of the grid
+    :return: array with shape (2, len(x0) * len(x1))
+    """
+    x0 = np.asarray(x0, dtype=float)
+    x1 = np.asarray(x1, dtype=float)
+    grid = np.empty((2, x0.size, x1.size))
+    grid[0] = x0[:, np.newaxis]
+    grid[1] = x1[np.newaxis, :]
+    return grid.reshape(2, -1)
+
+
+""" Analytic Jacobians
+
+Every fused function returns the model value and the Jacobian with shape (points, parameters),
+which share intermediate results. The Jacobian can be passed to curve_fit() using get_jacobian().
+"""
+
+
+def _columns(*columns):
+    """ stack Jacobian columns, constant columns are broadcast to the number of points """
+    return np.stack(np.broadcast_arrays(*columns), axis=-1)
+
+
+def linear_value_and_jacobian(x, a, b):
+    x = np.asarray(x, dtype=float)
+    return a * x + b, _columns(x, 1.0)
+
+
+def sinusoidal_value_and_jacobian(x, amp, freq, phase, offset):
+    x = np.asarray(x, dtype=float)
+    theta = 2.0 * np.pi * freq * x + phase
+    sin, cos = np.sin(theta), np.cos(theta)
+    return amp * sin + offset, _columns(sin, amp * cos * 2.0 * np.pi * x, amp * cos, 1.0)
+
+
+def exp_decay_value_and_jacobian(x, amp, decay_constant):
+    x = np.asarray(x, dtype=float)
+    decay = np.exp((-1.0) * x / decay_constant)
+    value = amp * decay
+    return value, _columns(decay, value * x / decay_constant ** 2)
+
+
+def sinusoidal_decay_value_and_jacobian(x, amp, freq, phase, offset, decay_constant):
+    x = np.asarray(x, dtype=float)
+    decay = np.exp((-1.0) * x / decay_constant)
+    theta = 2.0 * np.pi * freq * x + phase
+    sin, cos = np.sin(theta), np.cos(theta)
+    oscillation = amp * decay * sin
+    d_phase = amp * decay * cos
+    return oscillation + offset, _columns(decay * sin, d_phase * 2.0 * np.pi * x, d_phase, 1.0,
+                                          oscillation * x / decay_constant ** 2)
+
+
+def sinc_squared_value_and_jacobian(x, amp, center, width):
+    u = (np.asarray(x, dtype=float) - center) / width
+    sinc = np.sinc(u)
+    # Derivative of sinc(u) is (cos(pi u) - sinc(u)) / u, which is zero at u = 0
+    nonzero = u != 0.0
+    d_sinc = np.divide(np.cos(np.pi * u) - sinc, u, out=np.zeros_like(u), where=nonzero)
+    d_u = amp * 2.0 * sinc * d_sinc
+    return amp * sinc ** 2, _columns(sinc ** 2, -d_u / width, -d_u * u / width)
+
+
+def gaussian_value_and_jacobian(x, amp, center, sigma):
+    dx = np.asarray(x, dtype=float) - center
+    envelope = np.exp(-(dx ** 2) / (2 * sigma ** 2))
+    value = amp * envelope
+    return value, _columns(envelope, value * dx / sigma ** 2, value * dx ** 2 / sigma ** 3)
+
+
+def _rabi_partials(time, detuning, rabi_freq):
+    """ value and partial derivatives of rabi_oscillation() to the rabi frequency and the detuning """
+    rabi_eff = np.sqrt(rabi_freq ** 2 + detuning ** 2)
+    amp = rabi_freq / rabi_eff
+    population = np.sin(np.pi * rabi_eff * time) ** 2
+    # Derivative of the population to the effective rabi frequency
+    d_rabi_eff = amp * np.pi * time * np.sin(2.0 * np.pi * rabi_eff * time)
+    d_rabi_freq = detuning ** 2 / rabi_eff ** 3 * population + d_rabi_eff * rabi_freq / rabi_eff
+    d_detuning = -rabi_freq * detuning / rabi_eff ** 3 * population + d_rabi_eff * detuning / rabi_eff
+    return amp * population, d_rabi_freq, d_detuning
+
+
+def rabi_oscillation_value_and_jacobian(time, frequency, rabi_freq, resonance):
+    value, d_rabi_freq, d_detuning = _rabi_partials(np.asarray(time, dtype=float), frequency - resonance, rabi_freq)
+    return value, _columns(d_detuning, d_rabi_freq, -d_detuning)
+
+
+def rabi_oscillation_flattened_value_and_jacobian(tf_point, rabi_freq, resonance):
+    tf_point = np.asarray(tf_point, dtype=float)
+    value, d_rabi_freq, d_detuning = _rabi_partials(tf_point[0], tf_point[1] - resonance, rabi_freq)
+    return value, _columns(d_rabi_freq, -d_detuning)
+
+
+def rabi_oscillation_on_resonance_value_and_jacobian(time, rabi_freq):
+    time = np.asarray(time, dtype=float)
+    theta = np.pi * rabi_freq * time
+    return np.sin(theta) ** 2, _columns(np.pi * time * np.sin(2.0 * theta))
+
+
+def _ramsey_partials(freq, delay_time, rabi_freq, resonance):
+    """ value and partial derivatives of ramsey_fringe() to the delay time, the rabi frequency, and the detuning """
+    detuning = freq - resonance
+    rabi_freq_eff = np.sqrt(rabi_freq * rabi_freq + detuning * detuning)
+    t = delay_time
+
+    # Derivatives are listed in the order (delay time, rabi frequency, detuning)
+    ratio = rabi_freq_eff / rabi_freq
+    d_ratio = (0.0, -detuning ** 2 / (rabi_freq_eff * rabi_freq ** 2), detuning / (rabi_freq_eff * rabi_freq))
+    d_rabi_freq_eff = (0.0, rabi_freq / rabi_freq_eff, detuning / rabi_freq_eff)
+
+    scale = rabi_freq ** 2 / rabi_freq_eff ** 4
+    d_scale = (0.0, scale * (2 / rabi_freq - 4 * rabi_freq / rabi_freq_eff ** 2),
+               scale * (-4 * detuning / rabi_freq_eff ** 2))
+
+    pulse = np.sin(np.pi / 2 * ratio) ** 2
+    d_pulse = [np.sin(np.pi * ratio) * np.pi / 2 * d for d in d_ratio]
+
+    phi = np.pi * (1 / 4 - t * rabi_freq) * detuning / rabi_freq
+    d_phi = (-np.pi * detuning, -np.pi * detuning / (4 * rabi_freq ** 2), np.pi * (1 / (4 * rabi_freq) - t))
+    sin, cos = np.sin(phi), np.cos(phi)
+    tan = np.tan(rabi_freq_eff / rabi_freq * np.pi / 4)
+    d_tan = [(1 + tan ** 2) * np.pi / 4 * d for d in d_ratio]
+
+    amp = rabi_freq_eff * cos + detuning * sin * tan
+    d_amp = [d_eff * cos + (detuning * cos * tan - rabi_freq_eff * sin) * d_p + detuning * sin * d_t
+             for d_eff, d_p, d_t in zip(d_rabi_freq_eff, d_phi, d_tan)]
+    d_amp[2] = d_amp[2] + sin * tan
+
+    value = scale * pulse * amp ** 2
+    partials = [d_s * pulse * amp ** 2 + scale * d_pl * amp ** 2 + 2 * scale * pulse * amp * d_a
+                for d_s, d_pl, d_a in zip(d_scale, d_pulse, d_amp)]
+    return value, partials
+
+
+def ramsey_fringe_value_and_jacobian(freq, delay_time, rabi_freq, resonance):
+    value, (d_time, d_rabi_freq, d_detuning) = _ramsey_partials(np.asarray(freq, dtype=float),
+                                                                delay_time, rabi_freq, resonance)
+    return value, _columns(d_time, d_rabi_freq, -d_detuning)
+
+
+def ramsey_fringe_flattened_value_and_jacobian(fd_point, rabi_freq, resonance):
+    fd_point = np.asarray(fd_point, dtype=float)
+    value, (_, d_rabi_freq, d_detuning) = _ramsey_partials(fd_point[0], fd_point[1], rabi_freq, resonance)
+    return value, _columns(d_rabi_freq, -d_detuning)
+
+
+def simple_ramsey_fringe_value_and_jacobian(freq, delay_time, resonance):
+    detuning = np.asarray(freq, dtype=float) - resonance
+    theta = np.pi * delay_time * detuning
+    d_theta = -np.sin(2.0 * theta)
+    return np.cos(theta) ** 2, _columns(d_theta * np.pi * detuning, -d_theta * np.pi * delay_time)
+
+
+def phase_oscillation_value_and_jacobian(phase, amp, phase_offset, offset):
+    theta = 2.0 * np.pi * (np.asarray(phase, dtype=float) - phase_offset)
+    sin = np.sin(theta)
+    return amp * sin + offset, _columns(sin, -2.0 * np.pi * amp * np.cos(theta), 1.0)
+
+
+_VALUE_AND_JACOBIAN = {
+    linear: linear_value_and_jacobian,
+    sinusoidal: sinusoidal_value_and_jacobian,
+    exp_decay: exp_decay_value_and_jacobian,
+    sinusoidal_decay: sinusoidal_decay_value_and_jacobian,
+    sinc_squared: sinc_squared_value_and_jacobian,
+    gaussian: gaussian_value_and_jacobian,
+    rabi_oscillation: rabi_oscillation_value_and_jacobian,
+    rabi_oscillation_flattened: rabi_oscillation_flattened_value_and_jacobian,
+    rabi_oscillation_on_resonance: rabi_oscillation_on_resonance_value_and_jacobian,
+    ramsey_fringe: ramsey_fringe_value_and_jacobian,
+    ramsey_fringe_flattened: ramsey_fringe_flattened_value_and_jacobian,
+    simple_ramsey_fringe: simple_ramsey_fringe_value_and_jacobian,
+    phase_oscillation: phase_oscillation_value_and_jacobian,
+}
+""" fused value and Jacobian function of each model function """
+
+
+def get_value_and_jacobian(function):
+    """
+    get the fused value and Jacobian function of a model function
+
+    :param function: model function f(x, *params)
+    :return: function f(x, *params) that returns the value and the Jacobian, None if not available
+    """
+    return _VALUE_AND_JACOBIAN.get(function)
+
+
+def get_jacobian(function):
+    """
+    get the analytic Jacobian of a model function, e.g. for the jac argument of curve_fit()
+
+    :param function: model function f(x, *params)
+    :return: function jac(x, *params) that returns an array with shape (points, parameters), None if not available
+    """
+    fused = _VALUE_AND_JACOBIAN.get(function)
+    if fused is None:
+        return None
+    return lambda x, *params: fused(x, *params)[1]
+
+
 """ useful functions """
 
 
@@ -0,0 +1,74 @@
+"""
+Compilation of pulse sequences into precomputed pulse tables.
+
+A pulse is a rotation given as an angle in radians and the phase of the drive as a phase offset word (POW).
+Adjacent pulses around the same axis are merged and pulses around opposite axes cancel,
+after which the sequence is converted to a table of pulse durations in machine units and phase offset words.
+"""
+
+import typing
+
+import numpy as np
+
+__all__ = ['PULSE_T', 'merge_pulses', 'pulse_table']
+
+PULSE_T = typing.Tuple[float, int]
+"""Pulse type, a tuple with the rotation angle in radians and the phase offset word."""
+
+
+def merge_pulses(pulses: typing.Iterable[PULSE_T], pow_pi: int, pow_mask: int,
+                 atol: float = 1e-9) -> typing.List[PULSE_T]:
+    """Merge adjacent pulses around the same or the opposite axis.
+
+    Two phase offset words are opposite if they differ by ``pow_pi``.
+    The merged pulse keeps the axis of the largest rotation and pulses that cancel are removed.
+    Rotations are not reduced modulo :math:`2\\pi`, which would break composite pulses.
+
+    :param pulses: The pulses to merge
+    :param pow_pi: Phase offset word of a half turn
+    :param pow_mask: Mask of valid phase offset word bits
+    :param atol: Absolute tolerance for a remaining angle to be considered zero
+    :return: The merged pulses
+    """
+    merged: typing.List[PULSE_T] = []
+    for angle, pow_ in pulses:
+        pow_ &= pow_mask
+        if not merged:
+            merged.append((angle, pow_))
+            continue
+
+        last_angle, last_pow = merged[-1]
+        if pow_ == last_pow:
+            merged[-1] = (last_angle + angle, last_pow)
+        elif pow_ == (last_pow + pow_pi) & pow_mask or last_pow == (pow_ + pow_pi) & pow_mask:
+            # Opposite axis, keep the axis of the largest rotation
+            merged[-1] = (last_angle - angle, last_pow) if last_angle >= angle else (angle - last_angle, pow_)
+        else:
+            merged.append((angle, pow_))
+            continue
+
+        if abs(merged[-1][0]) <= atol:
+            # Pulses cancelled
+            merged.pop()
+
+    return merged
+
+
+def pulse_table(pulses: typing.Sequence[PULSE_T], pi_duration_mu: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Convert pulses into a table of durations and phase offset words.
+
+    Pulses that round to a zero duration are removed.
+
+    :param pulses: The pulses, angles must be positive
+    :param pi_duration_mu: Duration of a pi pulse in machine units
+    :return: A tuple with an array of durations (int64) and an array of phase offset words (int32)
+    """
+    assert pi_duration_mu > 0, 'Pi duration must be greater than zero'
+    if not pulses:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+
+    angles, pows = (np.asarray(a) for a in zip(*pulses))
+    assert np.all(angles >= 0.0), 'Pulse angles must be positive'
+    durations = np.rint(angles / np.pi * pi_duration_mu).astype(np.int64)
+    nonzero = durations > 0
+    return durations[nonzero], pows[nonzero].astype(np.int32)
@@ -0,0 +1,121 @@
+"""
+Vectorized analysis of PMT count data.
+
+Count data of a scan is stored as one contiguous array with shape (points x samples x channels).
+Results are indexed the same way as the results of the DAX histogram context, i.e. ``[channel][point]``.
+"""
+
+import typing
+
+import numpy as np
+
+__all__ = ['CountData']
+
+
+class CountData:
+    """PMT count data of a scan stored as one contiguous array."""
+
+    def __init__(self, counts: typing.Any):
+        """Create a new count data object.
+
+        :param counts: Array-like PMT counts with shape (points x samples x channels)
+        :raises ValueError: Raised if the data has the wrong shape or contains negative counts
+        """
+        counts = np.ascontiguousarray(counts, dtype=np.int64)
+        if counts.ndim != 3:
+            raise ValueError('Count data must be 3-dimensional (points x samples x channels)')
+        if counts.size and counts.min() < 0:
+            raise ValueError('Count data can not contain negative counts')
+        self._counts: np.ndarray = counts
+
+    @classmethod
+    def from_raw(cls, raw: typing.Sequence[typing.Sequence[typing.Sequence[int]]]) -> 'CountData':
+        """Create a count data object from raw histogram data.
+
+        :param raw: Raw data indexed as ``raw[point][sample][channel]``
+        :return: The count data object
+        :raises ValueError: Raised if points have a different number of samples
+        """
+        if len(raw) == 0:
+            return cls(np.zeros((0, 0, 0), dtype=np.int64))
+        if any(len(p) != len(raw[0]) for p in raw):
+            raise ValueError('All points must have the same number of samples')
+        return cls(raw)
+
+    """Properties"""
+
+    @property
+    def counts(self) -> np.ndarray:
+        """The count array with shape (points x samples x channels)."""
+        return self._counts
+
+    @property
+    def num_points(self) -> int:
+        return self._counts.shape[0]
+
+    @property
+    def num_samples(self) -> int:
+        return self._counts.shape[1]
+
+    @property
+    def num_channels(self) -> int:
+        return self._counts.shape[2]
+
+    """Analysis"""
+
+    def histograms(self, max_count: typing.Optional[int] = None) -> np.ndarray:
+        """Return the histograms of all channels and points.
+
+        :param max_count: The highest count in the histogram, counts above are clipped (defaults to the maximum count)
+        :return: Array with shape (channels x points x counts) where the last axis is indexed by the count value
+        """
+        if max_count is None:
+            max_count = int(self._counts.max()) if self._counts.size else 0
+        assert max_count >= 0, 'Maximum count can not be negative'
+        num_bins = max_count + 1
+
+        # Offset every (channel, point) pair into its own range of bins and count all data in a single pass
+        counts = np.minimum(self._counts, max_count).transpose(2, 0, 1)  # channels x points x samples
+        offsets = np.arange(self.num_channels * self.num_points).reshape(self.num_channels, self.num_points, 1)
+        bins = np.bincount((counts + offsets * num_bins).ravel(),
+                           minlength=self.num_channels * self.num_points * num_bins)
+        return bins.reshape(self.num_channels, self.num_points, num_bins)
+
+    def probabilities(self, state_detection_threshold: int) -> np.ndarray:
+        """Return the state probabilities of all channels and points.
+
+        Consistent with the DAX histogram context, a sample is counted as one
+        if its count is strictly above the state detection threshold.
+
+        :param state_detection_threshold: The state detection threshold
+        :return: Array with shape (channels x points)
+        """
+        return np.mean(self._counts > state_detection_threshold, axis=1).transpose()
+
+    def mean_counts(self) -> np.ndarray:
+        """Return the mean counts of all channels and points.
+
+        :return: Array with shape (channels x points)
+        """
+        return np.mean(self._counts, axis=1).transpose()
+
+    def stdev_counts(self) -> np.ndarray:
+        """Return the standard deviation of the counts of all channels and points.
+
+        :return: Array with shape (channels x points)
+        """
+        return np.std(self._counts, axis=1).transpose()
+
+    def analyze(self, state_detection_threshold: int) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the histograms, state probabilities, and mean counts using a single pass over the data.
+
+        The probabilities and mean counts are derived from the histograms.
+
+        :param state_detection_threshold: The state detection threshold
+        :return: A tuple ``(histograms, probabilities, mean_counts)``, see the individual functions for the shapes
+        """
+        histograms = self.histograms()
+        num_samples = max(self.num_samples, 1)
+        probabilities = histograms[:, :, max(state_detection_threshold + 1, 0):].sum(axis=2) / num_samples
+        mean_counts = histograms @ np.arange(histograms.shape[2]) / num_samples
+        return histograms, probabilities, mean_counts
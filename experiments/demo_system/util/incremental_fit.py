@@ -0,0 +1,186 @@
+"""
+Incremental fitting of scan data.
+
+The model is refitted every time new data arrives, warm-started from the previous fit.
+"""
+
+import typing
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+from demo_system.util.functions import get_jacobian
+
+__all__ = ['IncrementalFit']
+
+_P0_T = typing.Union[typing.Sequence[float], typing.Callable[[np.ndarray, np.ndarray], typing.Sequence[float]]]
+"""Initial guess type, either a sequence or a callable that takes the x and y data."""
+
+
+class IncrementalFit:
+    """Fit a model incrementally to scan data."""
+
+    def __init__(self, function: typing.Callable[..., typing.Any], p0: _P0_T, *,
+                 bounds: typing.Tuple[typing.Any, typing.Any] = (-np.inf, np.inf),
+                 value: typing.Optional[typing.Callable[[np.ndarray], float]] = None,
+                 min_points: typing.Optional[int] = None,
+                 jac: typing.Optional[typing.Callable[..., np.ndarray]] = None):
+        """Create a new incremental fit.
+
+        :param function: The model function ``f(x, *params)``
+        :param p0: Initial guess for the first fit, or a callable ``p0(x, y)`` that returns the initial guess
+        :param bounds: Bounds of the parameters, see :func:`scipy.optimize.curve_fit`
+        :param value: Callable that derives the value of interest from the parameters (defaults to the first parameter)
+        :param min_points: Minimum number of points before fitting (defaults to the number of parameters plus one)
+        :param jac: Jacobian ``jac(x, *params)`` of the model, defaults to the analytic Jacobian of the function
+            if available (see :func:`demo_system.util.functions.get_jacobian`), otherwise finite differences are used
+        """
+        assert callable(function), 'Function must be callable'
+
+        self._function = function
+        self._p0 = p0
+        self._bounds = bounds
+        self._value: typing.Callable[[np.ndarray], float] = (lambda p: p[0]) if value is None else value
+        self._min_points = min_points
+        self._jac = get_jacobian(function) if jac is None else jac
+
+        # Fit results
+        self._popt: typing.Optional[np.ndarray] = None
+        self._pcov: typing.Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Discard the fit results, the next fit will start from the initial guess."""
+        self._popt = None
+        self._pcov = None
+
+    def update(self, x: typing.Sequence[float], y: typing.Sequence[float],
+               sigma: typing.Optional[typing.Sequence[float]] = None) -> bool:
+        """Refit the model to the data, warm-started from the previous fit.
+
+        If the fit fails, the previous results are kept.
+
+        :param x: The x data
+        :param y: The y data
+        :param sigma: Uncertainty of the y data, see :func:`scipy.optimize.curve_fit`
+        :return: :const:`True` if the fit succeeded
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        assert len(x) == len(y), 'Data length mismatch'
+
+        p0 = self._popt
+        if p0 is None:
+            p0 = self._p0(x, y) if callable(self._p0) else self._p0
+        min_points = len(p0) + 1 if self._min_points is None else self._min_points
+        if len(x) < min_points:
+            return False
+
+        try:
+            popt, pcov = curve_fit(self._function, x, y, p0=p0, sigma=sigma, bounds=self._bounds,
+                                   jac=self._jac)
+        except (RuntimeError, ValueError):
+            return False
+        else:
+            self._popt, self._pcov = popt, pcov
+            return True
+
+    """Fit results"""
+
+    @property
+    def has_fit(self) -> bool:
+        """:const:`True` if fit results are available."""
+        return self._popt is not None
+
+    @property
+    def popt(self) -> np.ndarray:
+        """The fitted parameters."""
+        if self._popt is None:
+            raise RuntimeError('No fit results available')
+        return self._popt
+
+    @property
+    def perr(self) -> np.ndarray:
+        """The standard deviation of the fitted parameters."""
+        if self._pcov is None:
+            raise RuntimeError('No fit results available')
+        return np.sqrt(np.diag(self._pcov))
+
+    @property
+    def value(self) -> float:
+        """The value of interest derived from the fitted parameters."""
+        return float(self._value(self.popt))
+
+    @property
+    def uncertainty(self) -> float:
+        """The standard deviation of the value of interest, propagated from the parameter covariance."""
+        if not np.all(np.isfinite(self._pcov)):
+            return np.inf
+        gradient = self._value_gradient()
+        return float(np.sqrt(max(gradient @ self._pcov @ gradient, 0.0)))
+
+    def _value_gradient(self) -> np.ndarray:
+        """Numerical gradient of the value of interest with respect to the parameters."""
+        popt = self.popt
+        gradient = np.empty_like(popt)
+        for i in range(len(popt)):
+            step = 1e-6 * max(abs(popt[i]), 1e-12)
+            p_hi, p_lo = popt.copy(), popt.copy()
+            p_hi[i] += step
+            p_lo[i] -= step
+            gradient[i] = (self._value(p_hi) - self._value(p_lo)) / (2 * step)
+        return gradient
+
+    def jacobian(self, x: typing.Sequence[float]) -> np.ndarray:
+        """Jacobian of the model with respect to the parameters, evaluated at the fitted parameters.
+
+        Uses the Jacobian of the model if available, otherwise the Jacobian is obtained numerically.
+
+        :param x: The x data
+        :return: Array with shape (x x parameters)
+        """
+        x = np.asarray(x)
+        popt = self.popt
+        if self._jac is not None:
+            return np.asarray(self._jac(x, *popt))
+        jacobian = np.empty((len(x), len(popt)))
+        for i in range(len(popt)):
+            step = 1e-6 * max(abs(popt[i]), 1e-12)
+            p_hi, p_lo = popt.copy(), popt.copy()
+            p_hi[i] += step
+            p_lo[i] -= step
+            jacobian[:, i] = (self._function(x, *p_hi) - self._function(x, *p_lo)) / (2 * step)
+        return jacobian
+
+    def variance_reduction(self, x: typing.Sequence[float], num_samples: int) -> np.ndarray:
+        """Expected reduction of the variance of the value of interest when measuring more samples at x.
+
+        The model is assumed to return a probability and every sample is a Bernoulli trial.
+        The reduction is the rank-one update of the parameter covariance with the Fisher information
+        of ``num_samples`` additional samples, projected onto the value of interest.
+
+        :param x: Candidate x values
+        :param num_samples: Number of additional samples at each candidate
+        :return: The expected variance reduction for each candidate, zero if the fit has no valid covariance
+        """
+        assert num_samples > 0, 'Number of samples must be greater than zero'
+        x = np.asarray(x)
+        if not np.all(np.isfinite(self._pcov)):
+            return np.zeros(len(x))
+
+        prob = np.clip(self.evaluate(x), 1e-3, 1 - 1e-3)
+        jacobian = self.jacobian(x)  # x x parameters
+        cov_jacobian = jacobian @ self._pcov  # x x parameters
+        # Covariance between the value of interest and the model at x
+        value_cov = cov_jacobian @ self._value_gradient()
+        # Variance of the model at x plus the variance of the new measurement
+        model_var = np.einsum('ij,ij->i', cov_jacobian, jacobian)
+        measurement_var = prob * (1 - prob) / num_samples
+        return value_cov ** 2 / (model_var + measurement_var)
+
+    def evaluate(self, x: typing.Sequence[float]) -> np.ndarray:
+        """Evaluate the model with the fitted parameters.
+
+        :param x: The x data
+        :return: The model values
+        """
+        return self._function(np.asarray(x), *self.popt)
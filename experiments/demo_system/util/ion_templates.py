@@ -0,0 +1,53 @@
+"""
+PMT count templates for classifying the number of ions.
+
+Row ``n - 1`` of a template matrix is the expected relative PMT intensity per channel for ``n`` ions.
+Templates are normalized and scaled to integers, which allows the number of ions to be classified
+on raw counts using integer dot products only.
+"""
+
+import typing
+
+import numpy as np
+
+__all__ = ['TEMPLATE_SCALE', 'default_templates', 'normalize_templates']
+
+TEMPLATE_SCALE: int = 1 << 10
+"""Integer scale of normalized templates."""
+
+
+def default_templates(num_channels: int) -> np.ndarray:
+    """Return the default templates for a linear chain centered on a linear PMT array.
+
+    The ions of an ``n`` ion chain are imaged on an interval of ``n`` channels wide
+    centered on the array and every channel receives the overlapping part of that interval.
+
+    :param num_channels: The number of PMT channels
+    :return: Array with shape (ions x channels)
+    """
+    assert num_channels > 0, 'Number of channels must be greater than zero'
+    center = (num_channels - 1) / 2
+    lower = np.arange(num_channels) - 0.5  # Lower edges of the channels
+    templates = np.empty((num_channels, num_channels))
+    for n in range(1, num_channels + 1):
+        templates[n - 1] = np.clip(np.minimum(lower + 1, center + n / 2) - np.maximum(lower, center - n / 2), 0, 1)
+    return templates
+
+
+def normalize_templates(templates: typing.Sequence[typing.Sequence[float]], scale: int = TEMPLATE_SCALE) -> np.ndarray:
+    """Normalize templates to unit length and scale them to integers.
+
+    :param templates: Templates with shape (ions x channels)
+    :param scale: The integer scale of the normalized templates
+    :return: Array with shape (ions x channels) and type int32
+    :raises ValueError: Raised if the templates have the wrong shape or contain an empty or negative template
+    """
+    templates = np.asarray(templates, dtype=np.float64)
+    if templates.ndim != 2 or templates.shape[0] == 0:
+        raise ValueError('Templates must be 2-dimensional (ions x channels)')
+    if np.any(templates < 0):
+        raise ValueError('Templates can not contain negative values')
+    norm = np.linalg.norm(templates, axis=1, keepdims=True)
+    if np.any(norm == 0):
+        raise ValueError('Templates can not be empty')
+    return np.round(templates / norm * scale).astype(np.int32)
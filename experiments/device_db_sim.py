@@ -5,9 +5,11 @@ core_addr = "192.168.95.213"
 device_db = {
     "core": {
         "type": "local",
-        "module": "artiq.coredevice.core",
+        "module": "demo_system.coredevice.core",
         "class": "Core",
-        "arguments": {"host": core_addr, "ref_period": 1e-09, "target": "rv32g"},
+        "arguments": {"host": core_addr, "ref_period": 1e-09, "target": "rv32g",
+                      # On-disk kernel compile cache, remove to disable
+                      "compile_cache": "~/.cache/demo_system/kernels", "compile_cache_size": "1 GiB"},
     },
     "core_log": {
         "type": "controller",
@@ -177,7 +179,7 @@ device_db["ttl_urukul0_sw3"] = {
 
 device_db["urukul0_cpld"] = {
     "type": "local",
-    "module": "artiq.coredevice.urukul",
+    "module": "demo_system.coredevice.urukul",
     "class": "CPLD",
     "arguments": {
         "spi_device": "spi_urukul0",
@@ -191,7 +193,7 @@ device_db["urukul0_cpld"] = {
 
 device_db["urukul0_ch0"] = {
     "type": "local",
-    "module": "artiq.coredevice.ad9910",
+    "module": "demo_system.coredevice.ad9910",
     "class": "AD9910",
     "arguments": {
         "pll_en": 1,
@@ -204,7 +206,7 @@ device_db["urukul0_ch0"] = {
 
 device_db["urukul0_ch1"] = {
     "type": "local",
-    "module": "artiq.coredevice.ad9910",
+    "module": "demo_system.coredevice.ad9910",
     "class": "AD9910",
     "arguments": {
         "pll_en": 1,
@@ -217,7 +219,7 @@ device_db["urukul0_ch1"] = {
 
 device_db["urukul0_ch2"] = {
     "type": "local",
-    "module": "artiq.coredevice.ad9910",
+    "module": "demo_system.coredevice.ad9910",
     "class": "AD9910",
     "arguments": {
         "pll_en": 1,
@@ -230,7 +232,7 @@ device_db["urukul0_ch2"] = {
 
 device_db["urukul0_ch3"] = {
     "type": "local",
-    "module": "artiq.coredevice.ad9910",
+    "module": "demo_system.coredevice.ad9910",
     "class": "AD9910",
     "arguments": {
         "pll_en": 1,
@@ -0,0 +1,64 @@
+from demo_system.system import *
+from demo_system.modules.util.dds import DDSBase, DEFAULT_SLACK_MARGIN
+
+
+class LatencyCalibration(DemoSystem, EnvExperiment):
+    """Latency calibration"""
+
+    def build(self) -> None:
+        # Build system
+        super(LatencyCalibration, self).build()
+
+        # Add arguments
+        self.slack_margin = self.get_argument(
+            "Slack margin",
+            NumberValue(DEFAULT_SLACK_MARGIN, "us", step=1 * us, min=0 * us),
+            tooltip="Margin added to the calibrated latencies for operations without latency compensation",
+        )
+        self.measure_reference = self.get_argument(
+            "Measure loopback reference",
+            BooleanValue(False),
+            group="Switches",
+            tooltip="Measure the loopback reference, requires the loopback output to be connected to the input",
+        )
+        self.measure_switches = self.get_argument(
+            "Measure switch latencies",
+            BooleanValue(False),
+            group="Switches",
+            tooltip="Measure the latency of all switches connected to the loopback input",
+        )
+
+    def prepare(self):
+        # Check arguments
+        assert self.slack_margin >= 0.0
+
+    def run(self):
+        # Initialize system
+        self.dax_init()
+
+        # Calibrate all DDS
+        for key, dds in self.registry.search_modules(DDSBase).items():
+            self.logger.info(f"Calibrating {key}")
+            dds.update_config_latency()
+            dds.update_att_latency()
+            dds.set_dataset_sys(dds.SLACK_MARGIN_KEY, self.slack_margin)
+
+        # Calibrate profile switching of the 370 laser
+        self.l370.set_dataset_sys(DDSBase.SLACK_MARGIN_KEY, self.slack_margin)
+        if self.l370._profile_mode:
+            self.l370.update_profile_latency()
+
+        # Calibrate switches
+        if self.measure_reference:
+            self.latency.update_reference_latency()
+        if self.measure_switches:
+            self.latency.update_switch_latencies()
+
+        # Return system to idle
+        self.idle()
+
+
+if __name__ == '__main__':
+    from artiq.frontend.artiq_run import run
+
+    run()
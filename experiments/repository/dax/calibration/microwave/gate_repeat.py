@@ -1,12 +1,11 @@
 import numpy as np
-from scipy.stats import linregress
 
 from dax.util.units import freq_to_str
-from dax.util.sub_experiment import SubExperiment
 
 from demo_system.system import *
 from demo_system.templates.gate_scan import GateScan
 from demo_system.util.functions import linear
+from demo_system.util.incremental_fit import IncrementalFit
 
 
 class MicrowaveGateRepeatScan(GateScan, Experiment):
@@ -19,6 +18,8 @@ class MicrowaveGateRepeatScan(GateScan, Experiment):
     MW_GATE_FREQ_LABEL = "Microwave gate frequency"
     UPDATE_DATASET_LABEL = "Update dataset"
 
+    FIT_UNCERTAINTY_UNIT = "Hz"
+
     def build_gate_scan(self):
         # Add scans
         self.add_scan(
@@ -71,6 +72,10 @@ class MicrowaveGateRepeatScan(GateScan, Experiment):
         # Clear the fit data (useful when this experiment is used as a sub-experiment)
         self.clear_fit()
 
+    def gate_duration(self) -> float:
+        max_gate_time = max(self.get_scannables()[self.MW_GATE_TIME_KEY])
+        return (self.num_gates + 0.5) * max_gate_time
+
     @kernel
     def gate_setup(self):
         # Set microwave frequency and reset phase
@@ -84,22 +89,33 @@ class MicrowaveGateRepeatScan(GateScan, Experiment):
             self.microwave.pulse(point.mw_gate_time)
         self.microwave.pulse(point.mw_gate_time / 2.0)
 
+    def build_fit(self):
+        return IncrementalFit(
+            linear,
+            lambda time, prob: np.polyfit(time, prob, 1),
+            value=self._rabi_freq,
+            min_points=2,
+        )
+
+    @staticmethod
+    def _rabi_freq(p):
+        # The pi time is where the linear fit crosses 0.5
+        slope, intercept = p
+        return 1 / (2 * ((0.5 - intercept) / slope))
+
     def host_exit(self) -> None:
         """Calibrate microwave Rabi frequency."""
 
-        # Obtain x data
-        scannables = self.get_scannables()
-        time = np.asarray(scannables[self.MW_GATE_TIME_KEY])
+        # Obtain x data and probability of active channel 0
+        time, prob = self.get_fit_data(self.MW_GATE_TIME_KEY)
 
-        # Get probability
-        prob = np.asarray(
-            self.state.histogram.get_probabilities()[0]
-        )  # active channel 0
-
-        # Fit (linear regression)
-        slope, intercept, _, _, _ = linregress(time, prob)
+        # Fit (linear least squares)
+        if not self.incremental_fit.update(time, prob):
+            self.logger.warning("Failed to fit the microwave gate repeat scan, dataset not updated")
+            return
+        slope, intercept = self.incremental_fit.popt
         if slope != 0:
-            rabi_freq = 1 / (2 * ((0.5 - intercept) / slope))
+            rabi_freq = self._rabi_freq((slope, intercept))
         else:
             rabi_freq = self.microwave.fetch_rabi_freq()
         self.logger.info(
@@ -113,17 +129,18 @@ class MicrowaveGateRepeatScan(GateScan, Experiment):
             self.microwave.store_rabi_freq(rabi_freq)
 
 
-class MicrowaveGateRepeatScanIter(DemoSystem, Experiment):
-    """Microwave gate repeat scan - Iterator"""
+class MicrowaveGateRepeatScanIter(EnvExperiment):
+    """Microwave gate repeat scan - Iterator
 
-    def __init__(self, managers, *args, **kwargs):
-        # Capture the managers before passing them to super
-        self._managers = managers
-        super(MicrowaveGateRepeatScanIter, self).__init__(managers, *args, **kwargs)
+    The gate repeat scan is built once and runs for every iteration,
+    its options (e.g. the number of samples) apply to all iterations.
+    """
 
     def build(self):
-        # Call super
-        super(MicrowaveGateRepeatScanIter, self).build()
+        # Gate repeat scan, the gate time points and number of gates are set for every iteration
+        self.scan = MicrowaveGateRepeatScan(
+            self, parent_scans=[MicrowaveGateRepeatScan.MW_GATE_TIME_KEY]
+        )
 
         # Arguments
         self.num_iterations = self.get_argument(
@@ -169,35 +186,30 @@ class MicrowaveGateRepeatScanIter(DemoSystem, Experiment):
         )
 
     def run(self):
-        # Get a sub-experiment runner
-        sub_experiment = SubExperiment(self, self._managers)
-
         for i in range(self.num_iterations):
             # Report values
-            self.logger.info(
+            self.scan.logger.info(
                 f"Iteration {i + 1}, "
-                f"MW Rabi freq = {freq_to_str(self.microwave.fetch_rabi_freq(), precision=9)}"
+                f"MW Rabi freq = {freq_to_str(self.scan.microwave.fetch_rabi_freq(), precision=9)}"
             )
-            self.logger.info(
+            self.scan.logger.info(
                 f"span={freq_to_str(self.span)}, "
                 f"step={freq_to_str(self.step)}, "
                 f"num_gates={self.num_gates}"
             )
 
-            # Assemble experiment arguments
-            arguments = {
-                MicrowaveGateRepeatScan.MW_GATE_TIME_LABEL: CenterScan(
-                    self.microwave.pi_time(), self.span, self.step
-                ),
-                MicrowaveGateRepeatScan.NUM_GATES_LABEL: self.num_gates,
-                MicrowaveGateRepeatScan.MW_GATE_FREQ_LABEL: self.microwave.fetch_qubit_freq(),
-                MicrowaveGateRepeatScan.UPDATE_DATASET_LABEL: True,
-            }
-
-            # Run the sub-experiment
-            sub_experiment.run(
-                MicrowaveGateRepeatScan, "mw_gate_repeat_scan", arguments=arguments
+            # Rerun the scan, kernels are reused if the kernel invariants did not change (see the compile cache)
+            self.scan.set_scan_points(
+                MicrowaveGateRepeatScan.MW_GATE_TIME_KEY,
+                CenterScan(self.scan.microwave.fetch_pi_time(), self.span, self.step),
             )
+            self.scan.num_gates = int(round(self.num_gates))
+            self.scan.mw_freq = self.scan.microwave.fetch_qubit_freq()
+            self.scan.update_dataset = True
+            self.scan.state.histogram.config_dataset(f"mw_gate_repeat_scan_{i}")
+            self.scan.prepare()
+            self.scan.run()
+            self.scan.analyze()
 
             # Update values
             self.span *= self.span_sf
@@ -76,9 +76,7 @@ class MicrowaveQubitFreqGateScan(GateScan, Experiment):
         freq = np.asarray(scannables[self.MW_GATE_FREQ_KEY])
 
         # Get probability
-        prob = np.asarray(
-            self.state.histogram.get_probabilities()[0]
-        )  # active channel 0
+        prob = self.state.histogram.get_probabilities_array()[0]  # active channel 0
 
         # Fit
         (peak, mw_qubit_freq, c), _ = curve_fit(
@@ -67,9 +67,7 @@ class MicrowaveQubitTimeGateScan(GateScan, Experiment):
         time = np.asarray(scannables[self.MW_GATE_TIME_KEY])
 
         # Get probability
-        prob = np.asarray(
-            self.state.histogram.get_probabilities()[0]
-        )  # active channel 0
+        prob = self.state.histogram.get_probabilities_array()[0]  # active channel 0
 
         # Initial guess
         try:
@@ -1,12 +1,11 @@
 import numpy as np
-from scipy.optimize import curve_fit
 
 from demo_system.system import *
 from demo_system.templates.gate_scan import GateScan
 from demo_system.util.functions import gaussian
+from demo_system.util.incremental_fit import IncrementalFit
 
 from dax.util.units import freq_to_str, time_to_str
-from dax.util.sub_experiment import SubExperiment
 
 
 class MicrowaveRamseyFreqCalibration(GateScan, Experiment):
@@ -19,6 +18,7 @@ class MicrowaveRamseyFreqCalibration(GateScan, Experiment):
     UPDATE_DATASET_LABEL = "Update dataset"
 
     DEFAULT_SPAN = 0.001 * MHz
+    FIT_UNCERTAINTY_UNIT = "Hz"
 
     def build_gate_scan(self):
         # Add scans
@@ -65,6 +65,9 @@ class MicrowaveRamseyFreqCalibration(GateScan, Experiment):
         # Clear the fit data (useful when this experiment is used as a sub-experiment)
         self.clear_fit()
 
+    def gate_duration(self) -> float:
+        return 0.5 / self.microwave.rabi_freq() + self.ramsey_delay_time
+
     @kernel
     def gate_pre_action(self, point, index):
         # Set microwave frequency and reset phase
@@ -78,30 +81,28 @@ class MicrowaveRamseyFreqCalibration(GateScan, Experiment):
         delay(self.ramsey_delay_time)
         self.microwave.pulse(0.25 / self.microwave.rabi_freq())
 
-    def host_exit(self) -> None:
-        """Calibrate microwave qubit frequency."""
-
-        # Obtain x data
-        scannables = self.get_scannables()
-        freq = np.asarray(scannables[self.MW_GATE_FREQ_KEY])
-
-        # Get probability
-        prob = np.asarray(
-            self.state.histogram.get_probabilities()[0]
-        )  # active channel 0
-
-        # Fit
-        (peak, mw_qubit_freq, c), _ = curve_fit(
+    def build_fit(self):
+        return IncrementalFit(
             gaussian,
-            freq,
-            prob,
-            p0=[
+            lambda freq, prob: [
                 np.max(prob),
                 self.microwave.DEFAULT_QUBIT_FREQ,
                 1.0 / self.ramsey_delay_time,
             ],
             bounds=([0.0, 0 * MHz, 0 * kHz], [1.0, np.inf, np.inf]),
+            value=lambda p: p[1],
         )
+
+    def host_exit(self) -> None:
+        """Calibrate microwave qubit frequency."""
+
+        # Obtain x data and probability of active channel 0
+        freq, prob = self.get_fit_data(self.MW_GATE_FREQ_KEY)
+
+        # Fit
+        if not self.incremental_fit.update(freq, prob):
+            raise RuntimeError("Failed to fit the microwave qubit frequency")
+        peak, mw_qubit_freq, c = self.incremental_fit.popt
         self.logger.info(
             f"Calculated microwave qubit frequency: {freq_to_str(mw_qubit_freq)}"
         )
@@ -113,19 +114,18 @@ class MicrowaveRamseyFreqCalibration(GateScan, Experiment):
             self.microwave.store_qubit_freq(mw_qubit_freq)
 
 
-class MicrowaveRamseyFreqCalibrationIter(DemoSystem, Experiment):
-    """Ramsey Frequency Scan - Iterator"""
+class MicrowaveRamseyFreqCalibrationIter(EnvExperiment):
+    """Ramsey Frequency Scan - Iterator
 
-    def __init__(self, managers, *args, **kwargs):
-        # Capture the managers before passing them to super
-        self._managers = managers
-        super(MicrowaveRamseyFreqCalibrationIter, self).__init__(
-            managers, *args, **kwargs
-        )
+    The calibration scan is built once and runs for every iteration,
+    its options (e.g. the number of samples) apply to all iterations.
+    """
 
     def build(self):
-        # Call super
-        super(MicrowaveRamseyFreqCalibrationIter, self).build()
+        # Calibration scan, the frequency points and Ramsey delay time are set for every iteration
+        self.scan = MicrowaveRamseyFreqCalibration(
+            self, parent_scans=[MicrowaveRamseyFreqCalibration.MW_GATE_FREQ_KEY]
+        )
 
         # Arguments
         self.num_iterations = self.get_argument(
@@ -171,38 +171,31 @@ class MicrowaveRamseyFreqCalibrationIter(DemoSystem, Experiment):
         )
 
     def run(self):
-        # Get a sub-experiment runner
-        sub_experiment = SubExperiment(self, self._managers)
-
         for i in range(self.num_iterations):
             # Get the latest microwave qubit frequency
-            mw_qubit_frequency = self.microwave.fetch_qubit_freq()
+            mw_qubit_frequency = self.scan.microwave.fetch_qubit_freq()
 
             # Report values
-            self.logger.info(
+            self.scan.logger.info(
                 f"Iteration {i + 1}, MW qubit freq = {freq_to_str(mw_qubit_frequency, precision=12)}"
             )
-            self.logger.info(
+            self.scan.logger.info(
                 f"span={freq_to_str(self.span)}, "
                 f"step={freq_to_str(self.step)}, "
                 f"ramsey_time={time_to_str(self.ramsey_time)}"
             )
 
-            # Assemble experiment arguments
-            arguments = {
-                MicrowaveRamseyFreqCalibration.MW_GATE_FREQ_LABEL: CenterScan(
-                    mw_qubit_frequency, self.span, self.step
-                ),
-                MicrowaveRamseyFreqCalibration.RAMSEY_DELAY_TIME_LABEL: self.ramsey_time,
-                MicrowaveRamseyFreqCalibration.UPDATE_DATASET_LABEL: True,
-            }
-
-            # Run the sub-experiment
-            sub_experiment.run(
-                MicrowaveRamseyFreqCalibration,
-                "mw_ramsey_freq_calibration",
-                arguments=arguments,
+            # Rerun the scan, kernels are reused if the kernel invariants did not change (see the compile cache)
+            self.scan.set_scan_points(
+                MicrowaveRamseyFreqCalibration.MW_GATE_FREQ_KEY,
+                CenterScan(mw_qubit_frequency, self.span, self.step),
             )
+            self.scan.ramsey_delay_time = self.ramsey_time
+            self.scan.update_dataset = True
+            self.scan.state.histogram.config_dataset(f"mw_ramsey_freq_calibration_{i}")
+            self.scan.prepare()
+            self.scan.run()
+            self.scan.analyze()
 
             # Update values
             self.span *= self.span_sf
@@ -73,9 +73,7 @@ class MicrowaveRamseyPhaseCalibration(GateScan, Experiment):
         phase = np.asarray(scannables[self.PHASE_KEY])
 
         # Get probability
-        prob = np.asarray(
-            self.state.histogram.get_probabilities()[0]
-        )  # active channel 0
+        prob = self.state.histogram.get_probabilities_array()[0]  # active channel 0
 
         # Fit
         popt, pcov = curve_fit(
@@ -0,0 +1,192 @@
+import numpy as np
+
+from demo_system.system import *
+from demo_system.templates.gate_scan import GateScan
+from demo_system.util.clifford import PRIMITIVES, clifford_index, load_sequences
+from demo_system.util.functions import exp_decay, get_jacobian
+from demo_system.util.incremental_fit import IncrementalFit
+
+
+class MicrowaveRandomizedBenchmarking(GateScan, Experiment):
+    """Microwave randomized benchmarking"""
+
+    RB_LENGTH_KEY = "rb_length"
+
+    RB_LENGTH_LABEL = "Sequence length"
+    NUM_SEQUENCES_LABEL = "Number of sequences"
+    SEED_LABEL = "Seed"
+    INTERLEAVED_GATE_LABEL = "Interleaved gate"
+    REFERENCE_ERROR_LABEL = "Reference error per Clifford"
+    USE_SK1_LABEL = "SK1 composite pulses"
+    CACHE_DIR_LABEL = "Sequence cache"
+
+    NO_INTERLEAVED_GATE = "none"
+    """Interleaved gate option for standard randomized benchmarking."""
+    DEFAULT_CACHE_DIR = "~/.cache/demo_system/rb"
+    """Default directory of the on-disk sequence cache."""
+
+    def build_gate_scan(self):
+        # Add scans
+        self.add_scan(
+            self.RB_LENGTH_KEY,
+            self.RB_LENGTH_LABEL,
+            Scannable(
+                [
+                    ExplicitScan([1, 2, 4, 8, 16, 32, 64, 128, 256]),
+                    RangeScan(1, 201, 11),
+                    NoScan(16),
+                ],
+                global_min=0,
+                ndecimals=0,
+            ),
+        )
+
+        # Add regular arguments
+        self.num_sequences = self.get_argument(
+            self.NUM_SEQUENCES_LABEL,
+            NumberValue(50, min=1, step=1, ndecimals=0),
+            tooltip="Number of random sequences per sequence length, samples cycle through the sequences",
+        )
+        self.seed = self.get_argument(
+            self.SEED_LABEL,
+            NumberValue(0, min=0, step=1, ndecimals=0),
+            tooltip="Seed of the random sequences",
+        )
+        self.interleaved_gate = self.get_argument(
+            self.INTERLEAVED_GATE_LABEL,
+            EnumerationValue([self.NO_INTERLEAVED_GATE] + list(PRIMITIVES), self.NO_INTERLEAVED_GATE),
+            tooltip="Gate to interleave after every random Clifford (interleaved randomized benchmarking)",
+        )
+        self.reference_error = self.get_argument(
+            self.REFERENCE_ERROR_LABEL,
+            NumberValue(0.0, min=0.0, max=0.5, ndecimals=6),
+            tooltip="Error per Clifford of standard randomized benchmarking, "
+                    "used to obtain the interleaved gate error (0 to report the combined error)",
+        )
+        self.use_sk1 = self.get_argument(
+            self.USE_SK1_LABEL,
+            BooleanValue(False),
+            tooltip="Perform gates with SK1 composite pulses",
+        )
+        self.cache_dir = self.get_argument(
+            self.CACHE_DIR_LABEL,
+            StringValue(self.DEFAULT_CACHE_DIR),
+            tooltip="Directory to cache generated sequences, leave empty to disable the cache",
+        )
+        self.num_sequences = int(self.num_sequences)
+        self.update_kernel_invariants("num_sequences")
+
+    def host_enter(self) -> None:
+        # Call super
+        super(MicrowaveRandomizedBenchmarking, self).host_enter()
+
+        # Clear the fit data (useful when this experiment is used as a sub-experiment)
+        self.clear_fit()
+
+        if self._dma_shot:
+            self.logger.warning("DMA shot mode records one sequence per point, "
+                                "all samples of a point will use the same sequence")
+
+        # Generate sequences for all lengths, the index of a length in the scan selects its sequences
+        lengths = [int(round(length)) for length in self.get_scannables()[self.RB_LENGTH_KEY]]
+        interleaved = None if self.interleaved_gate == self.NO_INTERLEAVED_GATE \
+            else clifford_index([self.interleaved_gate])
+        gates, offsets = load_sequences(self.cache_dir or None, lengths, self.num_sequences,
+                                        int(self.seed), interleaved)
+        self.logger.debug(f"Loaded {len(offsets) - 1} sequences with {len(gates)} gates")
+
+        # Gates are embedded as bytes, ARTIQ has no int8 arrays
+        self._rb_gates: bytes = gates.astype(np.int8).tobytes()
+        self._rb_offsets: np.ndarray = offsets
+        self._rb_shot: np.int32 = np.int32(0)
+        self._mw_freq: float = self.microwave.fetch_qubit_freq()
+        self.update_kernel_invariants("_rb_gates", "_rb_offsets", "_mw_freq")
+
+        # Operation service used to perform the gates
+        self._q = self.mw_operation_sk1 if self.use_sk1 else self.mw_operation
+        self.update_kernel_invariants("_q")
+
+    def gate_duration(self) -> float:
+        # Every Clifford takes at most three primitive gates of at most a pi rotation (5 pi with SK1 corrections)
+        max_length = max(self.get_scannables()[self.RB_LENGTH_KEY])
+        num_cliffords = max_length * (1 if self.interleaved_gate == self.NO_INTERLEAVED_GATE else 2) + 1
+        return num_cliffords * 3 * self.microwave.pi_time() * (5 if self.use_sk1 else 1)
+
+    @kernel
+    def gate_setup(self):
+        # Set microwave frequency and reset phase
+        self.microwave.config_freq(self._mw_freq)
+        self.microwave.config_phase(0.0)
+        self._rb_shot = np.int32(0)
+
+    @kernel
+    def gate_action(self, point, index):
+        # Cycle through the sequences of this length
+        i = index.rb_length * self.num_sequences + self._rb_shot % self.num_sequences
+        self._rb_shot += 1
+        for j in range(self._rb_offsets[i], self._rb_offsets[i + 1]):
+            self._rb_gate(self._rb_gates[j])
+
+    @kernel
+    def _rb_gate(self, gate):
+        """Perform a primitive gate, see :data:`demo_system.util.clifford.PRIMITIVES`."""
+        if gate == 0:
+            self._q.x()
+        elif gate == 1:
+            self._q.y()
+        elif gate == 2:
+            self._q.sqrt_x()
+        elif gate == 3:
+            self._q.sqrt_x_dag()
+        elif gate == 4:
+            self._q.sqrt_y()
+        else:
+            self._q.sqrt_y_dag()
+
+    def build_fit(self):
+        return IncrementalFit(
+            self._decay,
+            lambda length, prob: [max(0.5 - np.min(prob), 1e-3), max(np.max(length), 1.0)],
+            bounds=([0.0, 1e-3], [1.0, np.inf]),
+            value=self._error_per_clifford,
+            jac=self._decay_jacobian,
+        )
+
+    @staticmethod
+    def _decay(length, amp, decay_constant):
+        # Recovered sequences return to the dark state, the bright state probability decays to 1/2
+        return 0.5 - exp_decay(length, amp, decay_constant)
+
+    @staticmethod
+    def _decay_jacobian(length, amp, decay_constant):
+        return -get_jacobian(exp_decay)(length, amp, decay_constant)
+
+    @staticmethod
+    def _error_per_clifford(p):
+        # Depolarizing parameter p = exp(-1 / decay_constant), error per Clifford r = (1 - p) / 2
+        _, decay_constant = p
+        return (1 - np.exp(-1 / decay_constant)) / 2
+
+    @staticmethod
+    def _interleaved_gate_error(error, reference_error):
+        # Gate error r = (1 - p_int / p_ref) / 2 with the depolarizing parameters p = 1 - 2r
+        return (1 - (1 - 2 * error) / (1 - 2 * reference_error)) / 2
+
+    def host_exit(self) -> None:
+        """Report the error per Clifford or the interleaved gate error."""
+
+        # Obtain x data and probability of active channel 0
+        length, prob = self.get_fit_data(self.RB_LENGTH_KEY)
+
+        if not self.incremental_fit.update(length, prob):
+            self.logger.warning("Failed to fit the randomized benchmarking decay")
+            return
+        error = self.incremental_fit.value
+        if self.interleaved_gate == self.NO_INTERLEAVED_GATE:
+            self.logger.info(f"Error per Clifford: {error:.3e}")
+        elif self.reference_error > 0.0:
+            gate_error = self._interleaved_gate_error(error, self.reference_error)
+            self.logger.info(f"Interleaved {self.interleaved_gate} gate error: {gate_error:.3e}")
+        else:
+            self.logger.info(f"Combined error per Clifford and interleaved {self.interleaved_gate} gate: {error:.3e}")
+        self.plot_fit_single(self.incremental_fit.evaluate(length))
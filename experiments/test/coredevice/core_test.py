@@ -1,4 +1,7 @@
+import os
+import json
 import unittest
+import tempfile
 # import logging
 # import numpy as np
 
@@ -45,6 +48,139 @@ class CoreTestCase(unittest.TestCase):
             self.assertEqual(demo_system.coredevice.core._str_to_bytes(s), r)
 
 
+class _Module:
+    def __init__(self, ir):
+        self.ir = ir
+        self.num_built = 0
+
+    def build_llvm_ir(self, target):
+        self.num_built += 1
+        return self.ir
+
+
+class _Target:
+    triple = 'test'
+
+    def __init__(self):
+        self.num_compiled = 0
+
+    def compile_and_link(self, modules):
+        self.num_compiled += 1
+        return ''.join(m.build_llvm_ir(self) for m in modules).encode()
+
+
+class CompileCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = demo_system.coredevice.core._CompileCache(self.tmp_dir.name)
+        self.target = self.cache.wrap_target_cls(_Target)()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_hit_miss(self):
+        modules = [_Module('foo')]
+        self.assertEqual(self.target.compile_and_link(modules), b'foo')
+        self.assertFalse(self.cache.last_hit)
+        self.assertEqual(self.target.compile_and_link(modules), b'foo')
+        self.assertTrue(self.cache.last_hit)
+        self.assertEqual(self.target.num_compiled, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # Different IR (e.g. a changed kernel invariant) misses
+        self.assertEqual(self.target.compile_and_link([_Module('bar')]), b'bar')
+        self.assertFalse(self.cache.last_hit)
+        self.assertEqual(self.target.num_compiled, 2)
+
+    def test_miss_builds_ir_once(self):
+        modules = [_Module('foo'), _Module('bar')]
+        self.assertEqual(self.target.compile_and_link(modules), b'foobar')
+        self.assertFalse(self.cache.last_hit)
+        self.assertListEqual([m.num_built for m in modules], [1, 1])
+        # The original method is restored
+        self.assertEqual(modules[0].build_llvm_ir(self.target), 'foo')
+        self.assertEqual(modules[0].num_built, 2)
+
+    def test_persistent(self):
+        self.target.compile_and_link([_Module('foo')])
+        cache = demo_system.coredevice.core._CompileCache(self.tmp_dir.name)
+        target = cache.wrap_target_cls(_Target)()
+        self.assertEqual(target.compile_and_link([_Module('foo')]), b'foo')
+        self.assertTrue(cache.last_hit)
+        self.assertEqual(target.num_compiled, 0)
+
+    def test_evict(self):
+        cache = demo_system.coredevice.core._CompileCache(self.tmp_dir.name, max_size=8)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+        os.utime(cache._file('a'), (1, 1))
+        os.utime(cache._file('b'), (2, 2))
+        # A hit marks the library as recently used
+        self.assertEqual(cache.get('a'), b'aaaa')
+        cache.put('c', b'cccc')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'aaaa')
+        self.assertEqual(cache.get('c'), b'cccc')
+
+    def test_evict_keep(self):
+        cache = demo_system.coredevice.core._CompileCache(self.tmp_dir.name, max_size=0)
+        cache.put('a', b'aaaa')
+        cache.put('b', b'bbbb')
+        # The library that was just stored is kept, even if it exceeds the maximum size
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), b'bbbb')
+
+
+class _EmbeddingMap:
+    def __init__(self, *objects):
+        self.object_forward_map = dict(enumerate(objects))
+
+
+class CompileProfileTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'profile.json')
+        self.profile = demo_system.coredevice.core._CompileProfile(self.path)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _foo(self):
+        pass
+
+    def _bar(self):
+        pass
+
+    def test_summary(self):
+        self.profile.record(self._foo, 1.0, 100, _EmbeddingMap(self, self._bar), False)
+        self.profile.record(self._foo, 0.5, 120, _EmbeddingMap(self), True)
+        self.profile.record(self._bar, 2.0, 50, _EmbeddingMap(), None)
+
+        self.assertEqual(len(self.profile.records), 3)
+        self.assertEqual(self.profile.records[0]['num_objects'], 1)
+        self.assertEqual(self.profile.records[0]['num_rpcs'], 1)
+
+        summary = self.profile.summary()
+        self.assertEqual([s['kernel'] for s in summary], ['CompileProfileTestCase._bar', 'CompileProfileTestCase._foo'])
+        self.assertEqual(summary[1]['count'], 2)
+        self.assertAlmostEqual(summary[1]['total_compile_time'], 1.5)
+        self.assertEqual(summary[1]['max_kernel_size'], 120)
+
+        table = self.profile.table().splitlines()
+        self.assertEqual(len(table), 4)
+        self.assertTrue(all(len(line) == len(table[0]) for line in table))
+
+    def test_write(self):
+        self.profile.record(self._foo, 1.0, 100, _EmbeddingMap(), None)
+        self.profile.write()
+        with open(self.path) as f:
+            report = json.load(f)
+        self.assertEqual(report['records'], self.profile.records)
+        self.assertEqual(len(report['summary']), 1)
+
+
 class CoreCompilingTestCase(unittest.TestCase):
 
     def _set_core(self, **kwargs):
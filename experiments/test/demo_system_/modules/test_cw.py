@@ -31,6 +31,12 @@ class L370TestCase(dax.sim.test_case.PeekTestCase):
                 self.sys.l370.reset()
                 self.assert_laser_state(mode=self.sys.l370.MODES.COOL, state=True)
 
+    def test_reset_config(self):
+        self.sys.l370.config_mode(mode=self.sys.l370.MODES.DETECT)
+        self.sys.l370.reset_config()
+        for dds in self.sys.l370._dds_list:
+            self.expect_close(dds._dds, "freq", dds._default_freq, places=self.freq_places)
+
     def test_idle(self):
         for mode in self.sys.l370.MODES.modes_list_int:
             for state in [True, False]:
@@ -71,3 +77,24 @@ class L370TestCase(dax.sim.test_case.PeekTestCase):
                               self.sys.l370._detect_freq, places=self.freq_places)
             self.expect_close(self.sys.l370._detect_prep_cool_dds._dds, "amp",
                               self.sys.l370._detect_amp, places=self.amp_places)
+
+
+class L370ProfileModeTestCase(dax.sim.test_case.PeekTestCase):
+    def setUp(self) -> None:
+        self.sys = self.construct_env(DemoTestSystem, device_db="experiments/device_db_sim.py")
+        self.sys.l370.set_dataset_sys(self.sys.l370.PROFILE_MODE_KEY, True)
+        self.sys.dax_init()
+
+    def test_mirror_profiles(self):
+        l370 = self.sys.l370
+        # Profiles of the mode DDS are preloaded, all other channels of the CPLD hold their default in the mode profiles
+        self.assertListEqual(l370._detect_prep_cool_dds._mirror_profiles, [])
+        for dds in [l370._shutter, self.sys.l355._shutter, self.sys.microwave]:
+            self.assertListEqual(dds._mirror_profiles, l370.MODE_PROFILES)
+
+    def test_config(self):
+        for mode in self.sys.l370.MODES.modes_list_int:
+            self.sys.l370.config_mode(mode=mode)
+            self.assertEqual(self.sys.l370.mode, mode)
+            self.expect(self.sys.l370._detect_prep_cool_dds._dds.sw, "state", mode != self.sys.l370.MODES.OFF)
+            self.expect(self.sys.l370._cool_sw._sw, "state", mode == self.sys.l370.MODES.COOL)
@@ -2,6 +2,7 @@ from numpy import int32, random
 import dax.sim.test_case
 
 from test.system import DemoTestSystem
+from demo_system.modules.util.dds import DEFAULT_SLACK, latency_to_slack_mu
 from dax.experiment import *
 
 
@@ -77,6 +78,47 @@ class DDS9910TestCase(dax.sim.test_case.PeekTestCase):
         self.assertEqual(self.dut._default_ftw, self.frequency_to_ftw(self.dut._default_freq))
         self.assertEqual(self.dut._default_pow, self.turns_to_pow(self.dut._default_pow))
 
+    def test_config_unchanged(self):
+        self.dut.reset_config()
+        t = now_mu()
+        self.dut.reset_config()
+        self.assertEqual(now_mu(), t, 'Unchanged configuration was written')
+        self.dut.invalidate_state()
+        self.dut.reset_config()
+        self.assertGreater(now_mu(), t, 'Configuration was not written after invalidation')
+
+    def test_att_unchanged(self):
+        att = self.dut._default_att
+        self.dut.config_att(att)
+        self.assertTrue(self.dut._att_valid)
+        t = now_mu()
+        self.dut.config_att(att)
+        self.assertEqual(now_mu(), t, 'Unchanged attenuation was written')
+        self.dut.config_att(att + 1 * dB)
+        self.assertGreater(now_mu(), t, 'Changed attenuation was not written')
+        t = now_mu()
+        self.dut.invalidate_state()
+        self.dut.config_att(att + 1 * dB)
+        self.assertGreater(now_mu(), t, 'Attenuation was not written after invalidation')
+
+    def test_slack(self):
+        # Latencies are not calibrated, the default slack is used
+        self.assertEqual(self.dut._config_slack_mu, self.sys.core.seconds_to_mu(DEFAULT_SLACK))
+        self.assertEqual(self.dut._att_slack_mu, self.sys.core.seconds_to_mu(DEFAULT_SLACK))
+        margin = self.sys.core.seconds_to_mu(self.dut._slack_margin)
+        self.assertEqual(latency_to_slack_mu(self.sys.core, 1000, self.dut._slack_margin), 1000 + margin)
+
+    def test_load_config(self):
+        frequency = 150 * MHz
+        ftw = self.dut._dds.frequency_to_ftw(frequency)
+        self.assertTrue(self.dut.load_config_mu(ftw=ftw, asf=self.dut._default_asf, pow=self.dut._default_pow))
+        self.dut.io_update()
+        self.expect_close(self.dut._dds, 'freq', frequency, places=self.FREQ_PLACES)
+        self.assertFalse(self.dut.load_config_mu(ftw=ftw, asf=self.dut._default_asf, pow=self.dut._default_pow))
+        self.assertTrue(self.dut.load_reset_config())
+        self.dut.io_update()
+        self.expect_close(self.dut._dds, 'freq', self.dut._default_freq, places=self.FREQ_PLACES)
+
     # def test_att(self):
     #     att_set = self.dut._default_att
     #     self.expect(self.dut._dds.cpld, 'att_0', att_set)
@@ -0,0 +1,25 @@
+import numpy as np
+import dax.sim.test_case
+from dax.modules.hist_context import HistogramContextError
+
+from test.system import DemoTestSystem
+
+
+class HistogramContextTestCase(dax.sim.test_case.PeekTestCase):
+
+    def setUp(self) -> None:
+        self.sys = self.construct_env(DemoTestSystem, device_db="experiments/device_db_sim.py")
+        self.sys.dax_init()
+
+        self.dut = self.sys.state.histogram
+
+    def test_append_block(self):
+        block = np.arange(12, dtype=np.int32).reshape(4, 3)
+        with self.dut:
+            self.dut.append([0, 1, 2])
+            self.dut.append_block(block, 3)
+        self.assertListEqual(self.dut.get_raw()[-1], [[0, 1, 2]] + block[:3].tolist())
+
+    def test_append_block_out_of_context(self):
+        with self.assertRaises(HistogramContextError):
+            self.dut.append_block(np.zeros((2, 1), dtype=np.int32), 2)
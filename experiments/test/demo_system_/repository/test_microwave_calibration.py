@@ -1,13 +1,18 @@
+import numpy as np
 import pytest
 
+from dax.experiment import *
+
 from test.demo_system_.util.test_experiment_base import ExperimentTestBase
 
 
 from repository.dax.calibration.microwave.detection_efficiency import DetectionEfficiency
-from repository.dax.calibration.microwave.gate_repeat import MicrowaveGateRepeatScan
+from repository.dax.calibration.microwave.gate_repeat import MicrowaveGateRepeatScan, MicrowaveGateRepeatScanIter
 from repository.dax.calibration.microwave.qubit_freq import MicrowaveQubitFreqGateScan
 from repository.dax.calibration.microwave.qubit_time import MicrowaveQubitTimeGateScan
-from repository.dax.calibration.microwave.ramsey_freq import MicrowaveRamseyFreqCalibration
+from repository.dax.calibration.microwave.randomized_benchmarking import MicrowaveRandomizedBenchmarking
+from repository.dax.calibration.microwave.ramsey_freq import (MicrowaveRamseyFreqCalibration,
+                                                              MicrowaveRamseyFreqCalibrationIter)
 from repository.dax.calibration.microwave.ramsey_phase import MicrowaveRamseyPhaseCalibration
 from repository.dax.calibration.microwave.ramsey_time import MicrowaveRamseyTimeCalibration
 from repository.dax.calibration.microwave.spin_echo_time import MicrowaveSpinEcho
@@ -15,6 +20,24 @@ from repository.dax.calibration.microwave.spin_echo_time import MicrowaveSpinEch
 n_samples = 1
 
 
+class _InfiniteGateRepeatScan(MicrowaveGateRepeatScan):
+    """Gate repeat scan that stops itself after a number of points, used to run infinite scans."""
+
+    NUM_PASSES = 2
+
+    def host_enter(self) -> None:
+        super(_InfiniteGateRepeatScan, self).host_enter()
+        self._num_points = np.int32(0)
+        self._max_points = np.int32(self.NUM_PASSES * len(self.get_scan_points()[self.MW_GATE_TIME_KEY]))
+        self.update_kernel_invariants("_max_points")
+
+    @kernel
+    def gate_config(self, point, index):
+        self._num_points += 1
+        if self._num_points >= self._max_points:
+            self.stop_scan()
+
+
 @pytest.mark.repository
 class InjectModulesTestCase(ExperimentTestBase):
 
@@ -24,15 +47,78 @@ class InjectModulesTestCase(ExperimentTestBase):
     def test_MicrowaveGateRepeatScan(self):
         self.run_experiment(MicrowaveGateRepeatScan(self.sys), {'_gate_scan_num_samples': n_samples})
 
+    def test_MicrowaveGateRepeatScanDmaShot(self):
+        self.run_experiment(MicrowaveGateRepeatScan(self.sys), {'_gate_scan_num_samples': n_samples,
+                                                                '_dma_shot': True})
+
+    def test_MicrowaveGateRepeatScanBatchedReadout(self):
+        self.run_experiment(MicrowaveGateRepeatScan(self.sys), {'_gate_scan_num_samples': n_samples,
+                                                                '_batched_readout': True})
+
+    def test_MicrowaveGateRepeatScanIonWatchdog(self):
+        experiment = MicrowaveGateRepeatScan(self.sys)
+        self.run_experiment(experiment, {'_gate_scan_num_samples': n_samples, '_ion_watchdog': True})
+        # The expected number of ions is the number of ions at the start of the scan, not the number of channels
+        self.assertEqual(experiment._ion_watchdog_num_ions, self.N_IONS)
+
+    def test_MicrowaveGateRepeatScanInfiniteLiveFit(self):
+        # Early stop uses the synchronous fit update, the uncertainty is never reached
+        experiment = _InfiniteGateRepeatScan(self.sys)
+        self.run_experiment(experiment, {'_gate_scan_num_samples': n_samples, '_dax_scan_infinite': True,
+                                         '_live_fit': True, '_early_stop_uncertainty': 1e-30})
+        x, prob = experiment.get_fit_data(experiment.MW_GATE_TIME_KEY)
+        self.assertEqual(len(x), len(prob))
+        self.assertGreater(len(prob), len(experiment.get_scan_points()[experiment.MW_GATE_TIME_KEY]))
+
+    def test_MicrowaveGateRepeatScanInfiniteAdaptive(self):
+        experiment = _InfiniteGateRepeatScan(self.sys)
+        self.run_experiment(experiment, {'_gate_scan_num_samples': 4, '_dax_scan_infinite': True,
+                                         '_adaptive': True})
+        # Samples are allocated once per pass and every point is measured
+        self.assertEqual(experiment._adaptive_pass, experiment.NUM_PASSES)
+        x, prob = experiment.get_fit_data(experiment.MW_GATE_TIME_KEY)
+        self.assertEqual(len(x), experiment.NUM_PASSES * len(experiment.get_scan_points()[experiment.MW_GATE_TIME_KEY]))
+        self.assertEqual(len(x), len(prob))
+
+    def test_MicrowaveGateRepeatScanIter(self):
+        experiment = MicrowaveGateRepeatScanIter(self.sys)
+        scan = experiment.scan
+        self.run_experiment(experiment, {'num_iterations': 2})
+        # The scan is built once and runs the points of the last iteration
+        self.assertIs(experiment.scan, scan)
+        points = scan.get_scan_points()[scan.MW_GATE_TIME_KEY]
+        self.assertAlmostEqual(np.ptp(points), experiment.span / experiment.span_sf)
+
     def test_MicrowaveQubitFreqGateScan(self):
         self.run_experiment(MicrowaveQubitFreqGateScan(self.sys), {'_gate_scan_num_samples': 1})
 
     def test_MicrowaveQubitTimeGateScan(self):
         self.run_experiment(MicrowaveQubitTimeGateScan(self.sys), {'_gate_scan_num_samples': n_samples})
 
+    def test_MicrowaveRandomizedBenchmarking(self):
+        self.run_experiment(MicrowaveRandomizedBenchmarking(self.sys), {'_gate_scan_num_samples': n_samples,
+                                                                        'cache_dir': ''})
+
+    def test_MicrowaveRandomizedBenchmarkingInterleavedSK1(self):
+        self.run_experiment(MicrowaveRandomizedBenchmarking(self.sys), {'_gate_scan_num_samples': n_samples,
+                                                                        'interleaved_gate': 'sqrt_x',
+                                                                        'use_sk1': True, 'cache_dir': ''})
+
     def test_MicrowaveRamseyFreqCalibration(self):
         self.run_experiment(MicrowaveRamseyFreqCalibration(self.sys), {'_gate_scan_num_samples': n_samples})
 
+    def test_MicrowaveRamseyFreqCalibrationIter(self):
+        experiment = MicrowaveRamseyFreqCalibrationIter(self.sys)
+        self.run_experiment(experiment, {'num_iterations': 2})
+        self.assertEqual(experiment.scan.ramsey_delay_time, experiment.ramsey_time / experiment.ramsey_time_sf)
+
+    def test_MicrowaveRamseyFreqCalibrationAdaptive(self):
+        experiment = MicrowaveRamseyFreqCalibration(self.sys)
+        self.run_experiment(experiment, {'_gate_scan_num_samples': n_samples, '_adaptive': True})
+        # Adaptive samples are ignored for a finite scan, every point uses all samples
+        self.assertFalse(experiment._adaptive_enabled)
+        self.assertEqual(experiment._adaptive_pass, 0)
+
     def test_MicrowaveRamseyPhaseCalibration(self):
         self.run_experiment(MicrowaveRamseyPhaseCalibration(self.sys), {'_gate_scan_num_samples': n_samples})
 
@@ -0,0 +1,32 @@
+import dax.sim.test_case
+
+from test.system import DemoTestSystem
+
+
+class LatencyTestCase(dax.sim.test_case.PeekTestCase):
+    def setUp(self) -> None:
+        self.sys = self.construct_env(DemoTestSystem, device_db="experiments/device_db_sim.py")
+        self.sys.dax_init()
+
+    def test_no_reference(self):
+        with self.assertRaises(RuntimeError):
+            self.sys.latency.measure_latency_mu(self.sys.l370._cool_sw.ttl)
+
+    def test_store_latency(self):
+        sw = self.sys.l370._cool_sw
+        sw.set_latency(100)
+        sw.store_latency(100)
+        self.assertEqual(sw.get_dataset_sys(sw.LATENCY_MU_KEY), 100)
+        sw.clear_latency()
+        self.assertEqual(sw._sw_latency_mu, 0)
+        self.assertEqual(sw.get_dataset_sys(sw.LATENCY_MU_KEY), 0)
+
+        dds = self.sys.l370._shutter
+        dds.set_sw_latency(100)
+        dds.clear_sw_latency()
+        self.assertEqual(dds._sw_latency_mu, 0)
+        self.assertEqual(dds.get_dataset_sys(dds.SW_LATENCY_MU_KEY), 0)
+
+    def test_ttl(self):
+        self.assertIs(self.sys.l370._cool_sw.ttl, self.sys.l370._cool_sw._sw)
+        self.assertIs(self.sys.l370._shutter.ttl, self.sys.l370._shutter._dds.sw)
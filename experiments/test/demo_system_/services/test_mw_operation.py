@@ -0,0 +1,159 @@
+import numpy as np
+
+import dax.sim.test_case
+
+from test.system import DemoTestSystem
+from dax.experiment import *
+
+
+class MicrowaveOperationTestCase(dax.sim.test_case.PeekTestCase):
+    def setUp(self) -> None:
+        self.sys = self.construct_env(DemoTestSystem, device_db="experiments/device_db_sim.py")
+        self.sys.dax_init()
+        self.dut = self.sys.mw_operation
+        self.pi_mu = self.sys.core.seconds_to_mu(self.sys.microwave.pi_time())
+
+    def test_compile_merge(self):
+        durations, pows = self.dut.compile_gates(["x", "x", "i", ("rx", np.pi / 2)])
+        np.testing.assert_array_equal(durations, [round(2.5 * self.pi_mu)])
+        np.testing.assert_array_equal(pows, [0])
+
+    def test_compile_cancel(self):
+        durations, _ = self.dut.compile_gates(["sqrt_x", "sqrt_x_dag", ("ry", 0.5), ("ry", -0.5)])
+        self.assertEqual(len(durations), 0)
+
+    def test_compile_z(self):
+        # The inner X pulses of adjacent Z-type gates cancel and the Y pulses merge
+        durations, pows = self.dut.compile_gates(["z", "sqrt_z"])
+        np.testing.assert_array_equal(durations, [self.pi_mu // 2, round(1.5 * self.pi_mu), self.pi_mu // 2])
+        self.assertEqual(pows[1], self.dut._POW_PI >> 1)
+
+    def test_compile_rphi(self):
+        # The phase of rphi is given in radians
+        for theta in [0.4, np.pi]:
+            with self.subTest(theta=theta):
+                np.testing.assert_array_equal(self.dut.compile_gates([("rphi", theta, np.pi / 2)])[1],
+                                              self.dut.compile_gates([("ry", theta)])[1])
+                np.testing.assert_array_equal(self.dut.compile_gates([("rphi", theta, np.pi)])[1],
+                                              self.dut.compile_gates([("rx", -theta)])[1])
+
+    def test_compile_unknown(self):
+        with self.assertRaises(KeyError):
+            self.dut.compile_gates(["cnot"])
+
+    def test_play_pulses(self):
+        durations, pows = self.dut.compile_gates(["h", "x"])
+        t = now_mu()
+        self.dut.play_pulses_mu(durations, pows)
+        self.assertGreaterEqual(now_mu() - t, np.sum(durations))
+
+    def test_virtual_z(self):
+        self.dut.set_virtual_z(True)
+        t = now_mu()
+        self.dut.z()
+        self.dut.rz(np.pi / 2)
+        self.assertEqual(now_mu(), t, 'Virtual Z rotations must not perform pulses')
+        self.assertEqual(self.dut._frame_pow, (-self.dut._POW_PI - (self.dut._POW_PI >> 1)) & self.dut._POW_MASK)
+        self.dut.reset_frame()
+        self.assertEqual(self.dut._frame_pow, 0)
+
+    def test_compile_virtual_z(self):
+        self.dut.set_virtual_z(True)
+        durations, pows = self.dut.compile_gates(["sqrt_z", "x", "z"])
+        np.testing.assert_array_equal(durations, [self.pi_mu, 0])
+        np.testing.assert_array_equal(pows, [-(self.dut._POW_PI >> 1) & self.dut._POW_MASK,
+                                             (-self.dut._POW_PI - (self.dut._POW_PI >> 1)) & self.dut._POW_MASK])
+
+    def _unitary(self, durations, pows):
+        """Unitary of a pulse table, the trailing frame shift is applied as a Z rotation."""
+        u = np.eye(2, dtype=complex)
+        frame = 0.0
+        for d, p in zip(durations, pows):
+            phi = 2 * np.pi * p / (1 << self.dut._POW_BITS)
+            if d > 0:
+                theta = np.pi * d / self.dut._pi_duration_mu
+                axis = np.array([[0, np.exp(-1j * phi)], [np.exp(1j * phi), 0]])
+                u = (np.cos(theta / 2) * np.eye(2) - 1j * np.sin(theta / 2) * axis) @ u
+            else:
+                frame += phi
+        # A frame shift by -theta is a pending Z rotation by theta
+        return np.diag([np.exp(1j * frame / 2), np.exp(-1j * frame / 2)]) @ u
+
+    def test_virtual_z_equivalence(self):
+        for gates in [["z", "sqrt_y_dag"], ["sqrt_z", "x", "z", "h"], [("rz", 0.7), "sqrt_x", "sqrt_z_dag", "y"]]:
+            with self.subTest(gates=gates):
+                self.dut.set_virtual_z(False)
+                physical = self._unitary(*self.dut.compile_gates(gates))
+                self.dut.set_virtual_z(True)
+                virtual = self._unitary(*self.dut.compile_gates(gates))
+                # Equal up to a global phase
+                self.assertAlmostEqual(abs(np.trace(physical.conj().T @ virtual)) / 2, 1.0, places=4)
+
+    def test_virtual_z_pow(self):
+        self.dut.set_virtual_z(True)
+        _, pows = self.dut.compile_gates(["z", "sqrt_y_dag"])
+        self.assertEqual(pows[0], (self.dut._POW_PI_3_4 + self.dut._POW_PI) & self.dut._POW_MASK)
+        self.assertLess(pows[0], 1 << self.dut._POW_BITS)
+
+    def test_gate_phases(self):
+        # Physical gates address the full 16-bit phase offset word of the AD9910
+        self.dut.set_virtual_z(False)
+        dds = self.sys.microwave._dds
+        turns = {
+            "x": [0.0],
+            "y": [0.25],
+            "sqrt_x": [0.0],
+            "sqrt_x_dag": [0.5],
+            "sqrt_y": [0.25],
+            "sqrt_y_dag": [0.75],
+            "z": [0.5, 0.25, 0.0],
+            "h": [0.5, 0.125, 0.0],
+        }
+        for gate, phases in turns.items():
+            with self.subTest(gate=gate):
+                _, pows = self.dut.compile_gates([gate])
+                np.testing.assert_array_equal(pows, [dds.turns_to_pow(t) for t in phases])
+
+    def test_pulse_durations(self):
+        self.assertEqual(self.dut._pi_duration_mu, self.pi_mu)
+        self.assertEqual(self.dut._pi_2_duration_mu, self.pi_mu >> 1)
+        rabi_freq = self.sys.microwave.rabi_freq() / 2
+        self.sys.microwave.store_rabi_freq(rabi_freq)
+        self.assertEqual(self.dut._pi_duration_mu, self.sys.core.seconds_to_mu(0.5 / rabi_freq))
+        self.assertEqual(self.sys.mw_operation_sk1._2pi_duration_mu, self.dut._pi_duration_mu << 1)
+
+    def test_rotate(self):
+        t = now_mu()
+        self.dut.rx(np.pi / 2)
+        self.assertGreaterEqual(now_mu() - t, self.pi_mu // 2)
+
+
+class MicrowaveOperationSK1TestCase(dax.sim.test_case.PeekTestCase):
+    def setUp(self) -> None:
+        self.sys = self.construct_env(DemoTestSystem, device_db="experiments/device_db_sim.py")
+        self.sys.dax_init()
+        self.dut = self.sys.mw_operation_sk1
+
+    def test_composite_table(self):
+        pi_mu = self.sys.core.seconds_to_mu(self.sys.microwave.pi_time())
+        durations, pows = self.dut.composite_table(np.pi / 2, 0)
+        np.testing.assert_array_equal(durations, [pi_mu // 2, 2 * pi_mu, 2 * pi_mu])
+        np.testing.assert_array_equal(pows, [0, self.dut._sk1_pi_2_x, self.dut._msk1_pi_2_x])
+        self.assertEqual(len(self.dut.composite_table(0.3, 0, method="bb1")[0]), 4)
+
+    def test_rphi(self):
+        self.assertListEqual(self.dut.gate_pulses("rphi", 0.4, np.pi / 2), self.dut.gate_pulses("ry", 0.4))
+        self.assertListEqual(self.dut.gate_pulses("rphi", 0.4, -np.pi / 2), self.dut.gate_pulses("ry", -0.4))
+
+    def test_rotate(self):
+        # Arbitrary rotations in kernels are composite pulses
+        t = now_mu()
+        self.dut.rx(0.3)
+        self.assertGreaterEqual(now_mu() - t, 2 * self.dut._2pi_duration_mu)
+
+    def test_composite_cache(self):
+        table = self.dut.composite_table(0.3, 0)
+        self.assertIs(self.dut.composite_table(0.3 + 1e-9, 0), table)
+        self.sys.microwave.store_rabi_freq(self.sys.microwave.rabi_freq())
+        self.assertEqual(self.dut._composite_table_cache.cache_info().currsize, 0)
+        self.assertIsNot(self.dut.composite_table(0.3, 0), table)
@@ -20,6 +20,23 @@ class SystemTestCase(dax.sim.test_case.PeekTestCase):
         for s in env.registry.get_service_list():
             self._test_kernel_invariants(s)
 
+    def test_init(self):
+        # Construct system environment
+        env = self.construct_env(DemoTestSystem, device_db="experiments/device_db_sim.py",
+                                 build_kwargs={'mon_pmt_enabled': self.MON_PMT_ENABLED})
+        env.dax_init()
+
+        # Devices initialized by the joint initialization kernel
+        self.expect(env.ablation._ablation_sw, 'state', False)
+        self.expect(env.trigger_ttl._sw, 'state', False)
+        self.expect(env.l355._shutter._dds.sw, 'state', False)
+        self.expect(env.l370._cool_sw._sw, 'state', True)
+        self.assertFalse(env.ablation.ablation_state())
+        for cpld in env.cpld.cpld:
+            self.expect(cpld, 'init_att', True)
+        self.expect(env.rtio_bench.ttl_in, 'direction', 0)
+        self.expect(env.rtio_bench.ttl_out, 'state', False)
+
     def _test_kernel_invariants(self, component: dax.base.system.DaxHasSystem):
         # Test kernel invariants of this component
         for k in component.kernel_invariants:
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+
+from demo_system.util import clifford
+
+
+class CliffordTestCase(unittest.TestCase):
+    SEED = 1
+
+    @staticmethod
+    def _net(gates):
+        return clifford.clifford_index([clifford.PRIMITIVES[g] for g in gates])
+
+    def test_group(self):
+        self.assertEqual(len(clifford.CLIFFORD_GATES), clifford.NUM_CLIFFORDS)
+        self.assertEqual(clifford.CLIFFORD_GATES[0], ())
+        for i, gates in enumerate(clifford.CLIFFORD_GATES):
+            self.assertEqual(self._net(gates), i)
+        for i, p in enumerate(clifford.PRIMITIVES):
+            self.assertEqual(clifford.CLIFFORD_GATES[clifford.clifford_index([p])], (i,))
+
+    def test_recovery(self):
+        lengths = [0, 1, 2, 7, 30]
+        for interleaved in [None, clifford.clifford_index(['sqrt_x'])]:
+            with self.subTest(interleaved=interleaved):
+                gates, offsets = clifford.generate_sequences(lengths, 5, self.SEED, interleaved)
+                self.assertEqual(gates.dtype, np.int8)
+                self.assertEqual(offsets.dtype, np.int32)
+                self.assertEqual(len(offsets), len(lengths) * 5 + 1)
+                self.assertEqual(offsets[-1], len(gates))
+                for i in range(len(offsets) - 1):
+                    self.assertEqual(self._net(gates[offsets[i]:offsets[i + 1]]), 0)
+
+    def test_deterministic(self):
+        a = clifford.generate_sequences([3, 10], 4, self.SEED)
+        b = clifford.generate_sequences([3, 10], 4, self.SEED)
+        c = clifford.generate_sequences([3, 10], 4, self.SEED + 1)
+        for x, y in zip(a, b):
+            np.testing.assert_array_equal(x, y)
+        self.assertFalse(np.array_equal(a[0], c[0]) and np.array_equal(a[1], c[1]))
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rb')
+            gates, offsets = clifford.load_sequences(path, [2, 8], 3, self.SEED)
+            self.assertEqual(len(os.listdir(path)), 1)
+            cached_gates, cached_offsets = clifford.load_sequences(path, [2, 8], 3, self.SEED)
+            np.testing.assert_array_equal(cached_gates, gates)
+            np.testing.assert_array_equal(cached_offsets, offsets)
+            clifford.load_sequences(path, [2, 8], 3, self.SEED + 1)
+            self.assertEqual(len(os.listdir(path)), 2)
+
+    def test_cache_write_failure(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                unittest.mock.patch('numpy.savez', side_effect=OSError('disk full')):
+            with self.assertLogs(clifford._logger, 'WARNING'):
+                gates, offsets = clifford.load_sequences(tmp, [2, 8], 3, self.SEED)
+            self.assertEqual(os.listdir(tmp), [], 'Temporary file was not removed')
+        expected = clifford.generate_sequences([2, 8], 3, self.SEED)
+        np.testing.assert_array_equal(gates, expected[0])
+        np.testing.assert_array_equal(offsets, expected[1])
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from demo_system.util.composite_pulses import COMPOSITE_PULSES, sk1_pulses
+
+_POW_TURN = 1 << 16
+
+
+def _turns_to_pow(turns):
+    return int(round(turns * _POW_TURN)) & (_POW_TURN - 1)
+
+
+def _unitary(pulses, amplitude_error=0.0):
+    """Unitary of a pulse sequence with a relative amplitude error."""
+    u = np.eye(2, dtype=complex)
+    for angle, pow_ in pulses:
+        phi = 2 * np.pi * pow_ / _POW_TURN
+        half = angle * (1 + amplitude_error) / 2
+        axis = np.cos(phi) * np.array([[0, 1], [1, 0]]) + np.sin(phi) * np.array([[0, -1j], [1j, 0]])
+        u = (np.cos(half) * np.eye(2) - 1j * np.sin(half) * axis) @ u
+    return u
+
+
+def _infidelity(u, v):
+    return 1 - abs(np.trace(u.conj().T @ v) / 2) ** 2
+
+
+class CompositePulsesTestCase(unittest.TestCase):
+    ANGLES = [np.pi / 4, np.pi / 2, 0.7, np.pi, 3 * np.pi / 2]
+    AMPLITUDE_ERROR = 0.02
+
+    def test_ideal(self):
+        for name, fn in COMPOSITE_PULSES.items():
+            for theta in self.ANGLES:
+                with self.subTest(method=name, theta=theta):
+                    target = _unitary([(theta, 1000)])
+                    self.assertLess(_infidelity(target, _unitary(fn(theta, 1000, _turns_to_pow))), 1e-6)
+
+    def test_robust(self):
+        for name, fn in COMPOSITE_PULSES.items():
+            for theta in self.ANGLES:
+                with self.subTest(method=name, theta=theta):
+                    target = _unitary([(theta, 0)])
+                    naive = _infidelity(target, _unitary([(theta, 0)], self.AMPLITUDE_ERROR))
+                    composite = _infidelity(target, _unitary(fn(theta, 0, _turns_to_pow), self.AMPLITUDE_ERROR))
+                    self.assertLess(composite, naive / 100)
+
+    def test_fixed_angles(self):
+        # Matches the precomputed phases of the SK1 service
+        pulses = sk1_pulses(np.pi / 2, 0, _turns_to_pow)
+        self.assertEqual(pulses[1][1], _turns_to_pow(np.arccos(-1 / 8) / (2 * np.pi)))
+        self.assertEqual(pulses[2][1], _turns_to_pow(-np.arccos(-1 / 8) / (2 * np.pi)))
+
+    def test_range(self):
+        with self.assertRaises(AssertionError):
+            sk1_pulses(5 * np.pi, 0, _turns_to_pow)
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from demo_system.util import functions
+
+
+class FunctionsJacobianTestCase(unittest.TestCase):
+    SEED = 1
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(self.SEED)
+        self.cases = [
+            (functions.linear, rng.uniform(-1, 1, 20), [2.0, 1.0]),
+            (functions.sinusoidal, rng.uniform(0, 1, 20), [0.4, 1.3, 0.2, 0.5]),
+            (functions.exp_decay, rng.uniform(0, 1, 20), [0.7, 0.3]),
+            (functions.sinusoidal_decay, rng.uniform(0, 1, 20), [0.4, 1.3, 0.2, 0.5, 0.6]),
+            (functions.sinc_squared, np.append(rng.uniform(-1, 1, 20), 0.1), [0.8, 0.1, 0.3]),
+            (functions.gaussian, rng.uniform(-1, 1, 20), [0.8, 0.1, 0.3]),
+            (functions.rabi_oscillation, rng.uniform(0, 1e-5, 20), [1.3e5, 2e5, 1e5]),
+            (functions.rabi_oscillation_flattened,
+             functions.flatten_grid(rng.uniform(0, 1e-5, 5), rng.uniform(-1e5, 1e5, 4)), [2e5, 1e4]),
+            (functions.rabi_oscillation_on_resonance, rng.uniform(0, 1e-5, 20), [2e5]),
+            (functions.ramsey_fringe, rng.uniform(-2e5, 2e5, 20), [3e-5, 2e5, 1e4]),
+            (functions.ramsey_fringe_flattened,
+             functions.flatten_grid(rng.uniform(-2e5, 2e5, 5), rng.uniform(0, 1e-4, 4)), [2e5, 1e4]),
+            (functions.simple_ramsey_fringe, rng.uniform(-2e5, 2e5, 20), [3e-5, 1e4]),
+            (functions.phase_oscillation, rng.uniform(0, 1, 20), [0.4, 0.1, 0.5]),
+        ]
+
+    @staticmethod
+    def _numerical_jacobian(function, x, params):
+        jacobian = []
+        for i in range(len(params)):
+            step = 1e-6 * abs(params[i])
+            p_hi, p_lo = list(params), list(params)
+            p_hi[i] += step
+            p_lo[i] -= step
+            jacobian.append((function(x, *p_hi) - function(x, *p_lo)) / (2 * step))
+        return np.stack(jacobian, axis=-1)
+
+    def test_value_and_jacobian(self):
+        for function, x, params in self.cases:
+            with self.subTest(function=function.__name__):
+                value, jacobian = functions.get_value_and_jacobian(function)(x, *params)
+                np.testing.assert_allclose(value, function(x, *params))
+                expected = self._numerical_jacobian(function, x, params)
+                self.assertEqual(jacobian.shape, expected.shape)
+                np.testing.assert_allclose(jacobian, expected, rtol=0, atol=1e-6 * np.max(np.abs(expected)))
+
+    def test_get_jacobian(self):
+        function, x, params = self.cases[0]
+        np.testing.assert_array_equal(functions.get_jacobian(function)(x, *params),
+                                      functions.get_value_and_jacobian(function)(x, *params)[1])
+        self.assertIsNone(functions.get_jacobian(functions.rabi_freq_to_pi_time))
+        self.assertIsNone(functions.get_value_and_jacobian(functions.rabi_freq_to_pi_time))
+
+    def test_flatten_grid(self):
+        grid = functions.flatten_grid([1.0, 2.0], [3.0, 4.0, 5.0])
+        np.testing.assert_array_equal(grid, [[1.0, 1.0, 1.0, 2.0, 2.0, 2.0], [3.0, 4.0, 5.0, 3.0, 4.0, 5.0]])
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from demo_system.util.gate_compiler import merge_pulses, pulse_table
+
+
+class GateCompilerTestCase(unittest.TestCase):
+    POW_PI = 1 << 15
+    POW_MASK = 0xffff
+
+    def _merge(self, pulses):
+        return merge_pulses(pulses, pow_pi=self.POW_PI, pow_mask=self.POW_MASK)
+
+    def test_merge_same_axis(self):
+        self.assertEqual(self._merge([(np.pi / 2, 0), (np.pi / 2, 0)]), [(np.pi, 0)])
+
+    def test_cancel_inverse(self):
+        self.assertEqual(self._merge([(np.pi / 2, 0), (np.pi / 2, self.POW_PI)]), [])
+        # Cancellation exposes the previous pulse for merging
+        pulses = [(np.pi, 100), (np.pi / 2, 0), (np.pi / 2, self.POW_PI), (np.pi, 100)]
+        self.assertEqual(self._merge(pulses), [(2 * np.pi, 100)])
+
+    def test_opposite_axis(self):
+        self.assertEqual(self._merge([(np.pi / 2, 0), (np.pi, self.POW_PI)]), [(np.pi / 2, self.POW_PI)])
+        self.assertEqual(self._merge([(np.pi, self.POW_PI), (np.pi / 2, 0)]), [(np.pi / 2, self.POW_PI)])
+
+    def test_no_merge(self):
+        pulses = [(np.pi, 0), (2 * np.pi, 1000), (2 * np.pi, self.POW_MASK + 1 - 1000)]
+        self.assertEqual(self._merge(pulses), pulses)
+
+    def test_pulse_table(self):
+        durations, pows = pulse_table([(np.pi, 0), (np.pi / 2, 10), (1e-9, 20)], pi_duration_mu=100)
+        np.testing.assert_array_equal(durations, [100, 50])
+        np.testing.assert_array_equal(pows, [0, 10])
+        self.assertEqual(durations.dtype, np.int64)
+        self.assertEqual(pows.dtype, np.int32)
+
+    def test_empty_table(self):
+        durations, pows = pulse_table([], pi_duration_mu=100)
+        self.assertEqual(len(durations), 0)
+        self.assertEqual(len(pows), 0)
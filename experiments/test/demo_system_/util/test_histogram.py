@@ -0,0 +1,57 @@
+import collections
+import unittest
+
+import numpy as np
+
+from demo_system.util.histogram import CountData
+
+
+class CountDataTestCase(unittest.TestCase):
+    SEED = 1
+
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(self.SEED)
+        self.raw = self.rng.poisson(3.0, size=(5, 50, 2)).tolist()
+        self.data = CountData.from_raw(self.raw)
+
+    def test_shape(self):
+        self.assertEqual(self.data.counts.shape, (5, 50, 2))
+        self.assertEqual(self.data.num_points, 5)
+        self.assertEqual(self.data.num_samples, 50)
+        self.assertEqual(self.data.num_channels, 2)
+
+    def test_histograms(self):
+        histograms = self.data.histograms()
+        for c in range(self.data.num_channels):
+            for p, point in enumerate(self.raw):
+                ref = collections.Counter(sample[c] for sample in point)
+                for count, freq in enumerate(histograms[c][p]):
+                    self.assertEqual(freq, ref[count])
+
+    def test_probabilities(self):
+        for threshold in range(-1, 6):
+            prob = self.data.probabilities(threshold)
+            for c in range(self.data.num_channels):
+                for p, point in enumerate(self.raw):
+                    ref = sum(sample[c] > threshold for sample in point) / len(point)
+                    self.assertAlmostEqual(prob[c][p], ref)
+
+    def test_analyze(self):
+        threshold = 2
+        histograms, prob, mean = self.data.analyze(threshold)
+        np.testing.assert_array_equal(histograms, self.data.histograms())
+        np.testing.assert_allclose(prob, self.data.probabilities(threshold))
+        np.testing.assert_allclose(mean, self.data.mean_counts())
+
+    def test_exceptions(self):
+        with self.assertRaises(ValueError):
+            CountData.from_raw([[[1]], [[1], [2]]])
+        with self.assertRaises(ValueError):
+            CountData([[1, 2]])
+        with self.assertRaises(ValueError):
+            CountData([[[-1]]])
+
+    def test_empty(self):
+        data = CountData.from_raw([])
+        self.assertEqual(data.num_points, 0)
+        self.assertEqual(data.histograms().shape, (0, 0, 1))
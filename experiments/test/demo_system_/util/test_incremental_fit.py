@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+from demo_system.util.functions import gaussian, linear
+from demo_system.util.incremental_fit import IncrementalFit
+
+
+class IncrementalFitTestCase(unittest.TestCase):
+    SEED = 1
+
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(self.SEED)
+        self.x = np.linspace(-1.0, 1.0, 41)
+        self.y = gaussian(self.x, 0.8, 0.1, 0.3) + self.rng.normal(0.0, 0.01, size=self.x.shape)
+
+    def _fit(self):
+        return IncrementalFit(gaussian, lambda x, y: [np.max(y), x[np.argmax(y)], 0.5], value=lambda p: p[1])
+
+    def test_min_points(self):
+        fit = self._fit()
+        self.assertFalse(fit.update(self.x[:3], self.y[:3]))
+        self.assertFalse(fit.has_fit)
+        with self.assertRaises(RuntimeError):
+            _ = fit.popt
+
+    def test_streaming(self):
+        fit = self._fit()
+        uncertainty = []
+        for n in range(10, len(self.x) + 1, 10):
+            self.assertTrue(fit.update(self.x[:n], self.y[:n]))
+            uncertainty.append(fit.uncertainty)
+        self.assertAlmostEqual(fit.value, 0.1, delta=0.01)
+        self.assertLess(uncertainty[-1], uncertainty[1])
+        np.testing.assert_allclose(fit.evaluate(self.x), self.y, atol=0.05)
+
+    def test_failed_fit_keeps_result(self):
+        fit = self._fit()
+        self.assertTrue(fit.update(self.x, self.y))
+        popt = fit.popt.copy()
+        self.assertFalse(fit.update(self.x, np.full_like(self.y, np.nan)))
+        np.testing.assert_array_equal(fit.popt, popt)
+        fit.reset()
+        self.assertFalse(fit.has_fit)
+
+    def test_linear(self):
+        fit = IncrementalFit(linear, lambda x, y: np.polyfit(x, y, 1), min_points=2)
+        self.assertTrue(fit.update(self.x, 2.0 * self.x + 1.0))
+        np.testing.assert_allclose(fit.popt, [2.0, 1.0], atol=1e-6)
+
+    def test_variance_reduction(self):
+        fit = self._fit()
+        self.assertTrue(fit.update(self.x, self.y))
+        gain = fit.variance_reduction(self.x, 10)
+        self.assertEqual(gain.shape, self.x.shape)
+        self.assertTrue(np.all(gain >= 0.0))
+        # The center is best determined on the flanks, not in the tails
+        flank = np.argmin(np.abs(self.x - (0.1 + 0.3)))
+        tail = np.argmin(np.abs(self.x - 1.0))
+        self.assertGreater(gain[flank], 10 * gain[tail])
+        # Reduction can not exceed the current variance
+        self.assertLessEqual(gain.max(), fit.uncertainty ** 2 * (1 + 1e-6))
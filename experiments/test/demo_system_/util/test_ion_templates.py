@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+
+from demo_system.util.ion_templates import TEMPLATE_SCALE, default_templates, normalize_templates
+
+
+class IonTemplatesTestCase(unittest.TestCase):
+
+    def test_default_templates(self):
+        # Reference templates of the three channel PMT array
+        np.testing.assert_array_equal(normalize_templates(default_templates(3)),
+                                      normalize_templates([[0, 100, 0], [30, 60, 30], [50, 50, 50]]))
+
+    def test_default_templates_scalable(self):
+        for num_channels in range(1, 9):
+            templates = default_templates(num_channels)
+            self.assertEqual(templates.shape, (num_channels, num_channels))
+            # The total intensity grows with the number of ions
+            np.testing.assert_allclose(templates.sum(axis=1), np.arange(1, num_channels + 1))
+            # Templates are symmetric
+            np.testing.assert_array_equal(templates, templates[:, ::-1])
+
+    def test_normalize_templates(self):
+        templates = normalize_templates(default_templates(5))
+        self.assertEqual(templates.dtype, np.int32)
+        np.testing.assert_allclose(np.linalg.norm(templates, axis=1), TEMPLATE_SCALE, rtol=1e-2)
+
+    def test_classify(self):
+        templates = normalize_templates(default_templates(3))
+        for n, counts in enumerate([[2, 95, 3], [31, 58, 33], [48, 52, 49]], start=1):
+            for scale in [1, 10, 100]:
+                # Classification on raw counts is independent of the brightness
+                self.assertEqual(np.argmax(templates @ (np.asarray(counts) * scale)) + 1, n)
+
+    def test_invalid_templates(self):
+        for templates in [[], [1, 2, 3], [[0, 0, 0]], [[1, -1, 0]]]:
+            with self.assertRaises(ValueError):
+                normalize_templates(templates)